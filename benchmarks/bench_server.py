@@ -0,0 +1,407 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark do servidor do quiosque
+Gera uma pasta de fotos sintética, substitui o spooler por um `lp` falso e
+dispara clientes concorrentes contra o app Flask (em processo ou por HTTP
+com o waitress), medindo latência (p50/p95/p99) e vazão por endpoint.
+Os resultados podem ser salvos como baseline e comparados em execuções
+seguintes.
+
+Exemplos:
+    python benchmarks/bench_server.py --fotos 500 --save-baseline main
+    python benchmarks/bench_server.py --fotos 500 --compare main
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+BASELINES_DIR = os.path.join(BENCH_DIR, 'baselines')
+sys.path.insert(0, ROOT_DIR)
+
+from synthetic_photos import gerar_pastas  # noqa: E402
+
+ENDPOINTS = ('api_images', 'api_images_page', 'imagens', 'thumbs', 'api_print')
+
+# Impressoras anunciadas pelo lpstat falso (--printers muda a quantidade)
+IMPRESSORAS_FALSAS = ('Bench1', 'Bench2')
+
+
+def criar_spooler_falso(bin_dir: str, atraso: float, impressoras=IMPRESSORAS_FALSAS, segundos_por_pagina: float = 0.0,
+                        com_defeito=()):
+    """Cria `lp` e `lpstat` falsos (scripts Python) que respondem como o CUPS
+
+    Com segundos_por_pagina > 0 cada impressora "imprime" uma página por vez: o lp
+    registra quando o trabalho termina (em spool/<impressora>/) e o `lpstat -o`
+    lista os que ainda não terminaram. O lp das impressoras em com_defeito falha.
+    """
+    os.makedirs(bin_dir, exist_ok=True)
+    spool_dir = os.path.join(bin_dir, 'spool')
+    scripts = {
+        'lp': (
+            "import fcntl, os, sys, time\n"
+            f"time.sleep({atraso!r})\n"
+            "args = sys.argv[1:]\n"
+            "impressora = args[args.index('-d') + 1]\n"
+            f"if impressora in {list(com_defeito)!r}:\n"
+            "    sys.stderr.write(f'lp: {impressora} is not responding\\n')\n"
+            "    sys.exit(1)\n"
+            "copias = int(args[args.index('-n') + 1]) if '-n' in args else 1\n"
+            "paginas = copias * max(1, len([a for a in args if os.path.isfile(a)]))\n"
+            f"pasta = os.path.join({spool_dir!r}, impressora)\n"
+            "os.makedirs(pasta, exist_ok=True)\n"
+            "with open(os.path.join(pasta, '.lock'), 'w') as trava:\n"
+            "    fcntl.flock(trava, fcntl.LOCK_EX)\n"
+            "    fim = max([time.time()] + [float(n) for n in os.listdir(pasta) if n != '.lock'])\n"
+            f"    fim += paginas * {segundos_por_pagina!r}\n"
+            "    open(os.path.join(pasta, repr(fim)), 'w').close()\n"
+            "print(f'request id is {impressora}-{os.getpid()} ({paginas} file(s))')\n"
+        ),
+        'lpstat': (
+            "import os, sys, time\n"
+            f"impressoras = {list(impressoras)!r}\n"
+            "if '-a' in sys.argv:\n"
+            "    for nome in impressoras:\n"
+            "        print(f'{nome} accepting requests since Mon 01 Jan 2024')\n"
+            "elif '-d' in sys.argv:\n"
+            "    print(f'system default destination: {impressoras[0]}')\n"
+            "elif '-o' in sys.argv:\n"
+            "    agora = time.time()\n"
+            "    alvo = sys.argv[sys.argv.index('-o') + 1:] or impressoras\n"
+            "    for nome in alvo:\n"
+            f"        pasta = os.path.join({spool_dir!r}, nome)\n"
+            "        fins = sorted(float(n) for n in os.listdir(pasta) if n != '.lock') if os.path.isdir(pasta) else []\n"
+            "        for i, fim in enumerate(f for f in fins if f > agora):\n"
+            "            print(f'{nome}-{i} bench 1024 {fim}')\n"
+        )
+    }
+    for nome, codigo in scripts.items():
+        caminho = os.path.join(bin_dir, nome)
+        with open(caminho, 'w', encoding='utf-8') as f:
+            f.write(f"#!{sys.executable}\n{codigo}")
+        os.chmod(caminho, os.stat(caminho).st_mode | stat.S_IEXEC | stat.S_IXGRP | stat.S_IXOTH)
+    os.environ['PATH'] = bin_dir + os.pathsep + os.environ.get('PATH', '')
+
+
+def percentil(valores, p):
+    """Percentil pelo método nearest-rank (valores já ordenados)"""
+    if not valores:
+        return None
+    indice = max(0, min(len(valores) - 1, math.ceil(p / 100 * len(valores)) - 1))
+    return valores[indice]
+
+
+class ClienteEmProcesso:
+    """Cliente de teste do Flask (sem rede): mede o custo do próprio app"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, metodo, url, corpo=None):
+        if metodo == 'POST':
+            response = self.client.post(url, json=corpo)
+        else:
+            response = self.client.get(url)
+        # Lê o corpo inteiro, como um navegador faria
+        tamanho = len(response.get_data())
+        response.close()
+        return response.status_code, tamanho
+
+
+class ClienteHttp:
+    """Conexão HTTP keep-alive com o waitress: inclui o custo da rede local e do servidor WSGI"""
+
+    def __init__(self, porta):
+        self.conexao = http.client.HTTPConnection('127.0.0.1', porta, timeout=60)
+
+    def request(self, metodo, url, corpo=None):
+        headers = {}
+        dados = None
+        if corpo is not None:
+            dados = json.dumps(corpo).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        self.conexao.request(metodo, url, body=dados, headers=headers)
+        response = self.conexao.getresponse()
+        tamanho = len(response.read())
+        return response.status, tamanho
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.workdir = tempfile.mkdtemp(prefix='kiosk_bench_')
+        self.server = None
+        self.arquivos = []
+        self.impressoras = list(IMPRESSORAS_FALSAS)
+        self.porta = None
+        self._waitress = None
+
+    def preparar(self):
+        print(f"Gerando {self.args.fotos} fotos sintéticas em {self.workdir}...")
+        base_path = os.path.join(self.workdir, 'imagens')
+        criadas = gerar_pastas(base_path, dias=self.args.dias, fotos=self.args.fotos, variantes=self.args.variantes,
+                               largura=self.args.largura, altura=self.args.altura, seed=self.args.seed)
+        # A primeira pasta é a de hoje, que o servidor vai servir
+        self.arquivos = next(iter(criadas.values()))
+
+        if platform.system() != 'Windows':
+            self.impressoras = [f'Bench{i}' for i in range(1, self.args.printers + 1)]
+            criar_spooler_falso(os.path.join(self.workdir, 'bin'), self.args.lp_delay, self.impressoras,
+                                self.args.print_seconds, self.args.fail_printer or ())
+
+        # Dados e cache isolados: o benchmark não toca na instalação local
+        os.environ['KIOSK_DATA_DIR'] = os.path.join(self.workdir, 'data')
+        os.environ['KIOSK_CACHE_DIR'] = os.path.join(self.workdir, 'cache')
+        import server
+        self.server = server
+        server.CONFIG['image_settings']['base_path'] = base_path
+        server.folder_resolver.invalidate()
+        # Só os serviços que as rotas medidas usam (sem verificação de atualizações nem pré-geração)
+        server.photo_index.start()
+        server.change_feed.start()
+        if server.print_queue:
+            # Pausas curtas: com impressoras simuladas o failover precisa acontecer dentro da medição
+            balancer = server.printer_balancer
+            balancer.cooldown = balancer.depth_ttl = balancer.poll_interval = min(1.0, (self.args.print_seconds or 1.0) / 4)
+            server.print_queue.start()
+
+        if self.args.http:
+            from waitress import create_server
+            self._waitress = create_server(server.app, host='127.0.0.1', port=0, threads=self.args.threads)
+            self.porta = self._waitress.effective_port
+            threading.Thread(target=self._waitress.run, name='bench-waitress', daemon=True).start()
+
+    def encerrar(self):
+        if self._waitress:
+            self._waitress.close()
+        if self.server:
+            self.server.photo_index.stop()
+            if self.server.print_queue:
+                self.server.print_queue.stop()
+        if not self.args.keep:
+            shutil.rmtree(self.workdir, ignore_errors=True)
+
+    def novo_cliente(self):
+        if self.args.http:
+            return ClienteHttp(self.porta)
+        return ClienteEmProcesso(self.server.app)
+
+    def requisicao(self, endpoint):
+        """(método, url, corpo) de uma requisição do endpoint, com foto sorteada"""
+        nome = self.rng.choice(self.arquivos)
+        if endpoint == 'api_images':
+            return 'GET', '/api/images', None
+        if endpoint == 'api_images_page':
+            return 'GET', f'/api/images?limit={self.args.page_size}', None
+        if endpoint == 'imagens':
+            return 'GET', f'/imagens/{nome}', None
+        if endpoint == 'thumbs':
+            return 'GET', f'/thumbs/320/{nome}', None
+        if endpoint == 'api_print':
+            return 'POST', '/api/print', {"image_path": nome, "printer_name": self.args.print_target or self.impressoras[0]}
+        raise ValueError(f"Endpoint desconhecido: {endpoint}")
+
+    def medir(self, endpoint):
+        requisicoes = [self.requisicao(endpoint) for _ in range(self.args.warmup + self.args.requests)]
+        aquecimento, medidas = requisicoes[:self.args.warmup], requisicoes[self.args.warmup:]
+        local = threading.local()
+
+        def executar(requisicao):
+            cliente = getattr(local, 'cliente', None)
+            if cliente is None:
+                cliente = local.cliente = self.novo_cliente()
+            inicio = time.perf_counter()
+            try:
+                status, tamanho = cliente.request(*requisicao)
+            except Exception:
+                status, tamanho = 0, 0
+                local.cliente = None
+            return time.perf_counter() - inicio, status, tamanho
+
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            list(executor.map(executar, aquecimento))
+            inicio = time.perf_counter()
+            resultados = list(executor.map(executar, medidas))
+            duracao = time.perf_counter() - inicio
+
+        latencias = sorted(r[0] * 1000 for r in resultados)
+        erros = sum(1 for _, status, _ in resultados if status == 0 or status >= 400)
+        resultado = {
+            "requests": len(resultados),
+            "errors": erros,
+            "rps": round(len(resultados) / duracao, 1) if duracao else None,
+            "p50_ms": round(percentil(latencias, 50), 2),
+            "p95_ms": round(percentil(latencias, 95), 2),
+            "p99_ms": round(percentil(latencias, 99), 2),
+            "max_ms": round(latencias[-1], 2),
+            "mb_per_s": round(sum(r[2] for r in resultados) / duracao / 1e6, 1) if duracao else None
+        }
+        if endpoint == 'api_print':
+            resultado["jobs_per_s"] = self._vazao_impressao(len(aquecimento) + len(medidas), inicio)
+        return resultado
+
+    def _vazao_impressao(self, trabalhos, inicio):
+        """Espera a fila esvaziar e calcula quantos trabalhos por segundo chegaram ao spooler"""
+        fila = self.server.print_queue
+        limite = time.time() + self.args.print_timeout
+        while fila.pending_count() and time.time() < limite:
+            time.sleep(0.05)
+        if fila.pending_count():
+            print(f"Aviso: {fila.pending_count()} trabalhos ainda na fila após {self.args.print_timeout}s")
+            return None
+        # Com impressoras simuladas, conta até a última página sair do spooler falso
+        spool_dir = os.path.join(self.workdir, 'bin', 'spool')
+        fins = [float(nome) for pasta in (os.listdir(spool_dir) if os.path.isdir(spool_dir) else [])
+                for nome in os.listdir(os.path.join(spool_dir, pasta)) if nome != '.lock']
+        if fins:
+            espera = max(fins) - time.time()
+            if espera > 0:
+                time.sleep(espera)
+            for pasta in os.listdir(spool_dir):
+                print(f"  {pasta}: {len(os.listdir(os.path.join(spool_dir, pasta))) - 1} trabalhos")
+        return round(trabalhos / (time.perf_counter() - inicio), 1)
+
+    def executar(self):
+        endpoints = [e.strip() for e in self.args.endpoints.split(',') if e.strip()]
+        resultados = {}
+        for endpoint in endpoints:
+            if endpoint == 'api_print' and (not self.server.print_queue or platform.system() == 'Windows'):
+                print("Aviso: /api/print ignorado (sem módulo de impressão ou sem lp falso no Windows)")
+                continue
+            print(f"Medindo {endpoint} ({self.args.requests} requisições, {self.args.concurrency} clientes)...")
+            resultados[endpoint] = self.medir(endpoint)
+        return resultados
+
+
+def metadados(args):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.now().isoformat(timespec='seconds'),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mode": "http" if args.http else "in-process",
+        "params": {campo: getattr(args, campo) for campo in
+                   ('fotos', 'dias', 'variantes', 'largura', 'altura', 'requests', 'concurrency', 'lp_delay', 'threads',
+                    'printers', 'print_target', 'print_seconds')}
+    }
+
+
+def imprimir_tabela(resultados, baseline=None, limite=10.0):
+    """Mostra os resultados; com baseline inclui a variação e retorna as regressões"""
+    colunas = ('requests', 'errors', 'rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')
+    print()
+    print(f"{'endpoint':<18}" + ''.join(f"{c:>10}" for c in colunas))
+    regressoes = []
+    for endpoint, r in resultados.items():
+        print(f"{endpoint:<18}" + ''.join(f"{r.get(c, '-'):>10}" for c in colunas))
+        if r.get('jobs_per_s') is not None:
+            print(f"{'':<18}  trabalhos entregues ao spooler: {r['jobs_per_s']}/s")
+        anterior = (baseline or {}).get(endpoint)
+        if not anterior:
+            continue
+        variacoes = []
+        for campo in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if not anterior.get(campo) or r.get(campo) is None:
+                continue
+            delta = (r[campo] - anterior[campo]) / anterior[campo] * 100
+            # Para latência, subir é pior; para vazão, cair é pior
+            pior = delta < -limite if campo == 'rps' else delta > limite
+            variacoes.append(f"{campo} {delta:+.1f}%{' !' if pior else ''}")
+            if pior and campo in ('rps', 'p95_ms'):
+                regressoes.append(f"{endpoint} {campo}: {anterior[campo]} -> {r[campo]} ({delta:+.1f}%)")
+        print(f"{'':<18}  vs baseline: {', '.join(variacoes)}")
+    return regressoes
+
+
+def caminho_baseline(nome):
+    return nome if nome.endswith('.json') else os.path.join(BASELINES_DIR, f"{nome}.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark e teste de carga do servidor do quiosque")
+    parser.add_argument("--fotos", type=int, default=300, help="fotos (ids) na pasta do dia")
+    parser.add_argument("--dias", type=int, default=1, help="pastas de data geradas (hoje e anteriores)")
+    parser.add_argument("--variantes", type=int, default=1, help="arquivos por foto (formatos)")
+    parser.add_argument("--largura", type=int, default=1800)
+    parser.add_argument("--altura", type=int, default=1200)
+    parser.add_argument("--endpoints", default=','.join(ENDPOINTS), help=f"lista separada por vírgulas ({', '.join(ENDPOINTS)})")
+    parser.add_argument("--requests", type=int, default=500, help="requisições medidas por endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="requisições de aquecimento (não medidas)")
+    parser.add_argument("--concurrency", type=int, default=8, help="clientes simultâneos")
+    parser.add_argument("--page-size", type=int, default=60, help="limit usado em api_images_page")
+    parser.add_argument("--http", action="store_true", help="mede por HTTP com o waitress em vez do cliente em processo")
+    parser.add_argument("--threads", type=int, default=8, help="threads do waitress (com --http)")
+    parser.add_argument("--lp-delay", type=float, default=0.02, help="tempo de resposta do lp falso, em segundos")
+    parser.add_argument("--print-timeout", type=float, default=120, help="espera máxima para a fila de impressão esvaziar")
+    parser.add_argument("--printers", type=int, default=len(IMPRESSORAS_FALSAS), help="impressoras anunciadas pelo spooler falso")
+    parser.add_argument("--print-target", help="printer_name usado em api_print (padrão: a primeira impressora; ex.: auto-balance)")
+    parser.add_argument("--print-seconds", type=float, default=0.0,
+                        help="tempo de impressão simulado por página (0 = o spooler esvazia na hora)")
+    parser.add_argument("--fail-printer", action="append", metavar="NOME", help="impressora falsa cujo lp sempre falha")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-baseline", metavar="NOME", help="salva os resultados em benchmarks/baselines/NOME.json")
+    parser.add_argument("--compare", metavar="NOME", help="compara com uma baseline salva")
+    parser.add_argument("--threshold", type=float, default=10.0, help="variação (%%) de p95/rps considerada regressão")
+    parser.add_argument("--output", help="salva o relatório completo em JSON")
+    parser.add_argument("--keep", action="store_true", help="mantém a pasta temporária com as fotos geradas")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(caminho_baseline(args.compare), 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        atual = metadados(args)
+        if (baseline.get("params"), baseline.get("mode")) != (atual["params"], atual["mode"]):
+            print("Aviso: a baseline foi gerada com parâmetros diferentes; a comparação pode não ser justa")
+
+    benchmark = Benchmark(args)
+    try:
+        benchmark.preparar()
+        resultados = benchmark.executar()
+    finally:
+        benchmark.encerrar()
+
+    relatorio = dict(metadados(args), results=resultados)
+    regressoes = imprimir_tabela(resultados, baseline["results"] if baseline else None, args.threshold)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=4)
+    if args.save_baseline:
+        destino = caminho_baseline(args.save_baseline)
+        os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+        with open(destino, 'w', encoding='utf-8') as f:
+            json.dump(relatorio, f, indent=4)
+        print(f"\nBaseline salva em {destino}")
+
+    if regressoes:
+        print("\nRegressões acima de {:.0f}%:".format(args.threshold))
+        for regressao in regressoes:
+            print(f"  - {regressao}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Pastas de fotos sintéticas
+Gera pastas ddmmyyyy com arquivos no padrão prefixo_aaaammdd_id.jpg,
+como as da câmera do estúdio, para os benchmarks do servidor
+"""
+
+import argparse
+import os
+import random
+import shutil
+from datetime import datetime, timedelta
+from io import BytesIO
+from typing import Dict, List
+
+from PIL import Image
+
+# Prefixos dos formatos impressos; cada foto pode ter uma variante por formato
+PREFIXOS = ('10x15', '15x21', '20x25')
+
+
+def gerar_jpeg(largura: int, altura: int, qualidade: int = 85, seed: int = 0) -> bytes:
+    """JPEG com ruído (comprime pouco, como uma foto de verdade)"""
+    rng = random.Random(seed)
+    # Ruído em baixa resolução ampliado: mais rápido de gerar e ainda com tamanho realista
+    tamanho = (max(1, largura // 4), max(1, altura // 4))
+    total = tamanho[0] * tamanho[1] * 3
+    pequena = Image.frombytes('RGB', tamanho, rng.getrandbits(total * 8).to_bytes(total, 'little'))
+    imagem = pequena.resize((largura, altura), Image.BILINEAR)
+    buffer = BytesIO()
+    imagem.save(buffer, 'JPEG', quality=qualidade)
+    return buffer.getvalue()
+
+
+def gerar_pastas(base_path: str, dias: int = 1, fotos: int = 200, variantes: int = 1, largura: int = 1800,
+                 altura: int = 1200, qualidade: int = 85, modelos: int = 4, seed: int = 0) -> Dict[str, List[str]]:
+    """Cria `dias` pastas (hoje e os anteriores) com `fotos` ids cada; retorna {pasta: [arquivos]}
+
+    Só `modelos` JPEGs diferentes são codificados; os demais arquivos são cópias deles,
+    o que mantém a geração de milhares de fotos em poucos segundos.
+    """
+    rng = random.Random(seed)
+    conteudos = [gerar_jpeg(largura, altura, qualidade, seed + i) for i in range(max(1, modelos))]
+    hoje = datetime.now()
+    criadas = {}
+    for dia in range(dias):
+        data = hoje - timedelta(days=dia)
+        pasta = os.path.join(base_path, data.strftime("%d%m%Y"))
+        os.makedirs(pasta, exist_ok=True)
+        arquivos = []
+        # Ids no formato hhmmss, crescentes ao longo do dia
+        segundos = sorted(rng.sample(range(8 * 3600, 20 * 3600), min(fotos, 12 * 3600)))
+        for segundo in segundos:
+            id_foto = f"{segundo // 3600:02d}{segundo // 60 % 60:02d}{segundo % 60:02d}"
+            for prefixo in PREFIXOS[:max(1, variantes)]:
+                nome = f"{prefixo}_{data.strftime('%Y%m%d')}_{id_foto}.jpg"
+                with open(os.path.join(pasta, nome), 'wb') as f:
+                    f.write(rng.choice(conteudos))
+                arquivos.append(nome)
+        criadas[pasta] = arquivos
+    return criadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera pastas de fotos sintéticas para os benchmarks")
+    parser.add_argument("destino", help="pasta base onde as pastas ddmmyyyy serão criadas")
+    parser.add_argument("--dias", type=int, default=1, help="quantidade de pastas de data (hoje e anteriores)")
+    parser.add_argument("--fotos", type=int, default=200, help="fotos (ids) por pasta")
+    parser.add_argument("--variantes", type=int, default=1, help=f"arquivos por foto, um por formato (até {len(PREFIXOS)})")
+    parser.add_argument("--largura", type=int, default=1800)
+    parser.add_argument("--altura", type=int, default=1200)
+    parser.add_argument("--qualidade", type=int, default=85)
+    parser.add_argument("--limpar", action="store_true", help="apaga o destino antes de gerar")
+    args = parser.parse_args()
+
+    if args.limpar and os.path.exists(args.destino):
+        shutil.rmtree(args.destino)
+    criadas = gerar_pastas(args.destino, args.dias, args.fotos, args.variantes, args.largura, args.altura, args.qualidade)
+    for pasta, arquivos in criadas.items():
+        print(f"{pasta}: {len(arquivos)} arquivos")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@ import os
 import sys
 import json
 import shutil
+import argparse
 import subprocess
 from datetime import datetime
 
@@ -11,6 +12,16 @@ APP_VERSION = "1.0.0"
 OUTPUT_DIR = "dist"
 BUILD_DIR = "build"
 ICON_PATH = "static/icon.ico"  # Certifique-se de ter um ícone
+COMPILED_TEMPLATES_DIR = "templates_compiled"
+# Fonte única da versão: lida por /api/version, pelo atualizador e pelos slots
+VERSION_FILE = os.path.join("config", "version.json")
+
+# Módulos importados sob demanda (lazy_import): o PyInstaller não os encontra sozinho
+LAZY_IMPORTS = ["waitress", "requests", "PIL.Image", "PIL.ImageOps", "win32api", "win32print"]
+
+# Módulos da biblioteca padrão e extras do Pillow que o quiosque não usa (--trim)
+TRIM_EXCLUDES = ["tkinter", "unittest", "pydoc", "pydoc_data", "lib2to3", "test",
+                 "PIL.ImageTk", "PIL.ImageQt", "PIL.ImageShow"]
 
 # Verifica se o PyInstaller está instalado
 try:
@@ -19,28 +30,44 @@ except ImportError:
     print("PyInstaller não está instalado. Instalando...")
     subprocess.check_call([sys.executable, "-m", "pip", "install", "pyinstaller"])
 
-# Carrega a versão atual do arquivo version.json
+# Carrega a versão atual do arquivo config/version.json
 def load_version():
     try:
-        with open("version.json", "r", encoding="utf-8") as f:
+        with open(VERSION_FILE, "r", encoding="utf-8") as f:
             version_data = json.load(f)
             return version_data.get("version", "1.0.0")
     except (FileNotFoundError, json.JSONDecodeError):
         return "1.0.0"
 
-# Atualiza o arquivo version.json com a nova versão
+# Atualiza o arquivo config/version.json com a nova versão (mantém changelog e demais campos)
 def update_version(version):
-    version_data = {
+    try:
+        with open(VERSION_FILE, "r", encoding="utf-8") as f:
+            version_data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        version_data = {}
+    version_data.update({
         "version": version,
         "build_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "build_number": int(datetime.now().timestamp())
-    }
+    })
+    
+    with open(VERSION_FILE, "w", encoding="utf-8") as f:
+        json.dump(version_data, f, indent=4, ensure_ascii=False)
+
+# Compila os templates Jinja para módulos Python (carregados por ModuleLoader no server.py)
+def precompile_templates():
+    from flask import Flask
     
-    with open("version.json", "w", encoding="utf-8") as f:
-        json.dump(version_data, f, indent=4)
+    if os.path.exists(COMPILED_TEMPLATES_DIR):
+        shutil.rmtree(COMPILED_TEMPLATES_DIR)
+    # Usa o ambiente Jinja do próprio Flask para manter as mesmas regras de autoescape
+    env = Flask(__name__, template_folder=os.path.abspath("templates")).jinja_env
+    env.compile_templates(COMPILED_TEMPLATES_DIR, zip=None, ignore_errors=False)
+    print(f"Templates pré-compilados em {COMPILED_TEMPLATES_DIR}/")
 
 # Cria o executável com PyInstaller
-def build_executable(version):
+def build_executable(version, trim=False, precompile=False):
     print(f"Construindo executável para {APP_NAME} v{version}...")
     
     # Limpa diretórios de build anteriores
@@ -57,6 +84,11 @@ def build_executable(version):
         ("config", "config"),
         ("requirements.txt", ".")
     ]
+    if trim:
+        data_files.remove(("requirements.txt", "."))
+    if precompile:
+        precompile_templates()
+        data_files.append((COMPILED_TEMPLATES_DIR, COMPILED_TEMPLATES_DIR))
     
     # Constrói a string de dados para PyInstaller
     datas_str = ""
@@ -65,7 +97,11 @@ def build_executable(version):
     
     # Comando PyInstaller
     icon_param = f"--icon={ICON_PATH}" if os.path.exists(ICON_PATH) else ""
-    cmd = f"pyinstaller --name=\"{APP_NAME}\" --onefile {icon_param} {datas_str} --windowed server.py"
+    # O executável roda sempre no modo de produção (waitress) e as dependências pesadas
+    # são importadas sob demanda, então todas são declaradas explicitamente
+    hidden_imports = " ".join(f"--hidden-import={modulo}" for modulo in LAZY_IMPORTS)
+    excludes = " ".join(f"--exclude-module={modulo}" for modulo in TRIM_EXCLUDES) if trim else ""
+    cmd = f"pyinstaller --name=\"{APP_NAME}\" --onefile {icon_param} {datas_str} {hidden_imports} {excludes} --windowed server.py"
     
     print(f"Executando comando: {cmd}")
     subprocess.check_call(cmd, shell=True)
@@ -81,6 +117,12 @@ def create_installer(version):
 
 # Função principal
 def main():
+    parser = argparse.ArgumentParser(description=f"Gera o executável do {APP_NAME}")
+    parser.add_argument("--trim", action="store_true", help="exclui do pacote módulos que o quiosque não usa")
+    parser.add_argument("--precompile-templates", action="store_true",
+                        help="inclui os templates Jinja já compilados para acelerar a partida")
+    args = parser.parse_args()
+    
     # Obtém a versão atual ou usa a padrão
     current_version = load_version()
     
@@ -96,7 +138,7 @@ def main():
         version = current_version
     
     # Constrói o executável
-    build_executable(version)
+    build_executable(version, trim=args.trim, precompile=args.precompile_templates)
     
     # Pergunta se deseja criar um instalador
     create_installer_input = input("Deseja criar um instalador? (s/n): ").lower()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Launcher do Kiosk de Fotos
+Executa o servidor do slot ativo (slots/a ou slots/b), reinicia-o quando
+ele pede (troca de versão) e volta ao slot anterior se a nova versão não
+responder depois da troca
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+from modules.slots import RESTART_EXIT_CODE, SlotManager, wait_healthy
+
+# Tempo para a versão recém-ativada responder antes do rollback automático
+TRIAL_TIMEOUT = 60
+
+
+def main():
+    root = os.path.dirname(os.path.abspath(__file__))
+    slots = SlotManager(root)
+    if not slots.is_enabled():
+        print("Criando o slot 'a' a partir da instalação atual...")
+        slots.init_from(root)
+
+    while True:
+        ponteiro = slots.read()
+        slot = ponteiro['active']
+        print(f"Iniciando o slot '{slot}' (versão {slots.slot_version(slot)})")
+        processo = subprocess.Popen(slots.command(slot), cwd=slots.slot_path(slot),
+                                    env=slots.shared_env(KIOSK_LAUNCHER=1))
+
+        if ponteiro.get('trial'):
+            resultado = wait_healthy(slots.server_port(slot), processo, timeout=TRIAL_TIMEOUT)
+            if resultado['healthy']:
+                slots.confirm()
+            else:
+                print(f"Erro: a nova versão não respondeu ({resultado['error']}), voltando ao slot anterior")
+                processo.terminate()
+                processo.wait()
+                if not slots.rollback():
+                    return 1
+                continue
+
+        try:
+            codigo = processo.wait()
+        except KeyboardInterrupt:
+            processo.terminate()
+            processo.wait()
+            return 0
+
+        if codigo == RESTART_EXIT_CODE:
+            # Troca de slot ou rollback pedido pelo servidor
+            time.sleep(0.5)
+            continue
+        return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Limpeza dos caches em disco
+Miniaturas, prévias e arquivos prontos para impressão são derivados das
+fotos e podem ser gerados de novo: o mtime de cada entrada marca o último
+uso, e as entradas sem uso há muito tempo (ou as mais antigas, acima de um
+tamanho máximo) são removidas
+"""
+
+import os
+import time
+from typing import Any, Dict, Iterable
+
+# O mtime de uma entrada marca o último uso; é renovado no máximo uma vez por intervalo
+TOUCH_INTERVAL = 6 * 3600
+
+# Temporários mais velhos que isso sobraram de uma geração interrompida
+STALE_TMP_SECONDS = 3600
+
+
+def touch_entry(caminho: str) -> bool:
+    """Se a entrada existe no cache; renova o mtime de vez em quando para a limpeza saber que ela ainda é usada"""
+    try:
+        mtime = os.stat(caminho).st_mtime
+    except OSError:
+        return False
+    if time.time() - mtime > TOUCH_INTERVAL:
+        try:
+            os.utime(caminho)
+        except OSError:
+            pass
+    return True
+
+
+def prune_dirs(pastas: Iterable[str], max_age_days: float = 0, max_bytes: int = 0) -> Dict[str, Any]:
+    """Remove as entradas sem uso há mais de max_age_days e, acima de max_bytes, as usadas há mais tempo"""
+    resultado = {"removidas": 0, "bytes_liberados": 0, "bytes_em_uso": 0}
+    agora = time.time()
+    limite = agora - max_age_days * 86400 if max_age_days else None
+    entradas = []
+    for raiz in pastas:
+        for pasta, _, nomes in os.walk(raiz):
+            for nome in nomes:
+                caminho = os.path.join(pasta, nome)
+                try:
+                    st = os.stat(caminho)
+                except OSError:
+                    continue
+                if nome.endswith('.tmp'):
+                    # Temporário recente: outra thread ou processo ainda está gravando
+                    if agora - st.st_mtime > STALE_TMP_SECONDS:
+                        _remover(caminho, st.st_size, resultado)
+                elif limite is not None and st.st_mtime < limite:
+                    _remover(caminho, st.st_size, resultado)
+                else:
+                    entradas.append((st.st_mtime, st.st_size, caminho))
+
+    em_uso = sum(tamanho for _, tamanho, _ in entradas)
+    if max_bytes and em_uso > max_bytes:
+        # As usadas há mais tempo saem primeiro
+        entradas.sort()
+        for _, tamanho, caminho in entradas:
+            if em_uso <= max_bytes:
+                break
+            if _remover(caminho, tamanho, resultado):
+                em_uso -= tamanho
+    resultado["bytes_em_uso"] = em_uso
+    return resultado
+
+
+def _remover(caminho, tamanho, resultado):
+    try:
+        os.remove(caminho)
+    except OSError:
+        # Já removido ou aberto por outro processo (Windows): fica para a próxima limpeza
+        return False
+    resultado["removidas"] += 1
+    resultado["bytes_liberados"] += tamanho
+    return True
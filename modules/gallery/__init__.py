@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+Módulo de galeria
+Contém o índice e os utilitários das fotos exibidas no quiosque
+"""
+
+from .catalog import PhotoCatalog, data_da_pasta
+from .change_feed import ChangeFeed
+from .folder_resolver import ImagesFolderResolver
+from .ingest import HotFolderIngest
+from .photo_index import PhotoIndex, agrupar_imagens, extrair_id_foto
+from .thumbnails import PREVIEW_FORMATS, ThumbnailCache, gerar_miniatura
+from .prewarm import PrewarmPool
+from .validation import ValidationCache
+
+__all__ = ['PREVIEW_FORMATS', 'ChangeFeed', 'HotFolderIngest', 'ImagesFolderResolver', 'PhotoCatalog', 'PhotoIndex', 'PrewarmPool', 'ThumbnailCache', 'ValidationCache', 'agrupar_imagens', 'data_da_pasta', 'extrair_id_foto', 'gerar_miniatura']
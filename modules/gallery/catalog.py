@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+"""
+Catálogo de fotos
+Guarda em SQLite todas as fotos de todas as pastas de data (id, tamanho,
+mtime e dimensões), atualizado de forma incremental: só as pastas cujo
+mtime mudou são listadas de novo e só os arquivos novos ou alterados são
+abertos. As consultas por período e por id usam os índices do banco, sem
+tocar no sistema de arquivos
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..startup import lazy_import
+from .photo_index import MTIME_SETTLE_SECONDS, extrair_id_foto
+
+
+def data_da_pasta(pasta: str) -> Optional[str]:
+    """Converte o nome ddmmyyyy da pasta em data ISO (yyyy-mm-dd), ou None se não for uma data"""
+    if len(pasta) != 8 or not pasta.isdigit():
+        return None
+    try:
+        return datetime.strptime(pasta, "%d%m%Y").date().isoformat()
+    except ValueError:
+        return None
+
+
+class PhotoCatalog:
+    """Catálogo persistente das fotos de todas as pastas ddmmyyyy da pasta base"""
+
+    def __init__(self, db_path: str, base_path_getter: Callable[[], str], allowed_extensions: Iterable[str],
+                 poll_interval: float = 10.0):
+        self.db_path = db_path
+        self.base_path_getter = base_path_getter
+        self.allowed_extensions = tuple(ext.lower() for ext in allowed_extensions)
+        self.poll_interval = poll_interval
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._last_sync = None
+        self._init_db()
+
+    def start(self):
+        """Sincroniza em segundo plano (a primeira sincronização pode abrir muitas fotos)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='photo-catalog', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def on_index_change(self, pasta, adicionados, removidos):
+        """Listener do PhotoIndex: a pasta do dia entra no catálogo sem esperar a próxima varredura"""
+        if os.path.dirname(os.path.abspath(pasta)) == os.path.abspath(self.base_path_getter()):
+            self.sync_folder(os.path.basename(pasta))
+
+    def sync(self) -> int:
+        """Sincroniza as pastas de data que mudaram; retorna quantas fotos foram alteradas"""
+        base_path = self.base_path_getter()
+        with self._sync_lock, self._db() as conn:
+            if self._meta(conn, 'base_path') != base_path:
+                # Outra pasta base: o catálogo anterior não vale mais
+                conn.execute("DELETE FROM photos")
+                conn.execute("DELETE FROM folders")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('base_path', ?)", (base_path,))
+            conhecidas = {row['folder']: row['mtime_ns'] for row in conn.execute("SELECT folder, mtime_ns FROM folders")}
+
+        try:
+            pastas = {entry.name: entry for entry in os.scandir(base_path)
+                      if data_da_pasta(entry.name) and entry.is_dir()}
+        except OSError:
+            pastas = {}
+
+        alteradas = 0
+        for pasta, entry in pastas.items():
+            try:
+                mtime_ns = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+            if conhecidas.get(pasta) != mtime_ns:
+                alteradas += self.sync_folder(pasta)
+        for pasta in set(conhecidas) - set(pastas):
+            alteradas += self._remove_folder(pasta)
+        self._last_sync = time.time()
+        return alteradas
+
+    def sync_folder(self, pasta: str) -> int:
+        """Sincroniza uma pasta de data com o disco; retorna quantas fotos mudaram"""
+        data = data_da_pasta(pasta)
+        if data is None:
+            return 0
+        caminho = os.path.join(self.base_path_getter(), pasta)
+        try:
+            mtime_ns = os.stat(caminho).st_mtime_ns
+            entradas = {entry.name: entry.stat() for entry in os.scandir(caminho)
+                        if entry.name.lower().endswith(self.allowed_extensions) and entry.is_file()}
+        except OSError:
+            return self._remove_folder(pasta)
+
+        with self._sync_lock:
+            with self._db() as conn:
+                atuais = {row['name']: (row['size'], row['mtime']) for row in
+                          conn.execute("SELECT name, size, mtime FROM photos WHERE folder = ?", (pasta,))}
+
+            novas = []
+            for nome, st in entradas.items():
+                if atuais.get(nome) == (st.st_size, st.st_mtime):
+                    continue
+                largura, altura = self._dimensions(os.path.join(caminho, nome))
+                novas.append((pasta, data, nome, extrair_id_foto(nome), st.st_size, st.st_mtime, largura, altura))
+            removidas = [(pasta, nome) for nome in set(atuais) - set(entradas)]
+
+            # Diretório alterado há pouco: o mtime pode mudar de novo sem que percebamos (FAT)
+            if time.time() - mtime_ns / 1e9 < MTIME_SETTLE_SECONDS:
+                mtime_ns = None
+            with self._db() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO photos (folder, date, name, id_foto, size, mtime, width, height) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", novas)
+                conn.executemany("DELETE FROM photos WHERE folder = ? AND name = ?", removidas)
+                conn.execute("INSERT OR REPLACE INTO folders (folder, mtime_ns, scanned_at) VALUES (?, ?, ?)",
+                             (pasta, mtime_ns, time.time()))
+        return len(novas) + len(removidas)
+
+    def dates(self) -> List[Dict[str, Any]]:
+        """Datas catalogadas, da mais recente para a mais antiga, com a quantidade de fotos"""
+        with self._db() as conn:
+            return [{"date": row['date'], "folder": row['folder'], "photos": row['photos'], "files": row['files']}
+                    for row in conn.execute(
+                        "SELECT date, folder, COUNT(DISTINCT id_foto) AS photos, COUNT(*) AS files "
+                        "FROM photos GROUP BY date, folder ORDER BY date DESC")]
+
+    def query(self, date_from: Optional[date] = None, date_to: Optional[date] = None, id_foto: Optional[str] = None,
+              limit: int = 100, offset: int = 0) -> Dict[str, Any]:
+        """Fotos (agrupadas por data e id) no período e/ou com o id informado, mais novas primeiro"""
+        condicoes, parametros = [], []
+        if date_from:
+            condicoes.append("date >= ?")
+            parametros.append(date_from.isoformat())
+        if date_to:
+            condicoes.append("date <= ?")
+            parametros.append(date_to.isoformat())
+        if id_foto:
+            condicoes.append("id_foto = ?")
+            parametros.append(id_foto)
+        where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ""
+
+        with self._db() as conn:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM photos {where} GROUP BY date, id_foto)", parametros).fetchone()[0]
+            grupos = conn.execute(
+                f"SELECT date, folder, id_foto, MAX(mtime) AS captured FROM photos {where} "
+                f"GROUP BY date, folder, id_foto ORDER BY date DESC, captured DESC, id_foto LIMIT ? OFFSET ?",
+                parametros + [limit, offset]).fetchall()
+            resultado = []
+            for grupo in grupos:
+                arquivos = conn.execute(
+                    "SELECT name, size, mtime, width, height FROM photos WHERE folder = ? AND id_foto = ? ORDER BY name",
+                    (grupo['folder'], grupo['id_foto'])).fetchall()
+                resultado.append({
+                    "date": grupo['date'],
+                    "folder": grupo['folder'],
+                    "id": grupo['id_foto'],
+                    "captured_at": datetime.fromtimestamp(grupo['captured']).isoformat(timespec='seconds'),
+                    "files": [{"name": row['name'], "size": row['size'], "width": row['width'], "height": row['height']}
+                              for row in arquivos]
+                })
+        return {"groups": resultado, "total": total, "limit": limit, "offset": offset}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._db() as conn:
+            fotos, pastas = conn.execute("SELECT COUNT(*), COUNT(DISTINCT folder) FROM photos").fetchone()
+        return {"files": fotos, "folders": pastas, "last_sync": self._last_sync}
+
+    @staticmethod
+    def _dimensions(caminho):
+        # Só o cabeçalho é lido: Image.open não decodifica a imagem
+        Image = lazy_import('PIL.Image')
+        try:
+            with Image.open(caminho) as img:
+                return img.size
+        except Exception:
+            return None, None
+
+    def _remove_folder(self, pasta):
+        with self._sync_lock, self._db() as conn:
+            removidas = conn.execute("DELETE FROM photos WHERE folder = ?", (pasta,)).rowcount
+            conn.execute("DELETE FROM folders WHERE folder = ?", (pasta,))
+        return removidas
+
+    @staticmethod
+    def _meta(conn, chave):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (chave,)).fetchone()
+        return row['value'] if row else None
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._db() as conn:
+            # WAL: as consultas das rotas não esperam a sincronização terminar
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS photos (
+                    folder TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    id_foto TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    width INTEGER,
+                    height INTEGER,
+                    PRIMARY KEY (folder, name)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_photos_data ON photos (date, id_foto)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_photos_id ON photos (id_foto, date)")
+            conn.execute("CREATE TABLE IF NOT EXISTS folders (folder TEXT PRIMARY KEY, mtime_ns INTEGER, scanned_at REAL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Erro ao atualizar o catálogo de fotos: {str(e)}")
+            self._stop.wait(self.poll_interval)
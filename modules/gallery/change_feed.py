@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Feed de mudanças do índice de fotos
+Transforma cada nova versão do índice em um delta (grupos adicionados,
+alterados e removidos) e guarda os últimos deltas para que clientes do
+stream possam retomar a partir da versão que já conhecem
+"""
+
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+EVENT_DELTA = 'delta'
+EVENT_RESET = 'reset'
+
+
+class ChangeFeed:
+    """Histórico recente de deltas do PhotoIndex, identificados pela versão do índice"""
+
+    def __init__(self, photo_index, max_events: int = 500):
+        self.photo_index = photo_index
+        self._cond = threading.Condition()
+        self._eventos = deque(maxlen=max_events)
+        self._anterior = None
+        # Versão a partir da qual o histórico está completo
+        self._base_version = 0
+        photo_index.add_listener(self.on_index_change)
+
+    @property
+    def version(self) -> int:
+        """Versão do índice refletida no último evento"""
+        anterior = self._anterior
+        return anterior.version if anterior is not None else 0
+
+    def start(self):
+        """Usa o estado atual do índice como base (chamar depois de PhotoIndex.start)"""
+        atual = self.photo_index.snapshot()
+        with self._cond:
+            if self._anterior is None:
+                self._anterior = atual
+                self._base_version = atual.version
+
+    def on_index_change(self, folder, adicionados, removidos):
+        """Listener do PhotoIndex: compara a versão atual com a última vista"""
+        atual = self.photo_index.snapshot()
+        with self._cond:
+            anterior = self._anterior
+            if anterior is not None and atual.version <= anterior.version:
+                return
+            self._anterior = atual
+            if anterior is None:
+                # Primeira varredura: é a base, os clientes a obtêm de /api/images
+                self._base_version = atual.version
+                return
+            evento = self._diff(anterior, atual)
+            if evento is None:
+                return
+            if len(self._eventos) == self._eventos.maxlen:
+                self._base_version = self._eventos[0]['version']
+            self._eventos.append(evento)
+            self._cond.notify_all()
+
+    def events_since(self, version: int) -> Optional[List[Dict[str, Any]]]:
+        """Eventos posteriores a version, ou None se o cliente precisa recarregar tudo"""
+        with self._cond:
+            return self._events_since(version)
+
+    def wait(self, version: int, timeout: float) -> Optional[List[Dict[str, Any]]]:
+        """Como events_since, mas aguarda até timeout segundos por um evento novo"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._events_since(version) != [], timeout=timeout)
+            return self._events_since(version)
+
+    def _events_since(self, version):
+        if version < self._base_version:
+            return None
+        if version > self.version:
+            # Versões publicadas sem mudança nos arquivos (ex.: recuperação de erro)
+            # não geram evento; só uma versão desconhecida exige recarregar
+            return [] if version <= self.photo_index.snapshot().version else None
+        return [evento for evento in self._eventos if evento['version'] > version]
+
+    @staticmethod
+    def _diff(anterior, atual):
+        if anterior.folder != atual.folder:
+            # Outra pasta (virada do dia, nova pasta base): o cliente recarrega a lista
+            return {'type': EVENT_RESET, 'version': atual.version}
+
+        adicionados, alterados = [], []
+        for id_foto, arquivos in atual.groups.items():
+            antes = anterior.groups.get(id_foto)
+            if antes is None:
+                adicionados.append(atual.group(id_foto))
+            elif antes != arquivos or anterior.captured.get(id_foto) != atual.captured.get(id_foto):
+                alterados.append(atual.group(id_foto))
+        removidos = sorted(id_foto for id_foto in anterior.groups if id_foto not in atual.groups)
+
+        if not (adicionados or alterados or removidos):
+            return None
+        return {
+            'type': EVENT_DELTA,
+            'version': atual.version,
+            'added': adicionados,
+            'changed': alterados,
+            'removed': removidos
+        }
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Resolução da pasta de imagens do dia
+Guarda em cache a pasta resolvida para não verificar o disco (e às vezes
+listar a pasta base inteira) a cada imagem servida
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+
+class ImagesFolderResolver:
+    """Resolve a pasta ddmmyyyy do dia (ou a mais recente) com cache
+
+    O cache é invalidado quando o dia muda, quando a pasta base muda e
+    quando check_for_changes() percebe que o conteúdo da pasta base mudou
+    (por exemplo, uma pasta de data nova foi criada).
+    """
+
+    def __init__(self, base_path_getter: Callable[[], str], clock: Callable[[], datetime] = datetime.now):
+        self.base_path_getter = base_path_getter
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._cache = None
+        self._hits = 0
+        self._misses = 0
+        self._fallbacks = 0
+        self._invalidations = 0
+
+    def resolve(self) -> str:
+        """Retorna a pasta de imagens, consultando o disco só quando o cache expira"""
+        base_path = self.base_path_getter()
+        chave = (base_path, self.clock().strftime("%d%m%Y"))
+        cache = self._cache
+        if cache is not None and cache[0] == chave:
+            self._hits += 1
+            return cache[1]
+
+        with self._lock:
+            self._misses += 1
+            base_mtime = self._mtime(base_path)
+            images_dir = self._resolve(*chave)
+            self._cache = (chave, images_dir, base_mtime)
+        return images_dir
+
+    def invalidate(self):
+        """Descarta a pasta em cache (ex.: a pasta base foi alterada)"""
+        with self._lock:
+            self._cache = None
+            self._invalidations += 1
+
+    def check_for_changes(self) -> bool:
+        """Invalida o cache se a pasta base mudou desde a última resolução"""
+        cache = self._cache
+        if cache is None:
+            return False
+        base_path = cache[0][0]
+        if self._mtime(base_path) != cache[2]:
+            self.invalidate()
+            return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores do cache e de quantas vezes o caminho lento foi usado"""
+        cache = self._cache
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "fallbacks": self._fallbacks,
+            "invalidations": self._invalidations,
+            "current": cache[1] if cache else None
+        }
+
+    @staticmethod
+    def _mtime(path) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _resolve(self, base_path, data_formatada):
+        # Verifica se a pasta base existe
+        if not os.path.exists(base_path):
+            print(f"Aviso: Pasta base de imagens não encontrada: {base_path}")
+            return base_path
+
+        # Procura pela pasta com a data do dia
+        images_dir = os.path.join(base_path, data_formatada)
+
+        # Se a pasta do dia não existir, verifica se há outras pastas de data
+        if not os.path.exists(images_dir):
+            self._fallbacks += 1
+            print(f"Aviso: Pasta do dia {data_formatada} não encontrada, procurando outras pastas de data...")
+            try:
+                # Lista todas as pastas na pasta base
+                pastas = [d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d))]
+                # Filtra apenas pastas que parecem ser datas (8 dígitos)
+                pastas_data = [p for p in pastas if p.isdigit() and len(p) == 8]
+
+                if pastas_data:
+                    # Ordena por data mais recente (ddmmyyyy -> yyyymmdd para comparar)
+                    pastas_data.sort(key=lambda p: p[4:] + p[2:4] + p[:2], reverse=True)
+                    images_dir = os.path.join(base_path, pastas_data[0])
+                    print(f"Usando pasta mais recente encontrada: {pastas_data[0]}")
+                else:
+                    print("Nenhuma pasta de data encontrada na pasta base.")
+            except Exception as e:
+                print(f"Erro ao procurar pastas de data: {str(e)}")
+
+        return images_dir
@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+Ingestão de fotos (hot folder)
+Observa pastas de entrada (ou o cartão da câmera), copia em paralelo as
+fotos que pararam de mudar para a pasta ddmmyyyy da data de captura,
+aplicando a orientação EXIF uma única vez, e publica cada arquivo com um
+nome temporário seguido de rename atômico: a listagem e as rotas só veem
+arquivos completos e já na posição de exibição
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from ..metrics import metrics
+from ..startup import lazy_import
+
+# Tags EXIF usadas: orientação, data da foto (IFD Exif) e data do arquivo
+EXIF_ORIENTATION = 0x0112
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_DATETIME = 0x0132
+
+# Erros de leitura (arquivo travado, cartão removido) são tentados de novo até este limite
+MAX_ATTEMPTS = 3
+
+INGEST_SECONDS = metrics.histogram('kiosk_ingest_seconds', 'Duração da ingestão de cada foto (leitura, rotação e cópia)')
+INGEST_FILES = metrics.counter('kiosk_ingest_files_total', 'Fotos processadas pela ingestão, por resultado')
+
+
+class HotFolderIngest:
+    """Copia fotos das pastas de entrada para base_path/ddmmyyyy de forma atômica"""
+
+    def __init__(self, drop_folders: Iterable[str], base_path_getter: Callable[[], str],
+                 allowed_extensions: Iterable[str], db_path: str, workers: int = 4, poll_interval: float = 2.0,
+                 stable_seconds: float = 3.0, delete_source: bool = False, normalize_orientation: bool = True,
+                 jpeg_quality: int = 95, validation_cache=None):
+        self.drop_folders = [os.path.abspath(pasta) for pasta in drop_folders]
+        self.base_path_getter = base_path_getter
+        self.allowed_extensions = tuple(ext.lower() for ext in allowed_extensions)
+        self.db_path = db_path
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stable_seconds = stable_seconds
+        self.delete_source = delete_source
+        self.normalize_orientation = normalize_orientation
+        self.jpeg_quality = jpeg_quality
+        # ValidationCache opcional: a foto é verificada enquanto ainda está no cache do sistema
+        self.validation_cache = validation_cache
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        # caminho -> (tamanho, mtime_ns, visto_desde) dos arquivos ainda mudando ou aguardando
+        self._observados = {}
+        # caminho -> (tamanho, mtime_ns) já ingeridos (ou recusados) nesta versão do arquivo
+        self._concluidos = {}
+        self._em_andamento = set()
+        self._tentativas = {}
+        # Destinos escolhidos e conteúdos (sha256) de cópias ainda em andamento
+        self._reservados = set()
+        self._copiando = {}
+        self._stats = {
+            "copiadas": 0,
+            "rotacionadas": 0,
+            "duplicadas": 0,
+            "falhas": 0,
+            "bytes": 0,
+            "ultima_foto": None,
+            "ultimo_erro": None
+        }
+        self._init_db()
+
+    def start(self):
+        """Carrega o histórico e inicia a observação das pastas de entrada"""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._db() as conn:
+            self._concluidos = {row['source']: (row['size'], row['mtime_ns'])
+                                for row in conn.execute("SELECT source, size, mtime_ns FROM ingested")}
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest')
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='hot-folder', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Interrompe a observação; cópias em andamento terminam normalmente"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        if self._executor:
+            self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["aguardando"] = len(self._observados)
+            stats["em_andamento"] = len(self._em_andamento)
+        stats["pastas"] = self.drop_folders
+        return stats
+
+    def scan(self):
+        """Uma passada pelas pastas de entrada: enfileira os arquivos estáveis"""
+        agora = time.time()
+        vistos = set()
+        for pasta in self.drop_folders:
+            for raiz, diretorios, arquivos in os.walk(pasta):
+                # Pastas ocultas e de sistema do cartão (ex.: .Trashes, MISC) não têm fotos
+                diretorios[:] = [d for d in diretorios if not d.startswith('.')]
+                for nome in arquivos:
+                    if nome.startswith('.') or not nome.lower().endswith(self.allowed_extensions):
+                        continue
+                    caminho = os.path.join(raiz, nome)
+                    vistos.add(caminho)
+                    try:
+                        st = os.stat(caminho)
+                    except OSError:
+                        continue
+                    self._observar(caminho, st, agora)
+
+        with self._lock:
+            # Arquivos que sumiram da pasta de entrada deixam de ser observados
+            for caminho in list(self._observados):
+                if caminho not in vistos:
+                    del self._observados[caminho]
+
+    def _observar(self, caminho, st, agora):
+        versao = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            if self._concluidos.get(caminho) == versao or caminho in self._em_andamento:
+                return
+            anterior = self._observados.get(caminho)
+            if anterior is None or anterior[:2] != versao:
+                # Novo ou ainda sendo gravado: recomeça a contagem
+                self._observados[caminho] = (st.st_size, st.st_mtime_ns, agora)
+                return
+            if agora - anterior[2] < self.stable_seconds or st.st_size == 0:
+                return
+            del self._observados[caminho]
+            self._em_andamento.add(caminho)
+        self._executor.submit(self._processar, caminho, versao)
+
+    def _processar(self, origem, versao):
+        inicio = time.perf_counter()
+        try:
+            resultado = self.ingest(origem, versao)
+        except OSError as e:
+            tentativas = self._tentativas.get(origem, 0) + 1
+            self._tentativas[origem] = tentativas
+            if tentativas >= MAX_ATTEMPTS:
+                resultado = self._falhou(origem, versao, e)
+            else:
+                # Arquivo travado ou cartão removido: tenta de novo na próxima passada
+                print(f"Aviso: Não foi possível ingerir {origem}, nova tentativa em seguida: {str(e)}")
+                resultado = None
+        except Exception as e:
+            resultado = self._falhou(origem, versao, e)
+        else:
+            self._tentativas.pop(origem, None)
+        finally:
+            with self._lock:
+                self._em_andamento.discard(origem)
+        if resultado:
+            INGEST_FILES.inc(result=resultado)
+            INGEST_SECONDS.observe(time.perf_counter() - inicio)
+
+    def _falhou(self, origem, versao, e):
+        print(f"Erro ao ingerir {origem}: {str(e)}")
+        self._tentativas.pop(origem, None)
+        with self._lock:
+            self._stats["falhas"] += 1
+            self._stats["ultimo_erro"] = f"{os.path.basename(origem)}: {str(e)}"
+            # Não insiste em um arquivo inválido enquanto ele não mudar
+            self._concluidos[origem] = versao
+        return 'falha'
+
+    def ingest(self, origem: str, versao=None) -> str:
+        """Ingere um arquivo; retorna 'copiada', 'rotacionada' ou 'duplicada'"""
+        with open(origem, 'rb') as f:
+            dados = f.read()
+        st = os.stat(origem)
+        if versao is not None and (st.st_size, st.st_mtime_ns) != versao:
+            raise OSError("o arquivo mudou durante a leitura")
+        versao = (st.st_size, st.st_mtime_ns)
+        sha256 = hashlib.sha256(dados).hexdigest()
+
+        # Duas cópias do mesmo conteúdo (ex.: a foto repetida em duas pastas) não correm em paralelo
+        while True:
+            with self._lock:
+                outra = self._copiando.get(sha256)
+                if outra is None:
+                    self._copiando[sha256] = threading.Event()
+                    break
+            outra.wait()
+        try:
+            return self._publicar(origem, versao, dados, sha256, st)
+        finally:
+            with self._lock:
+                self._copiando.pop(sha256).set()
+
+    def _publicar(self, origem, versao, dados, sha256, st):
+        existente = self._ja_ingerida(sha256)
+        if existente:
+            self._registrar(origem, versao, existente, sha256)
+            with self._lock:
+                self._stats["duplicadas"] += 1
+            return 'duplicada'
+
+        Image = lazy_import('PIL.Image')
+        try:
+            img = Image.open(BytesIO(dados))
+        except Exception:
+            # UnidentifiedImageError é um OSError, mas não adianta tentar de novo
+            raise ValueError("o arquivo não é uma imagem reconhecida")
+        with img:
+            exif = img.getexif()
+            orientacao = exif.get(EXIF_ORIENTATION, 1)
+            data = self._data_captura(exif, st.st_mtime)
+            rotacionar = self.normalize_orientation and img.format == 'JPEG' and orientacao not in (0, 1)
+
+            pasta = os.path.join(self.base_path_getter(), data.strftime("%d%m%Y"))
+            os.makedirs(pasta, exist_ok=True)
+            destino = self._reservar_destino(pasta, os.path.basename(origem))
+            # O nome temporário não tem extensão de imagem: o índice nunca o lista
+            temporario = os.path.join(pasta, f".{os.path.basename(destino)}.{uuid.uuid4().hex}.part")
+            try:
+                if rotacionar:
+                    self._gravar_rotacionada(img, temporario)
+                else:
+                    self._gravar_copia(dados, sha256, temporario)
+                os.replace(temporario, destino)
+            finally:
+                with self._lock:
+                    self._reservados.discard(destino)
+                if os.path.exists(temporario):
+                    os.remove(temporario)
+
+        self._registrar(origem, versao, destino, sha256)
+        if self.validation_cache:
+            self.validation_cache.check(destino)
+        if self.delete_source:
+            os.remove(origem)
+        with self._lock:
+            self._stats["rotacionadas" if rotacionar else "copiadas"] += 1
+            self._stats["bytes"] += len(dados)
+            self._stats["ultima_foto"] = os.path.basename(destino)
+        return 'rotacionada' if rotacionar else 'copiada'
+
+    def _gravar_copia(self, dados, sha256, temporario):
+        with open(temporario, 'wb') as f:
+            f.write(dados)
+            f.flush()
+            os.fsync(f.fileno())
+        # Confere o que foi gravado antes de publicar
+        with open(temporario, 'rb') as f:
+            if hashlib.sha256(f.read()).hexdigest() != sha256:
+                raise ValueError("checksum da cópia não confere com o original")
+
+    def _gravar_rotacionada(self, img, temporario):
+        ImageOps = lazy_import('PIL.ImageOps')
+        # exif_transpose gira a imagem e remove a tag de orientação do EXIF
+        girada = ImageOps.exif_transpose(img)
+        opcoes = {"quality": self.jpeg_quality, "optimize": True}
+        if girada.info.get('exif'):
+            opcoes["exif"] = girada.info['exif']
+        if img.info.get('icc_profile'):
+            opcoes["icc_profile"] = img.info['icc_profile']
+        with open(temporario, 'wb') as f:
+            girada.save(f, 'JPEG', **opcoes)
+            f.flush()
+            os.fsync(f.fileno())
+        Image = lazy_import('PIL.Image')
+        with Image.open(temporario) as gravada:
+            gravada.verify()
+
+    @staticmethod
+    def _data_captura(exif, mtime) -> datetime:
+        """Data da foto pelo EXIF (DateTimeOriginal, depois DateTime) ou pelo mtime do arquivo"""
+        for valor in (exif.get_ifd(EXIF_IFD).get(EXIF_DATETIME_ORIGINAL), exif.get(EXIF_DATETIME)):
+            try:
+                return datetime.strptime(str(valor).strip('\x00 '), "%Y:%m:%d %H:%M:%S")
+            except (TypeError, ValueError):
+                continue
+        return datetime.fromtimestamp(mtime)
+
+    def _reservar_destino(self, pasta, nome):
+        """Mantém o nome; se já houver outra foto com ele, acrescenta -2, -3... ao id"""
+        destino = os.path.join(pasta, nome)
+        base, extensao = os.path.splitext(nome)
+        contador = 2
+        with self._lock:
+            while os.path.exists(destino) or destino in self._reservados:
+                destino = os.path.join(pasta, f"{base}-{contador}{extensao}")
+                contador += 1
+            self._reservados.add(destino)
+        if contador > 2:
+            print(f"Aviso: {nome} já existe em {pasta} com outro conteúdo, gravando como {os.path.basename(destino)}")
+        return destino
+
+    def _ja_ingerida(self, sha256) -> Optional[str]:
+        """Destino de uma ingestão anterior com o mesmo conteúdo, se o arquivo ainda existir"""
+        with self._db() as conn:
+            for row in conn.execute("SELECT dest FROM ingested WHERE sha256 = ?", (sha256,)):
+                if os.path.exists(row['dest']):
+                    return row['dest']
+        return None
+
+    def _registrar(self, origem, versao, destino, sha256):
+        with self._db() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO ingested (source, size, mtime_ns, dest, sha256, ingested_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (origem, versao[0], versao[1], destino, sha256, time.time())
+            )
+        with self._lock:
+            self._concluidos[origem] = versao
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._db() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingested (
+                    source TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    dest TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    ingested_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ingested_sha256 ON ingested (sha256)")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.scan()
+            except Exception as e:
+                print(f"Erro ao verificar as pastas de entrada: {str(e)}")
+            self._stop.wait(self.poll_interval)
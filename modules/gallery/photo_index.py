@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de fotos em memória
+Mantém a listagem agrupada da pasta do dia atualizada em segundo plano,
+evitando listar o diretório a cada requisição de /api/images
+"""
+
+import base64
+import bisect
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from ..metrics import metrics
+
+# Diretórios alterados há menos tempo que isso são verificados de novo no
+# próximo ciclo (sistemas de arquivos como FAT têm mtime com resolução de 2s)
+MTIME_SETTLE_SECONDS = 2.0
+
+SCAN_SECONDS = metrics.histogram('kiosk_index_scan_seconds', 'Duração das listagens da pasta de fotos')
+
+
+def extrair_id_foto(nome: str) -> str:
+    """Extrai o id da foto a partir do nome (prefixo_xxx_id.jpg)"""
+    partes = nome.split('_')
+    if len(partes) >= 3:
+        return partes[-1].split('.')[0]
+    # Para imagens que não seguem o padrão de nomenclatura
+    return os.path.splitext(nome)[0]
+
+
+def agrupar_imagens(nomes: Iterable[str]) -> Dict[str, List[str]]:
+    """Agrupa nomes de arquivos pelo id da foto, em ordem alfabética"""
+    grupos = {}
+    for nome in sorted(nomes):
+        grupos.setdefault(extrair_id_foto(nome), []).append(nome)
+    return grupos
+
+
+class IndexSnapshot:
+    """Estado imutável do índice em um determinado momento"""
+
+    def __init__(self, folder: str, exists: bool = True, groups: Optional[Dict[str, List[str]]] = None,
+                 version: int = 0, error: Optional[str] = None, captured: Optional[Dict[str, float]] = None):
+        self.folder = folder
+        self.exists = exists
+        self.groups = groups or {}
+        self.version = version
+        self.error = error
+        # Data de captura de cada grupo (mtime mais recente entre seus arquivos)
+        self.captured = captured or {}
+        # Corpo JSON e ETag são calculados uma única vez por versão
+        self.body = json.dumps(self.groups, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.etag = hashlib.sha1(folder.encode('utf-8') + b'\0' + self.body).hexdigest()
+        # Ordem estável para paginação: mais novas primeiro, id como desempate
+        self._keys = sorted((-self.captured.get(id_foto, 0.0), id_foto) for id_foto in self.groups)
+        self.order = [id_foto for _, id_foto in self._keys]
+        # Índice de prefixos para a busca, montado na primeira busca desta versão
+        self._prefixos = None
+
+    def page(self, limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Retorna uma página de grupos a partir do cursor (opaco) informado"""
+        inicio = 0
+        if cursor:
+            inicio = bisect.bisect_right(self._keys, self._decode_cursor(cursor))
+        chaves = self._keys[inicio:inicio + limit]
+        fim = inicio + len(chaves)
+        return {
+            "groups": [self.group(id_foto) for _, id_foto in chaves],
+            "total": len(self._keys),
+            "next_cursor": self._encode_cursor(chaves[-1]) if chaves and fim < len(self._keys) else None,
+            "version": self.version
+        }
+
+    def search(self, termo: str, limit: int = 20) -> Dict[str, Any]:
+        """Grupos cujo id começa com termo (sem diferenciar maiúsculas), em ordem de id"""
+        if self._prefixos is None:
+            self._prefixos = sorted((id_foto.lower(), id_foto) for id_foto in self.groups)
+        termo = termo.strip().lower()
+        if not termo:
+            return {"query": termo, "groups": [], "total": 0, "version": self.version}
+        # Todos os ids com o prefixo ficam entre termo e termo seguido do maior caractere
+        inicio = bisect.bisect_left(self._prefixos, (termo,))
+        fim = bisect.bisect_left(self._prefixos, (termo + '\U0010ffff',), inicio)
+        return {
+            "query": termo,
+            "groups": [self.group(id_foto) for _, id_foto in self._prefixos[inicio:min(fim, inicio + limit)]],
+            "total": fim - inicio,
+            "version": self.version
+        }
+
+    def group(self, id_foto: str) -> Dict[str, Any]:
+        """Representação de um grupo usada pela paginação e pelo stream de mudanças
+
+        sort_key é a chave exata da ordenação (a mesma do cursor), para o cliente
+        posicionar os grupos recebidos pelo stream sem depender do captured_at arredondado.
+        """
+        captura = self.captured.get(id_foto, 0.0)
+        return {
+            "id": id_foto,
+            "files": self.groups[id_foto],
+            "captured_at": datetime.fromtimestamp(captura).isoformat(timespec='seconds'),
+            "sort_key": [-captura, id_foto]
+        }
+
+    @staticmethod
+    def _encode_cursor(chave):
+        return base64.urlsafe_b64encode(json.dumps(list(chave)).encode('utf-8')).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor):
+        try:
+            captura, id_foto = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+            return (float(captura), str(id_foto))
+        except Exception:
+            raise ValueError(f"Cursor inválido: {cursor}")
+
+
+class PhotoIndex:
+    """Índice incremental das fotos da pasta resolvida por folder_resolver"""
+
+    def __init__(self, folder_resolver: Callable[[], str], allowed_extensions: Iterable[str],
+                 poll_interval: float = 1.0):
+        self.folder_resolver = folder_resolver
+        self.allowed_extensions = tuple(ext.lower() for ext in allowed_extensions)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # Uma varredura por vez: uma mais lenta e mais antiga não pode publicar depois de uma mais nova
+        self._refresh_lock = threading.Lock()
+        self._folder = None
+        self._folder_mtime = None
+        self._files = {}
+        self._groups = {}
+        self._version = 0
+        self._snapshot = None
+        self._listeners = []
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add_listener(self, callback: Callable[[str, List[str], List[str]], None]):
+        """Registra callback(pasta, adicionados, removidos) chamado a cada mudança"""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Faz a varredura inicial e inicia a verificação em segundo plano"""
+        if self._thread and self._thread.is_alive():
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='photo-index', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Interrompe a verificação em segundo plano"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def snapshot(self) -> IndexSnapshot:
+        """Retorna o estado atual do índice sem tocar no disco"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Índice ainda não iniciado (ex.: app importado por outro servidor)
+            self.refresh()
+            snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self) -> bool:
+        """Sincroniza o índice com o disco; retorna True se algo mudou
+
+        Chamado ao mesmo tempo pela thread de verificação, pela troca de
+        configuração e por snapshot(); as chamadas são serializadas, e a que
+        espera pela outra normalmente termina só com o stat da pasta.
+        """
+        with self._refresh_lock:
+            return self._refresh()
+
+    def _refresh(self):
+        folder = self.folder_resolver()
+        try:
+            folder_mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return self._set_missing(folder)
+
+        if folder == self._folder and folder_mtime == self._folder_mtime:
+            return False
+
+        inicio = time.perf_counter()
+        try:
+            entradas = {
+                entry.name: entry for entry in os.scandir(folder)
+                if entry.name.lower().endswith(self.allowed_extensions) and entry.is_file()
+            }
+        except OSError as e:
+            with self._lock:
+                self._folder = folder
+                self._folder_mtime = None
+                self._publish(IndexSnapshot(folder, version=self._version + 1, error=str(e)))
+            return True
+
+        # Só considera o mtime estável depois da janela de resolução do sistema de arquivos
+        if time.time() - folder_mtime / 1e9 < MTIME_SETTLE_SECONDS:
+            folder_mtime = None
+
+        with self._lock:
+            pasta_anterior, removidos_anterior = self._folder, []
+            trocou_pasta = folder != pasta_anterior
+            if trocou_pasta:
+                # Virada do dia ou nova pasta base: as fotos da pasta anterior saem do índice
+                removidos_anterior = sorted(self._files)
+                self._files = {}
+                self._groups = {}
+            self._folder = folder
+            self._folder_mtime = folder_mtime
+            adicionados, removidos = self._apply(entradas)
+            # Listagem mais o stat dos arquivos novos: o custo real de cada varredura
+            SCAN_SECONDS.observe(time.perf_counter() - inicio)
+            anterior = self._snapshot
+            publicar = (bool(adicionados or removidos) or trocou_pasta or anterior is None or not anterior.exists
+                        or anterior.error is not None)
+            if publicar:
+                self._publish(self._build_snapshot(folder))
+
+        if removidos_anterior:
+            self._notify(pasta_anterior, [], removidos_anterior)
+        if adicionados or removidos:
+            self._notify(folder, sorted(adicionados), sorted(removidos))
+        return publicar
+
+    def _apply(self, entradas):
+        """Aplica a diferença entre a listagem atual e a conhecida"""
+        atuais = set(self._files)
+        nomes = set(entradas)
+        adicionados = nomes - atuais
+        removidos = atuais - nomes
+
+        for nome in removidos:
+            id_foto, _ = self._files.pop(nome)
+            grupo = self._groups.get(id_foto)
+            if grupo is not None:
+                grupo.remove(nome)
+                if not grupo:
+                    del self._groups[id_foto]
+
+        for nome in adicionados:
+            # Só os arquivos novos precisam de stat (no Windows o scandir já traz o mtime)
+            try:
+                mtime = entradas[nome].stat().st_mtime
+            except OSError:
+                mtime = 0.0
+            id_foto = extrair_id_foto(nome)
+            self._files[nome] = (id_foto, mtime)
+            self._groups.setdefault(id_foto, []).append(nome)
+            self._groups[id_foto].sort()
+
+        return adicionados, removidos
+
+    def _build_snapshot(self, folder):
+        grupos = {id_foto: list(nomes) for id_foto, nomes in self._groups.items()}
+        captura = {}
+        for id_foto, mtime in self._files.values():
+            if mtime > captura.get(id_foto, -1.0):
+                captura[id_foto] = mtime
+        return IndexSnapshot(folder, groups=grupos, version=self._version + 1, captured=captura)
+
+    def _set_missing(self, folder):
+        with self._lock:
+            if self._snapshot is not None and not self._snapshot.exists and self._folder == folder:
+                return False
+            anterior, removidos = self._folder, sorted(self._files)
+            self._folder = folder
+            self._folder_mtime = None
+            self._files = {}
+            self._groups = {}
+            self._publish(IndexSnapshot(folder, exists=False, version=self._version + 1))
+        if removidos:
+            self._notify(anterior, [], removidos)
+        return True
+
+    def _publish(self, snapshot):
+        self._version = snapshot.version
+        self._snapshot = snapshot
+
+    def _notify(self, folder, adicionados, removidos):
+        for callback in self._listeners:
+            try:
+                callback(folder, adicionados, removidos)
+            except Exception as e:
+                print(f"Erro ao notificar mudança no índice de fotos: {str(e)}")
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Erro ao atualizar o índice de fotos: {str(e)}")
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+Pré-geração de miniaturas e prévias
+Processa em segundo plano as fotos recém-chegadas, para que o primeiro
+cliente a abrir a galeria depois de uma leva de fotos não pague o custo
+de redimensionamento na thread da requisição. Quando a fila esvazia, a
+mesma thread limpa periodicamente os caches em disco (ThumbnailCache.prune
+e os registrados com add_prunable, como as impressões renderizadas)
+"""
+
+import bisect
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable
+
+from .thumbnails import ThumbnailCache, gerar_miniatura
+
+
+def _processar_foto(origem, derivados):
+    """Executado nos processos de trabalho: gera os derivados que faltam"""
+    inicio = time.perf_counter()
+    for destino, tamanho, qualidade, progressive in derivados:
+        if not os.path.exists(destino):
+            gerar_miniatura(origem, destino, tamanho, qualidade, progressive)
+    return time.perf_counter() - inicio
+
+
+class PrewarmPool:
+    """Pool de processos que gera miniaturas e prévias, priorizando as fotos mais novas"""
+
+    def __init__(self, thumbnail_cache: ThumbnailCache, workers: int = None, max_queue: int = 1000,
+                 prune_interval: float = 3600):
+        self.thumbnail_cache = thumbnail_cache
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_queue = max_queue
+        # Intervalo entre limpezas do cache; 0 desativa
+        self.prune_interval = prune_interval
+        self._proxima_limpeza = 0.0
+        # (nome, cache com prune(), max_age_days e max_bytes) limpos no mesmo ciclo
+        self._caches = [("miniaturas", thumbnail_cache)]
+        # Fila ordenada por (-mtime, seq): a foto mais nova fica no início
+        self._fila = []
+        self._pendentes = set()
+        self._seq = itertools.count()
+        self._em_execucao = 0
+        self._cond = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._running = False
+        self._stats = {
+            "enfileiradas": 0,
+            "descartadas": 0,
+            "concluidas": 0,
+            "falhas": 0,
+            "tempo_processamento_total": 0.0,
+            "tempo_processamento_max": 0.0,
+            "latencia_total": 0.0,
+            "latencia_max": 0.0,
+            "cache_removidas": 0,
+            "cache_bytes_liberados": 0,
+            "cache_bytes_em_uso": None,
+        }
+
+    def start(self):
+        """Cria o pool de processos e a thread que distribui o trabalho"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._thread = threading.Thread(target=self._run, name='prewarm-dispatcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Descarta a fila e encerra o pool de processos"""
+        with self._cond:
+            self._running = False
+            self._fila.clear()
+            self._pendentes.clear()
+            self._cond.notify_all()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+
+    def submit(self, caminhos: Iterable[str]):
+        """Enfileira fotos para pré-geração; as mais antigas saem quando a fila enche"""
+        with self._cond:
+            for caminho in caminhos:
+                if caminho in self._pendentes:
+                    continue
+                try:
+                    mtime = os.stat(caminho).st_mtime
+                except OSError:
+                    continue
+                bisect.insort(self._fila, (-mtime, next(self._seq), caminho, time.perf_counter()))
+                self._pendentes.add(caminho)
+                self._stats["enfileiradas"] += 1
+
+            # Fila limitada: as fotos mais antigas são geradas sob demanda, se alguém pedir
+            while len(self._fila) > self.max_queue:
+                descartada = self._fila.pop()
+                self._pendentes.discard(descartada[2])
+                self._stats["descartadas"] += 1
+            self._cond.notify_all()
+
+    def add_prunable(self, nome: str, cache):
+        """Inclui outro cache em disco na limpeza periódica"""
+        self._caches.append((nome, cache))
+
+    def on_index_change(self, pasta, adicionados, removidos):
+        """Callback para PhotoIndex.add_listener"""
+        if adicionados:
+            self.submit(os.path.join(pasta, nome) for nome in adicionados)
+
+    def stats(self):
+        """Métricas de fila e de latência por imagem"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["fila"] = len(self._fila)
+            stats["em_execucao"] = self._em_execucao
+            stats["workers"] = self.workers
+        concluidas = stats["concluidas"] or 1
+        stats["tempo_processamento_medio"] = stats["tempo_processamento_total"] / concluidas
+        stats["latencia_media"] = stats["latencia_total"] / concluidas
+        return stats
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and (not self._fila or self._em_execucao >= self.workers):
+                    espera = self._tempo_ate_limpeza()
+                    if not self._fila and espera == 0:
+                        break
+                    # Com a fila vazia, acorda a tempo da próxima limpeza
+                    self._cond.wait(None if self._fila else espera)
+                if not self._running:
+                    return
+                if not self._fila:
+                    caminho = None
+                else:
+                    _, _, caminho, enfileirada_em = self._fila.pop(0)
+                    self._pendentes.discard(caminho)
+
+            if caminho is None:
+                self._limpar_cache()
+                continue
+
+            try:
+                derivados = [d for d in self.thumbnail_cache.derivatives(caminho) if not os.path.exists(d[0])]
+            except OSError:
+                # Arquivo removido enquanto aguardava na fila
+                continue
+            if not derivados:
+                continue
+
+            with self._cond:
+                self._em_execucao += 1
+            try:
+                future = self._executor.submit(_processar_foto, caminho, derivados)
+            except RuntimeError:
+                # Pool encerrado
+                return
+            future.add_done_callback(lambda f, inicio=enfileirada_em, origem=caminho: self._concluir(f, inicio, origem))
+
+    def _tempo_ate_limpeza(self):
+        if not self.prune_interval or not any(cache.max_age_days or cache.max_bytes for _, cache in self._caches):
+            return None
+        return max(0.0, self._proxima_limpeza - time.monotonic())
+
+    def _limpar_cache(self):
+        self._proxima_limpeza = time.monotonic() + self.prune_interval
+        em_uso = 0
+        for nome, cache in self._caches:
+            if not (cache.max_age_days or cache.max_bytes):
+                continue
+            try:
+                resultado = cache.prune()
+            except Exception as e:
+                print(f"Erro ao limpar o cache de {nome}: {str(e)}")
+                continue
+            if resultado["removidas"]:
+                print(f"Cache de {nome}: {resultado['removidas']} entradas removidas "
+                      f"({resultado['bytes_liberados'] / 1048576:.1f} MB)")
+            em_uso += resultado["bytes_em_uso"]
+            with self._cond:
+                self._stats["cache_removidas"] += resultado["removidas"]
+                self._stats["cache_bytes_liberados"] += resultado["bytes_liberados"]
+        with self._cond:
+            self._stats["cache_bytes_em_uso"] = em_uso
+
+    def _concluir(self, future, enfileirada_em, origem):
+        with self._cond:
+            self._em_execucao -= 1
+            try:
+                duracao = future.result()
+            except Exception as e:
+                self._stats["falhas"] += 1
+                print(f"Erro ao pré-gerar miniaturas de {os.path.basename(origem)}: {str(e)}")
+            else:
+                latencia = time.perf_counter() - enfileirada_em
+                self._stats["concluidas"] += 1
+                self._stats["tempo_processamento_total"] += duracao
+                self._stats["tempo_processamento_max"] = max(self._stats["tempo_processamento_max"], duracao)
+                self._stats["latencia_total"] += latencia
+                self._stats["latencia_max"] = max(self._stats["latencia_max"], latencia)
+            self._cond.notify_all()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de miniaturas
+Gera miniaturas e prévias em tamanho de tela das fotos com Pillow e as
+guarda em disco, indexadas por uma chave derivada do arquivo de origem
+(caminho, tamanho e mtime). As prévias são JPEG progressivo ou WebP.
+Entradas sem uso há muito tempo são removidas por prune(), e o cache pode
+ter um tamanho máximo em bytes
+"""
+
+import hashlib
+import os
+import uuid
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from ..disk_cache import prune_dirs, touch_entry
+from ..startup import lazy_import
+
+# Formatos das prévias: extensão no cache e tipo MIME enviado ao navegador
+PREVIEW_FORMATS = {'jpeg': ('.jpg', 'image/jpeg'), 'webp': ('.webp', 'image/webp')}
+
+# Subpastas do cache_dir que pertencem ao cache (só elas são limpas)
+CACHE_KINDS = ('thumbs', 'previews')
+
+
+def gerar_miniatura(origem: str, destino: str, tamanho: Union[int, Tuple[int, int]], qualidade: int = 80,
+                    progressive: bool = False) -> str:
+    """Gera um JPEG (ou WebP, se destino terminar em .webp) de origem cabendo em tamanho"""
+    caixa = tuple(tamanho) if isinstance(tamanho, (tuple, list)) else (tamanho, tamanho)
+    # Pillow só é carregado quando a primeira miniatura é gerada
+    Image = lazy_import('PIL.Image')
+    ImageOps = lazy_import('PIL.ImageOps')
+    with Image.open(origem) as img:
+        if img.format == 'JPEG':
+            # Decodifica o JPEG já reduzido (1/2, 1/4, 1/8), bem mais rápido que o tamanho cheio
+            img.draft('RGB', caixa)
+        img = ImageOps.exif_transpose(img)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail(caixa, Image.LANCZOS)
+
+        # Grava em arquivo temporário e renomeia, para nunca servir uma miniatura pela metade
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = f"{destino}.{uuid.uuid4().hex}.tmp"
+        try:
+            if destino.endswith('.webp'):
+                img.save(temporario, 'WEBP', quality=qualidade, method=4)
+            else:
+                # JPEG progressivo aparece inteiro (em baixa qualidade) antes de terminar de carregar
+                img.save(temporario, 'JPEG', quality=qualidade, optimize=True, progressive=progressive)
+            os.replace(temporario, destino)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+    return destino
+
+
+class ThumbnailCache:
+    """Cache em disco de miniaturas em tamanhos pré-definidos e de prévias de tela"""
+
+    def __init__(self, cache_dir: str, sizes: Iterable[int] = (160, 320), quality: int = 80,
+                 preview_size: Iterable[int] = (1920, 1080), preview_quality: int = 85,
+                 preview_formats: Iterable[str] = ('webp', 'jpeg'), max_age_days: float = 0,
+                 max_bytes: int = 0):
+        self.cache_dir = cache_dir
+        self.sizes = tuple(int(size) for size in sizes)
+        self.quality = quality
+        self.preview_size = tuple(int(lado) for lado in preview_size)
+        self.preview_quality = preview_quality
+        # Ordem de preferência; JPEG fica sempre disponível para navegadores sem WebP
+        formatos = [formato.lower() for formato in preview_formats if formato.lower() in PREVIEW_FORMATS]
+        self._preview_formats = tuple(formatos) + (() if 'jpeg' in formatos else ('jpeg',))
+        self._suportados = None
+        # Limites aplicados por prune(); 0 = sem limite
+        self.max_age_days = max_age_days or 0
+        self.max_bytes = max_bytes or 0
+
+    def cache_path(self, origem: str, tamanho: int) -> str:
+        """Caminho da miniatura no cache; muda sempre que a origem é alterada"""
+        return self._path(origem, 'thumbs', str(tamanho), self.quality)
+
+    def preview_path(self, origem: str, formato: str = 'jpeg') -> str:
+        """Caminho da prévia em tamanho de tela no cache"""
+        largura, altura = self.preview_size
+        return self._path(origem, 'previews', f"{largura}x{altura}", self.preview_quality, PREVIEW_FORMATS[formato][0])
+
+    @property
+    def preview_formats(self) -> Tuple[str, ...]:
+        """Formatos de prévia em ordem de preferência, só os que o Pillow consegue gravar"""
+        if self._suportados is None:
+            # Pillow compilado sem libwebp não grava WebP
+            features = lazy_import('PIL.features')
+            self._suportados = tuple(f for f in self._preview_formats if f == 'jpeg' or features.check(f))
+        return self._suportados
+
+    def negotiate_preview(self, accepted) -> str:
+        """Escolhe o formato da prévia a partir dos tipos MIME aceitos pelo navegador"""
+        for formato in self.preview_formats:
+            if formato == 'jpeg' or PREVIEW_FORMATS[formato][1] in accepted:
+                return formato
+        return 'jpeg'
+
+    def get(self, origem: str, tamanho: int) -> str:
+        """Retorna o caminho da miniatura, gerando-a se ainda não existir"""
+        if tamanho not in self.sizes:
+            raise ValueError(f"Tamanho de miniatura não suportado: {tamanho}")
+        destino = self.cache_path(origem, tamanho)
+        if not touch_entry(destino):
+            gerar_miniatura(origem, destino, tamanho, self.quality)
+        return destino
+
+    def get_preview(self, origem: str, formato: str = 'jpeg') -> str:
+        """Retorna o caminho da prévia, gerando-a se ainda não existir"""
+        destino = self.preview_path(origem, formato)
+        if not touch_entry(destino):
+            gerar_miniatura(origem, destino, self.preview_size, self.preview_quality, progressive=True)
+        return destino
+
+    def derivatives(self, origem: str, sizes: Iterable[int] = None, preview_format: Optional[str] = None):
+        """Lista (destino, tamanho, qualidade, progressivo) de todos os derivados de uma foto
+
+        Só a prévia no formato preferido é incluída: é a que os quiosques vão pedir.
+        """
+        derivados = [(self.cache_path(origem, tamanho), tamanho, self.quality, False) for tamanho in (sizes or self.sizes)]
+        formato = preview_format or self.preview_formats[0]
+        derivados.append((self.preview_path(origem, formato), self.preview_size, self.preview_quality, True))
+        return derivados
+
+    def prune(self) -> Dict[str, Any]:
+        """Remove as entradas sem uso há mais de max_age_days e, se o cache passar de max_bytes, as usadas há mais tempo"""
+        return prune_dirs([os.path.join(self.cache_dir, tipo) for tipo in CACHE_KINDS], self.max_age_days, self.max_bytes)
+
+    def _path(self, origem, tipo, rotulo, qualidade, extensao='.jpg'):
+        st = os.stat(origem)
+        chave = f"{os.path.abspath(origem)}|{st.st_size}|{st.st_mtime_ns}|{rotulo}|{qualidade}"
+        digest = hashlib.sha256(chave.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, tipo, rotulo, digest[:2], f"{digest}{extensao}")
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de validação das fotos
+Guarda em SQLite o resultado do Image.verify() de cada arquivo, indexado por
+(caminho, tamanho, mtime). A impressão consulta o cache em vez de ler a foto
+inteira a cada pedido; as fotos novas são verificadas em segundo plano assim
+que chegam (ingestão ou índice) e as corrompidas ficam marcadas na listagem
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+from ..metrics import metrics
+from ..startup import lazy_import
+
+VERIFY_SECONDS = metrics.histogram('kiosk_image_verify_seconds', 'Duração das verificações de integridade das fotos')
+VALIDATION_LOOKUPS = metrics.counter('kiosk_validation_cache_lookups_total', 'Consultas ao cache de validação das fotos')
+
+
+def verificar_imagem(caminho: str) -> Optional[str]:
+    """Lê a imagem inteira com Image.verify(); retorna a mensagem de erro ou None se estiver íntegra"""
+    Image = lazy_import('PIL.Image')
+    inicio = time.perf_counter()
+    try:
+        with Image.open(caminho) as img:
+            img.verify()
+        return None
+    except Exception as e:
+        return f"Invalid image file: {str(e)}"
+    finally:
+        VERIFY_SECONDS.observe(time.perf_counter() - inicio)
+
+
+class ValidationCache:
+    """Resultado persistente de Image.verify() por (caminho, tamanho, mtime)"""
+
+    def __init__(self, db_path: str, workers: int = 4):
+        self.db_path = db_path
+        self.workers = workers
+        self._lock = threading.Lock()
+        # caminho -> (tamanho, mtime_ns, erro); carregado sob demanda do banco
+        self._resultados = {}
+        # caminho -> (tamanho, mtime_ns) da versão do arquivo que falhou na verificação
+        self._corrompidas = {}
+        self._pendentes = set()
+        self._executor = None
+        # Muda sempre que o conjunto de fotos corrompidas muda (entra no ETag da listagem)
+        self.version = 0
+        self._stats = {"verificadas": 0, "acertos": 0, "corrompidas": 0}
+        self._init_db()
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-verify')
+
+    def stop(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._pendentes.clear()
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def check(self, caminho: str) -> Optional[str]:
+        """Mensagem de erro da foto (None se íntegra), verificando só se o arquivo mudou desde a última vez"""
+        try:
+            st = os.stat(caminho)
+        except OSError:
+            return f"Image file not found: {caminho}"
+        chave = os.path.abspath(caminho)
+        VALIDATION_LOOKUPS.inc()
+        conhecido = self._lookup(chave)
+        if conhecido is not None and conhecido[:2] == (st.st_size, st.st_mtime_ns):
+            with self._lock:
+                self._stats["acertos"] += 1
+            return conhecido[2]
+        erro = verificar_imagem(caminho)
+        self._store(chave, st.st_size, st.st_mtime_ns, erro)
+        return erro
+
+    def validate(self, caminho: str):
+        """Como Printer.validate_image: levanta ValueError se a foto estiver corrompida"""
+        erro = self.check(caminho)
+        if erro:
+            raise ValueError(erro)
+
+    def check_many(self, caminhos: Iterable[str]) -> Dict[str, Optional[str]]:
+        """Verifica várias fotos em paralelo; retorna {caminho: mensagem de erro ou None}"""
+        caminhos = list(caminhos)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(zip(caminhos, executor.map(self.check, caminhos)))
+
+    def submit(self, caminhos: Iterable[str]) -> bool:
+        """Agenda a verificação em segundo plano (as fotos já conhecidas só custam um stat)
+
+        Retorna False se o pool não estiver rodando (nada é agendado).
+        """
+        with self._lock:
+            if self._executor is None:
+                return False
+            for caminho in caminhos:
+                if caminho in self._pendentes:
+                    continue
+                self._pendentes.add(caminho)
+                self._executor.submit(self._verificar_em_segundo_plano, caminho)
+        return True
+
+    def verify_folder(self, pasta: str, extensions: Iterable[str]) -> int:
+        """Agenda a verificação de todas as fotos de uma pasta; retorna quantas foram enviadas"""
+        extensions = tuple(ext.lower() for ext in extensions)
+        try:
+            caminhos = [entry.path for entry in os.scandir(pasta)
+                        if entry.name.lower().endswith(extensions) and entry.is_file()]
+        except OSError:
+            return 0
+        self.submit(caminhos)
+        return len(caminhos)
+
+    def on_index_change(self, pasta, adicionados, removidos):
+        """Listener do PhotoIndex: verifica as fotos novas antes de alguém pedir para imprimi-las"""
+        if adicionados:
+            self.submit(os.path.join(pasta, nome) for nome in adicionados)
+
+    def is_corrupt(self, caminho: str) -> bool:
+        """Se a foto está corrompida; só as já marcadas custam um stat
+
+        Uma foto marcada que mudou desde a verificação é verificada de novo em
+        segundo plano e continua marcada até o resultado sair (a listagem muda
+        de ETag quando a marcação cai).
+        """
+        chave = os.path.abspath(caminho)
+        with self._lock:
+            versao = self._corrompidas.get(chave)
+        if versao is None:
+            return False
+        try:
+            st = os.stat(caminho)
+        except OSError:
+            return False
+        if versao == (st.st_size, st.st_mtime_ns):
+            return True
+        # O arquivo mudou desde a verificação (por exemplo, ainda estava sendo copiado)
+        if self.submit([caminho]):
+            return True
+        # Sem o pool (serviços parados) só resta verificar aqui mesmo
+        return self.check(caminho) is not None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["fila"] = len(self._pendentes)
+            stats["corrompidas_conhecidas"] = len(self._corrompidas)
+            stats["workers"] = self.workers
+        return stats
+
+    def _verificar_em_segundo_plano(self, caminho):
+        try:
+            self.check(caminho)
+        except Exception as e:
+            print(f"Erro ao verificar a foto {caminho}: {str(e)}")
+        finally:
+            with self._lock:
+                self._pendentes.discard(caminho)
+
+    def _lookup(self, chave):
+        with self._lock:
+            conhecido = self._resultados.get(chave)
+        if conhecido is not None:
+            return conhecido
+        with self._db() as conn:
+            row = conn.execute("SELECT size, mtime_ns, error FROM validations WHERE path = ?", (chave,)).fetchone()
+        if row is None:
+            return None
+        conhecido = (row['size'], row['mtime_ns'], row['error'])
+        with self._lock:
+            self._resultados[chave] = conhecido
+        return conhecido
+
+    def _store(self, chave, tamanho, mtime_ns, erro):
+        with self._db() as conn:
+            conn.execute("INSERT OR REPLACE INTO validations (path, size, mtime_ns, error, checked_at) "
+                         "VALUES (?, ?, ?, ?, ?)", (chave, tamanho, mtime_ns, erro, time.time()))
+        with self._lock:
+            self._resultados[chave] = (tamanho, mtime_ns, erro)
+            self._stats["verificadas"] += 1
+            if erro:
+                self._stats["corrompidas"] += 1
+            if erro:
+                if self._corrompidas.get(chave) != (tamanho, mtime_ns):
+                    self._corrompidas[chave] = (tamanho, mtime_ns)
+                    self.version += 1
+            elif self._corrompidas.pop(chave, None) is not None:
+                self.version += 1
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._db() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS validations (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    error TEXT,
+                    checked_at REAL NOT NULL
+                )
+            """)
+            # As corrompidas já conhecidas continuam marcadas na listagem depois de reiniciar
+            self._corrompidas = {row['path']: (row['size'], row['mtime_ns']) for row in
+                                 conn.execute("SELECT path, size, mtime_ns FROM validations WHERE error IS NOT NULL")}
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Cache HTTP
+Envio de arquivos com ETag forte, Last-Modified, suporte a Range e
+Cache-Control, além das impressões digitais usadas nas URLs de /static
+"""
+
+import hashlib
+import os
+import threading
+from typing import Optional
+
+from flask import abort, send_file
+from werkzeug.security import safe_join
+
+# Arquivos com impressão digital na URL nunca mudam: cache de um ano
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def strong_etag(st: os.stat_result) -> str:
+    """ETag forte derivado de (inode, tamanho, mtime)"""
+    return f"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+def send_cached_file(directory: str, filename: str, max_age: int = 0, immutable: bool = False,
+                     mimetype: Optional[str] = None):
+    """Envia um arquivo com validação condicional (304), Range (206) e Cache-Control"""
+    path = safe_join(directory, filename)
+    if path is None:
+        abort(404)
+    return send_cached_path(path, max_age=max_age, immutable=immutable, mimetype=mimetype)
+
+
+def send_cached_path(path: str, max_age: int = 0, immutable: bool = False, mimetype: Optional[str] = None):
+    """Como send_cached_file, para um caminho já validado"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        abort(404)
+    if not os.path.isfile(path):
+        abort(404)
+
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        etag=strong_etag(st),
+        last_modified=st.st_mtime,
+        max_age=max_age,
+        conditional=True
+    )
+    if max_age <= 0:
+        # Sem max-age o navegador sempre revalida, mas ainda recebe 304 se nada mudou
+        response.cache_control.no_cache = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+class StaticFingerprints:
+    """Calcula (e guarda em cache) o hash do conteúdo dos arquivos estáticos"""
+
+    def __init__(self, static_dir: str, length: int = 12):
+        self.static_dir = static_dir
+        self.length = length
+        self._lock = threading.Lock()
+        self._cache = {}
+
+    def get(self, filename: str) -> Optional[str]:
+        """Impressão digital do arquivo ou None se ele não existir"""
+        path = safe_join(self.static_dir, filename)
+        if path is None:
+            return None
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        chave = (st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached and cached[0] == chave:
+                return cached[1]
+
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for bloco in iter(lambda: f.read(65536), b''):
+                sha.update(bloco)
+        fingerprint = sha.hexdigest()[:self.length]
+        with self._lock:
+            self._cache[path] = (chave, fingerprint)
+        return fingerprint
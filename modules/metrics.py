@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas internas
+Contadores, medidores e histogramas dos caminhos críticos (rotas, varredura
+da pasta, imagens servidas, spooler), exportados no formato texto do
+Prometheus em /api/metrics
+"""
+
+import bisect
+import math
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+# Limites (em segundos) usados pelos histogramas de duração
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(valor) -> str:
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pares = list(labels) + ([extra] if extra else [])
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escape(valor)}"' for nome, valor in pares) + '}'
+
+
+def _format_value(valor: float) -> str:
+    if valor == math.inf:
+        return '+Inf'
+    if float(valor).is_integer():
+        return str(int(valor))
+    return repr(float(valor))
+
+
+class Metric:
+    """Base das métricas: nome, descrição e valores por conjunto de rótulos"""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values = {}
+
+    @staticmethod
+    def _key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(sorted((nome, str(valor)) for nome, valor in labels.items()))
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        yield from self._samples()
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            valores = sorted(self._values.items())
+        for labels, valor in valores:
+            yield f"{self.name}{_format_labels(labels)} {_format_value(valor)}"
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, valor: float = 1, **labels):
+        chave = self._key(labels)
+        with self._lock:
+            self._values[chave] = self._values.get(chave, 0) + valor
+
+    def summary(self) -> Any:
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(Metric):
+    """Medidor; com callback o valor é lido no momento da coleta"""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, help: str, callback: Optional[Callable[[], float]] = None):
+        super().__init__(name, help)
+        self.callback = callback
+
+    def set(self, valor: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = valor
+
+    def _samples(self) -> Iterable[str]:
+        if self.callback is None:
+            yield from super()._samples()
+            return
+        valor = self._collect()
+        if valor is not None:
+            yield f"{self.name} {_format_value(valor)}"
+
+    def _collect(self):
+        try:
+            return self.callback()
+        except Exception as e:
+            print(f"Aviso: Não foi possível coletar a métrica {self.name}: {str(e)}")
+            return None
+
+    def summary(self) -> Any:
+        if self.callback is not None:
+            return self._collect()
+        with self._lock:
+            return sum(self._values.values()) if self._values else None
+
+
+class CallbackCounter(Gauge):
+    """Contador mantido por outro componente (ex.: estatísticas do resolvedor de pastas)"""
+
+    kind = 'counter'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valor: float, **labels):
+        chave = self._key(labels)
+        posicao = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            estado = self._values.get(chave)
+            if estado is None:
+                # [contagem por faixa (a última é +Inf), soma, total]
+                estado = self._values[chave] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            estado[0][posicao] += 1
+            estado[1] += valor
+            estado[2] += 1
+
+    def _samples(self) -> Iterable[str]:
+        with self._lock:
+            valores = sorted((labels, (list(estado[0]), estado[1], estado[2])) for labels, estado in self._values.items())
+        for labels, (faixas, soma, total) in valores:
+            acumulado = 0
+            for limite, quantidade in zip(self.buckets + (math.inf,), faixas):
+                acumulado += quantidade
+                yield f"{self.name}_bucket{_format_labels(labels, ('le', _format_value(limite)))} {acumulado}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(soma)}"
+            yield f"{self.name}_count{_format_labels(labels)} {total}"
+
+    def summary(self) -> Dict[str, Any]:
+        """Totais por conjunto de rótulos, com média e p95 estimado pelas faixas"""
+        with self._lock:
+            valores = {labels: (list(estado[0]), estado[1], estado[2]) for labels, estado in self._values.items()}
+        resumo = {}
+        for labels, (faixas, soma, total) in sorted(valores.items()):
+            chave = ' '.join(valor for _, valor in labels) or 'total'
+            resumo[chave] = {
+                "count": total,
+                "avg_ms": round(soma / total * 1000, 2) if total else None,
+                "p95_ms": self._quantile(faixas, total, 0.95)
+            }
+        return resumo
+
+    def _quantile(self, faixas, total, q):
+        # Limite superior da faixa que contém o quantil (a mesma aproximação do histogram_quantile)
+        if not total:
+            return None
+        alvo = q * total
+        acumulado = 0
+        for limite, quantidade in zip(self.buckets + (math.inf,), faixas):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return round(limite * 1000, 2) if limite != math.inf else None
+        return None
+
+
+class MetricsRegistry:
+    """Conjunto de métricas do processo; registrar o mesmo nome de novo devolve a existente"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    def counter(self, name: str, help: str, callback: Optional[Callable[[], float]] = None) -> Metric:
+        if callback is not None:
+            return self._register(name, lambda: CallbackCounter(name, help, callback))
+        return self._register(name, lambda: Counter(name, help))
+
+    def gauge(self, name: str, help: str, callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._register(name, lambda: Gauge(name, help, callback))
+
+    def histogram(self, name: str, help: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Todas as métricas no formato de exposição do Prometheus (text/plain; version=0.0.4)"""
+        with self._lock:
+            metricas = [self._metrics[nome] for nome in sorted(self._metrics)]
+        linhas = []
+        for metrica in metricas:
+            linhas.extend(metrica.render())
+        return '\n'.join(linhas) + '\n'
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumo em JSON para o painel administrativo"""
+        with self._lock:
+            metricas = [self._metrics[nome] for nome in sorted(self._metrics)]
+        return {metrica.name: metrica.summary() for metrica in metricas}
+
+    def _register(self, name, factory):
+        with self._lock:
+            metrica = self._metrics.get(name)
+            if metrica is None:
+                metrica = self._metrics[name] = factory()
+            return metrica
+
+
+metrics = MetricsRegistry()
@@ -1,9 +1,22 @@
 # -*- coding: utf-8 -*-
 """
 Módulo de impressora
-Contém configurações e utilitários para impressão
+Contém configurações, utilitários e a fila de impressão
 """
 
 from .printer_config import PrinterConfig
 
-__all__ = ['PrinterConfig']
\ No newline at end of file
+__all__ = ['PrinterConfig']
+
+# A impressão depende do Pillow e, no Windows, do pywin32; sem eles apenas
+# as configurações ficam disponíveis
+try:
+    from .printer import Printer
+    from .print_queue import PrintQueue
+    from .print_renderer import PrintRenderer
+    from .printer_balancer import AUTO_BALANCE, PrinterBalancer
+    from .printer_registry import PrinterRegistry, get_printer_registry
+    __all__ += ['AUTO_BALANCE', 'Printer', 'PrintQueue', 'PrintRenderer', 'PrinterBalancer', 'PrinterRegistry',
+                'get_printer_registry']
+except ImportError:
+    pass
\ No newline at end of file
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Fila de impressão persistente
+Guarda os trabalhos em SQLite e os envia ao spooler em segundo plano,
+com uma thread por impressora e novas tentativas com backoff exponencial.
+Os trabalhos enviados a 'auto-balance' ficam numa fila compartilhada que
+os workers das impressoras ociosas atendem, com failover entre elas
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from .printer import PrinterUnavailableError
+from .printer_balancer import AUTO_BALANCE
+
+STATUS_QUEUED = 'queued'
+STATUS_PRINTING = 'printing'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+# Erros que não se resolvem tentando de novo (arquivo inválido, impressora inexistente)
+ERROS_DEFINITIVOS = (FileNotFoundError, ValueError)
+
+
+class PrintQueue:
+    """Fila de trabalhos de impressão com um worker por impressora"""
+
+    def __init__(self, db_path: str, printer_factory: Callable[[], Any], max_attempts: int = 5,
+                 retry_delay: float = 5.0, max_retry_delay: float = 300.0, balancer=None):
+        self.db_path = db_path
+        self.printer_factory = printer_factory
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        # PrinterBalancer opcional: sem ele, 'auto-balance' vira 'auto'
+        self.balancer = balancer
+        self._lock = threading.Lock()
+        self._workers = {}
+        self._eventos = {}
+        # Impressoras cujo worker está enviando um trabalho agora
+        self._ocupadas = set()
+        self._running = False
+        self._init_db()
+
+    def start(self):
+        """Retoma trabalhos interrompidos e inicia os workers das impressoras com pendências"""
+        self._running = True
+        with self._db() as conn:
+            # Trabalhos que estavam sendo impressos quando o app parou voltam para a fila
+            conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                         (STATUS_QUEUED, time.time(), STATUS_PRINTING))
+            impressoras = [row['printer_name'] for row in conn.execute(
+                "SELECT DISTINCT printer_name FROM jobs WHERE status = ?", (STATUS_QUEUED,))]
+        for printer_name in impressoras:
+            self._ensure_worker(printer_name)
+
+    def stop(self):
+        """Sinaliza o encerramento dos workers"""
+        self._running = False
+        for evento in list(self._eventos.values()):
+            evento.set()
+
+    def submit(self, image_path: str, printer_name: str = 'auto') -> Dict[str, Any]:
+        """Enfileira uma impressão e retorna o trabalho criado"""
+        return self._insert(image_path, printer_name, None)
+
+    def submit_batch(self, items: List[Dict[str, Any]], printer_name: str = 'auto') -> Dict[str, Any]:
+        """Enfileira várias imagens ({"image_path", "copies"}) como um único trabalho"""
+        if not items:
+            raise ValueError("Nenhuma imagem para imprimir")
+        itens = [{"image_path": item["image_path"], "copies": max(1, int(item.get("copies", 1)))} for item in items]
+        return self._insert(itens[0]["image_path"], printer_name, itens)
+
+    def _insert(self, image_path, printer_name, items):
+        printer_name = printer_name or 'auto'
+        if printer_name == AUTO_BALANCE and self.balancer is None:
+            printer_name = 'auto'
+        agora = time.time()
+        job_id = uuid.uuid4().hex
+        with self._db() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, image_path, items, printer_name, status, attempts, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (job_id, image_path, json.dumps(items) if items else None, printer_name, STATUS_QUEUED, agora, agora, agora)
+            )
+        if self._running:
+            self._ensure_worker(printer_name)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Retorna o estado de um trabalho ou None se não existir"""
+        with self._db() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def pending_count(self, printer_name: str = None) -> int:
+        """Quantidade de trabalhos aguardando ou em impressão"""
+        query = "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)"
+        params = [STATUS_QUEUED, STATUS_PRINTING]
+        if printer_name is not None:
+            query += " AND printer_name = ?"
+            params.append(printer_name)
+        with self._db() as conn:
+            return conn.execute(query, params).fetchone()[0]
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with self._db() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    image_path TEXT NOT NULL,
+                    items TEXT,
+                    printer_name TEXT NOT NULL,
+                    printer TEXT,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    result TEXT,
+                    error TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_fila ON jobs (printer_name, status, next_attempt_at)")
+            # Bancos criados antes dos trabalhos em lote não têm a coluna items
+            colunas = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'items' not in colunas:
+                conn.execute("ALTER TABLE jobs ADD COLUMN items TEXT")
+
+    def _ensure_worker(self, printer_name):
+        if printer_name == AUTO_BALANCE and self.balancer:
+            # A fila compartilhada é atendida pelos workers das impressoras do balanceamento
+            for nome in self.balancer.printers():
+                self._ensure_worker(nome)
+            return
+        with self._lock:
+            worker = self._workers.get(printer_name)
+            if worker is None or not worker.is_alive():
+                self._eventos[printer_name] = threading.Event()
+                worker = threading.Thread(target=self._run, args=(printer_name,),
+                                          name=f'print-queue-{printer_name}', daemon=True)
+                self._workers[printer_name] = worker
+                worker.start()
+            self._eventos[printer_name].set()
+
+    def _claim(self, printer_name):
+        """Marca o próximo trabalho pronto como em impressão; retorna (job, espera)"""
+        agora = time.time()
+        with self._lock, self._db() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE printer_name = ? AND status = ? ORDER BY next_attempt_at, created_at LIMIT 1",
+                (printer_name, STATUS_QUEUED)
+            ).fetchone()
+            if row is None:
+                return None, None
+            if row['next_attempt_at'] > agora:
+                return None, row['next_attempt_at'] - agora
+            # A condição no status torna a reserva atômica entre processos (vários workers do WSGI)
+            reservado = conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? WHERE id = ? AND status = ?",
+                (STATUS_PRINTING, agora, row['id'], STATUS_QUEUED)
+            ).rowcount
+            if not reservado:
+                return None, 0
+            job = dict(row)
+            job['attempts'] += 1
+            return job, None
+
+    def _claim_shared(self, printer_name):
+        """Reserva o próximo trabalho de 'auto-balance' se esta for a impressora ociosa mais folgada"""
+        agora = time.time()
+        with self._db() as conn:
+            row = conn.execute(
+                "SELECT next_attempt_at FROM jobs WHERE printer_name = ? AND status = ? ORDER BY next_attempt_at, created_at LIMIT 1",
+                (AUTO_BALANCE, STATUS_QUEUED)
+            ).fetchone()
+        if row is None:
+            return None, None
+        if row['next_attempt_at'] > agora:
+            return None, row['next_attempt_at'] - agora
+
+        # A escolha consulta o spooler: fica fora do lock para não travar as outras impressoras
+        with self._lock:
+            ociosas = [nome for nome in self.balancer.printers() if nome not in self._ocupadas]
+        escolhida = self.balancer.choose(ociosas)
+        if escolhida is None:
+            # Todas com o spooler cheio ou em pausa: confere de novo quando a fila do spooler for reconsultada
+            return None, self.balancer.depth_ttl
+        if escolhida != printer_name:
+            self._ensure_worker(escolhida)
+            return None, self.balancer.poll_interval
+
+        with self._lock, self._db() as conn:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE printer_name = ? AND status = ? AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at, created_at LIMIT 1",
+                (AUTO_BALANCE, STATUS_QUEUED, agora)
+            ).fetchone()
+            if row is None:
+                return None, 0
+            reservado = conn.execute(
+                "UPDATE jobs SET status = ?, printer = ?, attempts = attempts + 1, updated_at = ? WHERE id = ? AND status = ?",
+                (STATUS_PRINTING, printer_name, agora, row['id'], STATUS_QUEUED)
+            ).rowcount
+            if not reservado:
+                return None, 0
+            # As outras impressoras ociosas disputam o próximo trabalho sem esperar o poll_interval
+            for nome in ociosas:
+                if nome != printer_name and nome in self._eventos:
+                    self._eventos[nome].set()
+            job = dict(row)
+            job['attempts'] += 1
+            job['printer'] = printer_name
+            return job, None
+
+    def _run(self, printer_name):
+        evento = self._eventos[printer_name]
+        while self._running:
+            evento.clear()
+            job, espera = self._claim(printer_name)
+            if job is None and self.balancer and printer_name in self.balancer.printers():
+                # Fila própria vazia: ajuda a esvaziar a fila compartilhada
+                job, espera_compartilhada = self._claim_shared(printer_name)
+                if espera is None or (espera_compartilhada is not None and espera_compartilhada < espera):
+                    espera = espera_compartilhada
+            if job is None:
+                # Sem trabalhos prontos: aguarda um novo envio ou a próxima tentativa agendada
+                evento.wait(timeout=espera if espera is not None else 60)
+                continue
+            with self._lock:
+                self._ocupadas.add(printer_name)
+            try:
+                self._process(job)
+            finally:
+                with self._lock:
+                    self._ocupadas.discard(printer_name)
+
+    def _process(self, job):
+        destino = job['printer_name']
+        if destino == AUTO_BALANCE:
+            destino = job['printer'] or 'auto'
+        try:
+            printer = self.printer_factory()
+            if job['items']:
+                result = printer.print_batch(json.loads(job['items']), destino)
+            else:
+                result = printer.print_image(job['image_path'], destino)
+        except Exception as e:
+            if self.balancer and not self._erro_do_trabalho(e) and destino in self.balancer.printers():
+                self.balancer.record_failure(destino, e)
+            self._fail(job, e)
+            return
+        if self.balancer:
+            self.balancer.record_sent(result.get('printer', destino))
+        self._update(job['id'], status=STATUS_DONE, printer=result.get('printer', destino),
+                     result=json.dumps(result), error=None)
+
+    @staticmethod
+    def _erro_do_trabalho(erro):
+        """Erro do próprio trabalho (arquivo ausente ou inválido), que nenhuma impressora resolveria"""
+        return isinstance(erro, ERROS_DEFINITIVOS) and not isinstance(erro, PrinterUnavailableError)
+
+    def _fail(self, job, erro):
+        mensagem = str(erro)
+        if (job['printer_name'] == AUTO_BALANCE and self.balancer and not self._erro_do_trabalho(erro)
+                and job['attempts'] < self.max_attempts):
+            # Failover: volta já para a fila compartilhada e outra impressora saudável o pega
+            print(f"Erro na impressão {job['id']} em {job['printer']} (tentativa {job['attempts']}), "
+                  f"redirecionando para outra impressora: {mensagem}")
+            self._update(job['id'], status=STATUS_QUEUED, printer=None, error=mensagem, next_attempt_at=time.time())
+            self._ensure_worker(AUTO_BALANCE)
+            return
+        if isinstance(erro, ERROS_DEFINITIVOS) or job['attempts'] >= self.max_attempts:
+            print(f"Erro definitivo na impressão {job['id']}: {mensagem}")
+            self._update(job['id'], status=STATUS_FAILED, error=mensagem)
+            return
+        # Backoff exponencial: retry_delay, 2x, 4x... limitado a max_retry_delay
+        espera = min(self.max_retry_delay, self.retry_delay * (2 ** (job['attempts'] - 1)))
+        print(f"Erro na impressão {job['id']} (tentativa {job['attempts']}), nova tentativa em {espera:.0f}s: {mensagem}")
+        self._update(job['id'], status=STATUS_QUEUED, error=mensagem, next_attempt_at=time.time() + espera)
+
+    def _update(self, job_id, **campos):
+        campos['updated_at'] = time.time()
+        atribuicoes = ', '.join(f"{campo} = ?" for campo in campos)
+        with self._db() as conn:
+            conn.execute(f"UPDATE jobs SET {atribuicoes} WHERE id = ?", (*campos.values(), job_id))
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        for campo in ('created_at', 'updated_at', 'next_attempt_at'):
+            job[campo] = datetime.fromtimestamp(job[campo]).isoformat()
+        job['image'] = os.path.basename(job.pop('image_path'))
+        if job['items']:
+            job['items'] = [{"image": os.path.basename(item["image_path"]), "copies": item["copies"]}
+                            for item in json.loads(job['items'])]
+        return job
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Renderização para impressão
+Converte a foto original em um arquivo pronto para o spooler, já no
+tamanho do papel, com margens, escala e modo de cor aplicados, e guarda
+o resultado em cache para reimpressões e cópias (limpo por prune())
+"""
+
+import hashlib
+import json
+import os
+import uuid
+from typing import Any, Dict, Tuple
+
+from ..disk_cache import prune_dirs, touch_entry
+from ..startup import lazy_import
+
+# Tamanhos de papel em milímetros (largura x altura, retrato)
+PAPER_SIZES_MM = {
+    'A4': (210.0, 297.0),
+    'A5': (148.0, 210.0),
+    'A6': (105.0, 148.0),
+    'Letter': (215.9, 279.4),
+    '10x15': (102.0, 152.0),
+    '13x18': (127.0, 178.0),
+    '15x20': (152.0, 203.0),
+}
+
+# Resolução de saída para cada qualidade configurada
+QUALITY_DPI = {
+    'draft': 150,
+    'normal': 200,
+    'high': 300,
+}
+
+MM_POR_POLEGADA = 25.4
+
+
+class PrintRenderer:
+    """Gera e mantém em cache as versões prontas para impressão das fotos"""
+
+    def __init__(self, cache_dir: str, jpeg_quality: int = 95, max_age_days: float = 0, max_bytes: int = 0):
+        self.cache_dir = cache_dir
+        self.jpeg_quality = jpeg_quality
+        # Limites aplicados por prune(); 0 = sem limite
+        self.max_age_days = max_age_days or 0
+        self.max_bytes = max_bytes or 0
+
+    def render(self, image_path: str, options: Dict[str, Any]) -> str:
+        """Retorna o arquivo pronto para impressão, renderizando-o se necessário"""
+        destino = self.cache_path(image_path, options)
+        if not touch_entry(destino):
+            self._render(image_path, destino, options)
+        return destino
+
+    def prune(self) -> Dict[str, Any]:
+        """Remove os arquivos sem uso há mais de max_age_days e, acima de max_bytes, os usados há mais tempo"""
+        return prune_dirs([os.path.join(self.cache_dir, 'prints')], self.max_age_days, self.max_bytes)
+
+    def cache_path(self, image_path: str, options: Dict[str, Any]) -> str:
+        """Caminho no cache, indexado por (hash da imagem, hash das opções)"""
+        st = os.stat(image_path)
+        imagem = f"{os.path.abspath(image_path)}|{st.st_size}|{st.st_mtime_ns}"
+        opcoes = json.dumps(self._render_options(options), sort_keys=True)
+        hash_imagem = hashlib.sha256(imagem.encode('utf-8')).hexdigest()[:32]
+        hash_opcoes = hashlib.sha256(opcoes.encode('utf-8')).hexdigest()[:16]
+        extensao = 'pdf' if self._output_format(options) == 'pdf' else 'jpg'
+        return os.path.join(self.cache_dir, 'prints', hash_imagem[:2], f"{hash_imagem}_{hash_opcoes}.{extensao}")
+
+    def _render_options(self, options):
+        """Apenas as opções que afetam o resultado entram na chave do cache"""
+        return {
+            'paperSize': options.get('paperSize', 'A4'),
+            'orientation': options.get('orientation', 'portrait'),
+            'quality': options.get('quality', 'high'),
+            'margins': options.get('margins', {}),
+            'scale': options.get('scale', 'fit_to_page'),
+            'colorMode': options.get('colorMode', 'color'),
+            'outputFormat': self._output_format(options),
+            'jpegQuality': self.jpeg_quality,
+        }
+
+    @staticmethod
+    def _output_format(options):
+        return 'pdf' if str(options.get('outputFormat', 'jpeg')).lower() == 'pdf' else 'jpeg'
+
+    def _page_size(self, options, dpi, imagem_paisagem) -> Tuple[int, int]:
+        largura_mm, altura_mm = PAPER_SIZES_MM.get(options.get('paperSize'), PAPER_SIZES_MM['A4'])
+        orientacao = options.get('orientation', 'portrait')
+        if orientacao == 'landscape' or (orientacao == 'auto' and imagem_paisagem):
+            largura_mm, altura_mm = altura_mm, largura_mm
+        return self._mm_to_px(largura_mm, dpi), self._mm_to_px(altura_mm, dpi)
+
+    @staticmethod
+    def _mm_to_px(mm, dpi):
+        return int(round(mm / MM_POR_POLEGADA * dpi))
+
+    def _render(self, image_path, destino, options):
+        Image = lazy_import('PIL.Image')
+        ImageOps = lazy_import('PIL.ImageOps')
+        dpi = QUALITY_DPI.get(options.get('quality'), QUALITY_DPI['high'])
+        margens = options.get('margins') or {}
+
+        with Image.open(image_path) as img:
+            dpi_original = img.info.get('dpi', (300, 300))[0] or 300
+            largura_origem, altura_origem = img.size
+            pagina = self._page_size(options, dpi, largura_origem > altura_origem)
+
+            # Área útil descontando as margens (em mm)
+            esquerda = self._mm_to_px(margens.get('left', 0), dpi)
+            direita = self._mm_to_px(margens.get('right', 0), dpi)
+            topo = self._mm_to_px(margens.get('top', 0), dpi)
+            base = self._mm_to_px(margens.get('bottom', 0), dpi)
+            area = (max(1, pagina[0] - esquerda - direita), max(1, pagina[1] - topo - base))
+
+            if img.format == 'JPEG':
+                # Decodifica já reduzido quando a foto é bem maior que a área de impressão
+                # (o lado maior cobre a área em qualquer rotação EXIF)
+                img.draft('RGB', (max(area), max(area)))
+            img = ImageOps.exif_transpose(img)
+            img = img.convert('L' if options.get('colorMode') in ('grayscale', 'monochrome') else 'RGB')
+
+            escala = options.get('scale', 'fit_to_page')
+            if escala == 'fill_page':
+                img = ImageOps.fit(img, area, Image.LANCZOS)
+            elif escala == 'actual_size':
+                # Tamanho físico do arquivo original (pelo dpi dele), respeitando a rotação EXIF
+                fator = dpi / dpi_original
+                lados = sorted((largura_origem, altura_origem), reverse=img.width >= img.height)
+                img = img.resize((max(1, int(lados[0] * fator)), max(1, int(lados[1] * fator))), Image.LANCZOS)
+                img = ImageOps.fit(img, (min(area[0], img.width), min(area[1], img.height)), Image.LANCZOS)
+            else:
+                img = ImageOps.contain(img, area, Image.LANCZOS)
+
+            # Centraliza a foto na área útil da página
+            pagina_img = Image.new(img.mode, pagina, 255 if img.mode == 'L' else (255, 255, 255))
+            x = esquerda + (area[0] - img.width) // 2
+            y = topo + (area[1] - img.height) // 2
+            pagina_img.paste(img, (x, y))
+
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = f"{destino}.{uuid.uuid4().hex}.tmp"
+        try:
+            if self._output_format(options) == 'pdf':
+                pagina_img.save(temporario, 'PDF', resolution=float(dpi))
+            else:
+                pagina_img.save(temporario, 'JPEG', quality=self.jpeg_quality, dpi=(dpi, dpi))
+            os.replace(temporario, destino)
+        finally:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        return destino
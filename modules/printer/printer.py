@@ -0,0 +1,195 @@
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ..metrics import metrics
+from ..startup import lazy_import
+from .printer_registry import get_printer_registry
+
+SPOOLER_SECONDS = metrics.histogram('kiosk_spooler_call_seconds', 'Duração das chamadas ao spooler (lp ou ShellExecute)')
+SPOOLER_ERRORS = metrics.counter('kiosk_spooler_errors_total', 'Chamadas ao spooler que falharam')
+
+
+class PrinterUnavailableError(ValueError):
+    """A impressora pedida não existe no sistema (o auto-balance tenta outra)"""
+
+
+class Printer:
+    def __init__(self, config, registry=None, renderer=None, print_options=None, validation_cache=None):
+        self.config = config
+        # A descoberta de impressoras é compartilhada e fica em cache
+        self.registry = registry or get_printer_registry(config.get('discovery_ttl'))
+        # Renderizador opcional que aplica as opções do PrinterConfig antes do spooler
+        self.renderer = renderer
+        self.print_options = print_options or {}
+        # Cache opcional (ValidationCache) que evita reler a foto inteira a cada impressão
+        self.validation_cache = validation_cache
+    
+    @property
+    def available_printers(self):
+        return self._get_available_printers()
+        
+    def _get_available_printers(self):
+        """Lista todas as impressoras disponíveis"""
+        return self.registry.available_printers()
+    
+    def print_image(self, image_path, printer_name=None):
+        """Imprime uma imagem na impressora especificada"""
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+        
+        printer_name = self._resolve_printer(printer_name)
+        
+        # Valida a imagem
+        if self.validation_cache:
+            self.validation_cache.validate(image_path)
+        else:
+            self.validate_image(image_path)
+        
+        image_path = self._prepare(image_path)
+        
+        # Comando de impressão específico por SO
+        if platform.system() == 'Windows':
+            return self._print_windows(image_path, printer_name)
+        else:
+            return self._print_unix(image_path, printer_name)
+    
+    def print_batch(self, items, printer_name=None):
+        """Imprime várias imagens (com cópias) como um único trabalho no spooler
+        
+        items: lista de dicionários {"image_path": ..., "copies": N}, já validados
+        """
+        printer_name = self._resolve_printer(printer_name)
+        
+        arquivos = []
+        for item in items:
+            if not os.path.exists(item["image_path"]):
+                raise FileNotFoundError(f"Image file not found: {item['image_path']}")
+            arquivos.append((self._prepare(item["image_path"]), max(1, int(item.get("copies", 1)))))
+        
+        if platform.system() == 'Windows':
+            # O ShellExecute não agrupa arquivos: envia um por cópia
+            for image_path, copies in arquivos:
+                for _ in range(copies):
+                    self._print_windows(image_path, printer_name)
+            return {
+                "status": "sent",
+                "printer": printer_name,
+                "system": "windows",
+                "pages": sum(copies for _, copies in arquivos)
+            }
+        
+        copias = {copies for _, copies in arquivos}
+        if len(copias) == 1:
+            # Mesma quantidade para todas: um trabalho com lp -n
+            return self._print_unix([image_path for image_path, _ in arquivos], printer_name, copias.pop())
+        # Quantidades diferentes: repete cada arquivo no mesmo trabalho
+        return self._print_unix([image_path for image_path, copies in arquivos for _ in range(copies)], printer_name)
+    
+    @staticmethod
+    def validate_image(image_path):
+        """Verifica se o arquivo é uma imagem íntegra"""
+        # Pillow só é carregado na primeira validação
+        Image = lazy_import('PIL.Image')
+        try:
+            with Image.open(image_path) as img:
+                img.verify()
+        except Exception as e:
+            raise ValueError(f"Invalid image file: {str(e)}")
+    
+    @classmethod
+    def validate_images(cls, image_paths, max_workers=4, validation_cache=None):
+        """Valida várias imagens em paralelo; retorna {caminho: mensagem de erro ou None}"""
+        if validation_cache:
+            return validation_cache.check_many(image_paths)
+        
+        def validar(image_path):
+            if not os.path.exists(image_path):
+                return f"Image file not found: {image_path}"
+            try:
+                cls.validate_image(image_path)
+            except ValueError as e:
+                return str(e)
+            return None
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return dict(zip(image_paths, executor.map(validar, image_paths)))
+    
+    def _resolve_printer(self, printer_name):
+        """Resolve 'auto' para a impressora padrão e confere se ela existe"""
+        printer_name = printer_name or self.config.get('default_printer')
+        if printer_name == 'auto':
+            printer_name = self._get_default_printer()
+        
+        # Verifica se a impressora existe (consultando o sistema de novo se o cache estiver desatualizado)
+        if printer_name not in self.available_printers:
+            self.registry.refresh()
+            if printer_name not in self.available_printers:
+                raise PrinterUnavailableError(f"Printer not available: {printer_name}")
+        return printer_name
+    
+    def _prepare(self, image_path):
+        """Entrega ao spooler a versão já renderizada para o papel, se houver renderizador"""
+        if not self.renderer:
+            return image_path
+        try:
+            return self.renderer.render(image_path, self.print_options)
+        except Exception as e:
+            print(f"Aviso: falha ao renderizar para impressão, usando o arquivo original: {str(e)}")
+            return image_path
+    
+    def _print_windows(self, image_path, printer_name):
+        """Imprime no Windows"""
+        # O pywin32 só existe (e só é necessário) no Windows
+        win32api = lazy_import('win32api')
+        inicio = time.perf_counter()
+        try:
+            win32api.ShellExecute(
+                0,
+                "print",
+                image_path,
+                f'/d:"{printer_name}"',
+                ".",
+                0
+            )
+            return {
+                "status": "sent",
+                "printer": printer_name,
+                "system": "windows"
+            }
+        except Exception as e:
+            SPOOLER_ERRORS.inc(system="windows")
+            raise RuntimeError(f"Windows print error: {str(e)}")
+        finally:
+            SPOOLER_SECONDS.observe(time.perf_counter() - inicio, system="windows")
+    
+    def _print_unix(self, image_path, printer_name, copies=1):
+        """Imprime em sistemas Unix-like (Linux/Mac); aceita um ou vários arquivos"""
+        inicio = time.perf_counter()
+        try:
+            cmd = ['lp', '-d', printer_name]
+            if copies > 1:
+                cmd += ['-n', str(copies)]
+            cmd += image_path if isinstance(image_path, list) else [image_path]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            
+            if result.returncode != 0:
+                raise RuntimeError(result.stderr)
+            
+            return {
+                "status": "sent",
+                "printer": printer_name,
+                "system": "unix",
+                "job_id": result.stdout.strip()
+            }
+        except Exception as e:
+            SPOOLER_ERRORS.inc(system="unix")
+            raise RuntimeError(f"Unix print error: {str(e)}")
+        finally:
+            SPOOLER_SECONDS.observe(time.perf_counter() - inicio, system="unix")
+    
+    def _get_default_printer(self):
+        """Obtém a impressora padrão do sistema"""
+        return self.registry.default_printer()
\ No newline at end of file
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Balanceamento entre impressoras
+Escolhe, para os trabalhos enviados a 'auto-balance', a impressora saudável
+com a menor espera estimada (fila do spooler x duração recente por trabalho)
+e tira de circulação, por um tempo crescente, as impressoras que falham
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .printer_registry import consultar_filas_spooler, get_printer_registry
+
+# Destino especial: o trabalho vai para a impressora menos ocupada
+AUTO_BALANCE = 'auto-balance'
+
+
+class PrinterBalancer:
+    """Estado de carga e de saúde das impressoras usadas pelo auto-balance"""
+
+    def __init__(self, registry=None, printers: Iterable[str] = None, max_spooler_depth: int = 2,
+                 depth_ttl: float = 2.0, cooldown: float = 30.0, max_cooldown: float = 600.0,
+                 default_duration: float = 15.0, poll_interval: float = 1.0):
+        self.registry = registry or get_printer_registry()
+        # Lista fixa de impressoras do balanceamento; vazia = todas as disponíveis
+        self.printers_config = list(printers or [])
+        self.max_spooler_depth = max_spooler_depth
+        self.depth_ttl = depth_ttl
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.default_duration = default_duration
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        # impressora -> {"falhas_seguidas", "pausada_ate", "duracao_media", "amostras", "enviados", "falhas", "ultimo_erro"}
+        self._estado = {}
+        # impressora -> (profundidade, último trabalho visto saindo da fila)
+        self._filas = {}
+        self._filas_consultadas_em = 0.0
+        self._consultando = False
+
+    def printers(self) -> List[str]:
+        """Impressoras que participam do balanceamento"""
+        disponiveis = self.registry.available_printers()
+        if self.printers_config:
+            return [nome for nome in self.printers_config if nome in disponiveis]
+        return disponiveis
+
+    def healthy(self, printer_name: str) -> bool:
+        with self._lock:
+            return self._estado_de(printer_name)["pausada_ate"] <= time.monotonic()
+
+    def spooler_depth(self, printer_name: str) -> int:
+        """Trabalhos na fila do spooler (consulta o sistema no máximo a cada depth_ttl segundos)"""
+        self._atualizar_filas()
+        with self._lock:
+            return self._filas.get(printer_name, (0, 0.0))[0]
+
+    def estimated_wait(self, printer_name: str) -> float:
+        """Tempo estimado até um novo trabalho terminar nessa impressora"""
+        profundidade = self.spooler_depth(printer_name)
+        with self._lock:
+            return (profundidade + 1) * self._duracao(printer_name)
+
+    def choose(self, candidatas: Iterable[str]) -> Optional[str]:
+        """Impressora saudável e com espaço no spooler que termina um novo trabalho mais cedo"""
+        melhores = []
+        for printer_name in candidatas:
+            if not self.healthy(printer_name) or self.spooler_depth(printer_name) >= self.max_spooler_depth:
+                continue
+            melhores.append((self.estimated_wait(printer_name), printer_name))
+        return min(melhores)[1] if melhores else None
+
+    def record_sent(self, printer_name: str):
+        with self._lock:
+            estado = self._estado_de(printer_name)
+            estado["enviados"] += 1
+            estado["falhas_seguidas"] = 0
+            estado["pausada_ate"] = 0.0
+            # O trabalho acabou de entrar no spooler: a profundidade em cache ficou desatualizada
+            profundidade, ultima_saida = self._filas.get(printer_name, (0, time.monotonic()))
+            self._filas[printer_name] = (profundidade + 1, ultima_saida)
+
+    def record_failure(self, printer_name: str, erro: Exception):
+        """Tira a impressora de circulação por cooldown, 2x, 4x... limitado a max_cooldown"""
+        with self._lock:
+            estado = self._estado_de(printer_name)
+            estado["falhas"] += 1
+            estado["falhas_seguidas"] += 1
+            estado["ultimo_erro"] = str(erro)
+            pausa = min(self.max_cooldown, self.cooldown * (2 ** (estado["falhas_seguidas"] - 1)))
+            estado["pausada_ate"] = time.monotonic() + pausa
+        print(f"Aviso: impressora {printer_name} fora do balanceamento por {pausa:.0f}s: {str(erro)}")
+
+    def stats(self) -> Dict[str, Any]:
+        impressoras = {}
+        for printer_name in self.printers():
+            profundidade = self.spooler_depth(printer_name)
+            with self._lock:
+                estado = dict(self._estado_de(printer_name))
+            pausa = max(0.0, estado.pop("pausada_ate") - time.monotonic())
+            impressoras[printer_name] = dict(estado, fila_spooler=profundidade, saudavel=pausa == 0,
+                                             pausa_restante=round(pausa, 1))
+        return {"max_spooler_depth": self.max_spooler_depth, "printers": impressoras}
+
+    def _atualizar_filas(self):
+        # Uma consulta por vez para todas as impressoras; quem chega durante a consulta usa o valor anterior
+        agora = time.monotonic()
+        with self._lock:
+            if self._consultando or agora - self._filas_consultadas_em < self.depth_ttl:
+                return
+            self._consultando = True
+        try:
+            filas = consultar_filas_spooler(self.printers())
+        finally:
+            with self._lock:
+                self._consultando = False
+                self._filas_consultadas_em = time.monotonic()
+        agora = time.monotonic()
+        with self._lock:
+            for printer_name, profundidade in filas.items():
+                anterior, ultima_saida = self._filas.get(printer_name, (0, agora))
+                if profundidade < anterior:
+                    # Trabalhos saíram da fila: o intervalo desde a última saída estima a duração de cada um
+                    self._registrar_duracao(printer_name, (agora - ultima_saida) / (anterior - profundidade))
+                    ultima_saida = agora
+                elif anterior == 0:
+                    ultima_saida = agora
+                self._filas[printer_name] = (profundidade, ultima_saida)
+
+    def _estado_de(self, printer_name):
+        estado = self._estado.get(printer_name)
+        if estado is None:
+            estado = self._estado[printer_name] = {
+                "falhas_seguidas": 0,
+                "pausada_ate": 0.0,
+                "duracao_media": self.default_duration,
+                "amostras": 0,
+                "enviados": 0,
+                "falhas": 0,
+                "ultimo_erro": None
+            }
+        return estado
+
+    def _duracao(self, printer_name):
+        estado = self._estado_de(printer_name)
+        if estado["amostras"]:
+            return estado["duracao_media"]
+        # Impressora ainda sem medições: supõe a velocidade média das outras, para não ficar de fora
+        medidas = [outro["duracao_media"] for outro in self._estado.values() if outro["amostras"]]
+        return sum(medidas) / len(medidas) if medidas else self.default_duration
+
+    def _registrar_duracao(self, printer_name, duracao):
+        # Média móvel exponencial: acompanha a velocidade recente da impressora
+        estado = self._estado_de(printer_name)
+        if estado["amostras"]:
+            estado["duracao_media"] = 0.7 * estado["duracao_media"] + 0.3 * duracao
+        else:
+            estado["duracao_media"] = duracao
+        estado["amostras"] += 1
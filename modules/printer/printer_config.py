@@ -29,7 +29,8 @@ class PrinterConfig:
                 'right': 10
             },
             'scale': 'fit_to_page',
-            'color_mode': 'color'
+            'color_mode': 'color',
+            'output_format': 'jpeg'
         }
         
         try:
@@ -84,5 +85,6 @@ class PrinterConfig:
             'quality': self.settings.get('quality', 'high'),
             'margins': self.settings.get('margins', {}),
             'scale': self.settings.get('scale', 'fit_to_page'),
-            'colorMode': self.settings.get('color_mode', 'color')
+            'colorMode': self.settings.get('color_mode', 'color'),
+            'outputFormat': self.settings.get('output_format', 'jpeg')
         }
\ No newline at end of file
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de impressoras
+Mantém em cache a lista de impressoras e a impressora padrão do sistema,
+evitando chamar lpstat / EnumPrinters a cada requisição
+"""
+
+import platform
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ..startup import lazy_import
+
+
+def descobrir_impressoras() -> List[str]:
+    """Lista as impressoras instaladas consultando o sistema"""
+    if platform.system() == 'Windows':
+        # O pywin32 só existe (e só é necessário) no Windows
+        return [printer[2] for printer in lazy_import('win32print').EnumPrinters(2)]
+    # Para Linux/Mac
+    try:
+        result = subprocess.run(['lpstat', '-a'], capture_output=True, text=True)
+        return [line.split()[0] for line in result.stdout.splitlines() if line.strip()]
+    except Exception:
+        return []
+
+
+def descobrir_impressora_padrao() -> Optional[str]:
+    """Obtém a impressora padrão consultando o sistema"""
+    if platform.system() == 'Windows':
+        return lazy_import('win32print').GetDefaultPrinter()
+    try:
+        result = subprocess.run(['lpstat', '-d'], capture_output=True, text=True)
+        return result.stdout.split(':')[-1].strip() or None
+    except Exception:
+        return None
+
+
+def consultar_filas_spooler(printer_names: List[str]) -> Dict[str, int]:
+    """Quantidade de trabalhos na fila do spooler de cada impressora (as que não puderem ser consultadas ficam de fora)"""
+    if platform.system() == 'Windows':
+        win32print = lazy_import('win32print')
+        filas = {}
+        for printer_name in printer_names:
+            try:
+                handle = win32print.OpenPrinter(printer_name)
+                try:
+                    filas[printer_name] = len(win32print.EnumJobs(handle, 0, -1, 1))
+                finally:
+                    win32print.ClosePrinter(handle)
+            except Exception:
+                continue
+        return filas
+    # Um único lpstat -o para todas: cada linha começa com o id do trabalho (<impressora>-<número>)
+    try:
+        result = subprocess.run(['lpstat', '-o'], capture_output=True, text=True)
+    except Exception:
+        return {}
+    filas = dict.fromkeys(printer_names, 0)
+    for line in result.stdout.splitlines():
+        printer_name = line.split()[0].rsplit('-', 1)[0] if line.strip() else None
+        if printer_name in filas:
+            filas[printer_name] += 1
+    return filas
+
+
+class PrinterRegistry:
+    """Cache com TTL das impressoras disponíveis e da impressora padrão"""
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._printers = None
+        self._default = None
+        self._loaded_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._refreshes = 0
+
+    def available_printers(self) -> List[str]:
+        """Lista de impressoras (do cache, se ainda válido)"""
+        self._ensure_fresh()
+        return list(self._printers)
+
+    def default_printer(self) -> Optional[str]:
+        """Impressora padrão (do cache, se ainda válido)"""
+        self._ensure_fresh()
+        return self._default
+
+    def refresh(self):
+        """Força uma nova consulta ao sistema"""
+        with self._lock:
+            self._load()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de acertos e faltas do cache"""
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "refreshes": self._refreshes,
+                "ttl": self.ttl,
+                "age": time.monotonic() - self._loaded_at if self._printers is not None else None,
+                "printers": len(self._printers or [])
+            }
+
+    def _ensure_fresh(self):
+        with self._lock:
+            if self._printers is not None and time.monotonic() - self._loaded_at < self.ttl:
+                self._hits += 1
+                return
+            self._misses += 1
+            self._load()
+
+    def _load(self):
+        self._printers = descobrir_impressoras()
+        self._default = descobrir_impressora_padrao()
+        self._loaded_at = time.monotonic()
+        self._refreshes += 1
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_printer_registry(ttl: float = None) -> PrinterRegistry:
+    """Retorna o registro de impressoras compartilhado pelo processo"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PrinterRegistry(ttl if ttl is not None else 60.0)
+        elif ttl is not None:
+            _registry.ttl = ttl
+        return _registry
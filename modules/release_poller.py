@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+Verificação de releases
+Consulta a última release em segundo plano, com requisições condicionais
+(ETag/If-None-Match), e guarda o resultado para que as rotas de
+atualização respondam da memória sem acessar a rede
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .startup import lazy_import
+
+GITHUB_RELEASES_URL = "https://api.github.com/repos/Sploit23/kiosk-updates/releases/latest"
+
+# Campos da release guardados em memória e no disco
+CAMPOS_RELEASE = ('tag_name', 'name', 'published_at', 'html_url')
+
+
+class ReleasePoller:
+    """Mantém em cache a última release publicada, atualizada periodicamente"""
+
+    def __init__(self, url: str = GITHUB_RELEASES_URL, interval: float = 1800, retry_interval: float = 300,
+                 timeout: float = 10, cache_path: Optional[str] = None):
+        self.url = url
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.timeout = timeout
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._session = None
+        self._release = None
+        self._etag = None
+        self._checked_at = None
+        self._error = None
+        self._next_poll = 0.0
+        self._requests = 0
+        self._not_modified = 0
+        self._errors = 0
+        self._load_cache()
+
+    def start(self):
+        """Inicia a verificação periódica em segundo plano"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='release-poller', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Interrompe a verificação periódica"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Última release conhecida (ou None se nunca foi possível consultar)"""
+        return self._release
+
+    def poll(self) -> bool:
+        """Consulta o servidor uma vez; retorna True se a consulta teve sucesso"""
+        headers = {'Accept': 'application/vnd.github+json'}
+        if self._etag and self._release is not None:
+            # 304 não conta no limite de requisições da API do GitHub
+            headers['If-None-Match'] = self._etag
+
+        # requests só é carregado na primeira consulta, fora do caminho da inicialização
+        requests = lazy_import('requests')
+        if self._session is None:
+            self._session = requests.Session()
+
+        self._requests += 1
+        try:
+            response = self._session.get(self.url, headers=headers, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            return self._poll_failed(f"Erro de conexão: {str(e)}", self.retry_interval)
+
+        if response.status_code == 304:
+            with self._lock:
+                self._not_modified += 1
+                self._checked_at = time.time()
+                self._error = None
+                self._next_poll = time.time() + self.interval
+            return True
+
+        if response.status_code != 200:
+            return self._poll_failed(f"HTTP {response.status_code}", self._retry_after(response))
+
+        try:
+            dados = response.json()
+        except ValueError:
+            return self._poll_failed("Resposta inválida do servidor de atualizações", self.retry_interval)
+
+        release = {campo: dados.get(campo) for campo in CAMPOS_RELEASE}
+        with self._lock:
+            self._release = release
+            self._etag = response.headers.get('ETag')
+            self._checked_at = time.time()
+            self._error = None
+            self._next_poll = time.time() + self.interval
+        self._save_cache()
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Estado da verificação, para diagnóstico"""
+        return {
+            "url": self.url,
+            "checked_at": self._checked_at,
+            "next_poll_in": max(0.0, self._next_poll - time.time()),
+            "has_release": self._release is not None,
+            "error": self._error,
+            "requests": self._requests,
+            "not_modified": self._not_modified,
+            "errors": self._errors
+        }
+
+    def _poll_failed(self, mensagem, espera):
+        # Mantém a última release conhecida; só registra o erro e agenda nova tentativa
+        print(f"Aviso: Não foi possível verificar atualizações ({mensagem})")
+        with self._lock:
+            self._errors += 1
+            self._error = mensagem
+            self._next_poll = time.time() + espera
+        return False
+
+    def _retry_after(self, response):
+        """Respeita Retry-After e X-RateLimit-Reset quando o limite da API é atingido"""
+        try:
+            if response.headers.get('Retry-After'):
+                return max(self.retry_interval, float(response.headers['Retry-After']))
+            if response.headers.get('X-RateLimit-Remaining') == '0' and response.headers.get('X-RateLimit-Reset'):
+                return max(self.retry_interval, float(response.headers['X-RateLimit-Reset']) - time.time())
+        except ValueError:
+            pass
+        return self.retry_interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            espera = self._next_poll - time.time()
+            if espera > 0:
+                self._stop.wait(espera)
+                continue
+            try:
+                self.poll()
+            except Exception as e:
+                self._poll_failed(f"Erro interno: {str(e)}", self.retry_interval)
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        # Resultado da execução anterior: usado até a primeira consulta (condicional) responder
+        if cache.get('url') == self.url:
+            self._release = cache.get('release')
+            self._etag = cache.get('etag')
+            self._checked_at = cache.get('checked_at')
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            temporario = f"{self.cache_path}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({"url": self.url, "release": self._release, "etag": self._etag,
+                           "checked_at": self._checked_at}, f)
+            os.replace(temporario, self.cache_path)
+        except OSError as e:
+            print(f"Aviso: Não foi possível salvar o cache de atualizações: {str(e)}")
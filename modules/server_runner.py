@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Execução em produção
+Roda o app Flask em um servidor WSGI de verdade (waitress, que funciona
+no Windows, ou gunicorn no Linux) em vez do servidor de desenvolvimento.
+Sempre em um único processo: os serviços em segundo plano (ingestão,
+pré-geração, catálogo, fila de impressão, índice e stream de mudanças)
+guardam estado em memória e não podem rodar duplicados; a escala é por threads
+"""
+
+import platform
+from typing import Callable, Optional
+
+
+def run_production(app, host: str, port: int, threads: int = 8, backend: str = 'waitress',
+                   on_start: Optional[Callable[[], None]] = None):
+    """Inicia o servidor WSGI configurado; on_start roda no processo que atende requisições"""
+    if backend == 'gunicorn':
+        if platform.system() == 'Windows':
+            print("Aviso: gunicorn não funciona no Windows, usando waitress.")
+        else:
+            try:
+                return _run_gunicorn(app, host, port, threads, on_start)
+            except ImportError:
+                print("Aviso: gunicorn não instalado, usando waitress.")
+
+    try:
+        from waitress import serve
+    except ImportError:
+        print("Aviso: waitress não instalado, usando o servidor do Flask com threads.")
+        if on_start:
+            on_start()
+        app.run(host=host, port=port, debug=False, threaded=True, use_reloader=False)
+        return
+
+    if on_start:
+        on_start()
+    print(f"Servidor em produção (waitress, {threads} threads) em http://{host}:{port}")
+    serve(app, host=host, port=port, threads=threads)
+
+
+def _run_gunicorn(app, host, port, threads, on_start):
+    from gunicorn.app.base import BaseApplication
+
+    class KioskApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{host}:{port}")
+            self.cfg.set('workers', 1)
+            self.cfg.set('threads', threads)
+            self.cfg.set('worker_class', 'gthread')
+            if on_start:
+                # Threads não sobrevivem ao fork: os serviços iniciam no worker
+                self.cfg.set('post_worker_init', lambda worker: on_start())
+
+        def load(self):
+            return app
+
+    print(f"Servidor em produção (gunicorn, 1 worker x {threads} threads) em http://{host}:{port}")
+    KioskApplication().run()
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Slots de instalação A/B
+A versão em uso fica em slots/<ativo> e a próxima é preparada no outro
+slot enquanto a atual continua atendendo. A troca é só a mudança do
+ponteiro current.json seguida de um reinício, e o slot anterior é mantido
+para rollback imediato
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+SLOT_NAMES = ('a', 'b')
+POINTER_FILE = 'current.json'
+
+# Código de saída com que o servidor pede ao launcher para ser reiniciado
+RESTART_EXIT_CODE = 3
+
+# O que compõe uma instalação a partir do código-fonte
+SLOT_CONTENTS = ('server.py', 'modules', 'templates', 'static', 'config', 'requirements.txt')
+
+
+class SlotManager:
+    """Gerencia os slots a/b e o ponteiro para o slot ativo"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.slots_dir = os.path.join(root, 'slots')
+        self.pointer_path = os.path.join(root, POINTER_FILE)
+
+    @classmethod
+    def find(cls, app_path: str) -> Optional['SlotManager']:
+        """Retorna o gerenciador se app_path for um slot (<raiz>/slots/<a|b>), senão None"""
+        app_path = os.path.abspath(app_path)
+        slots_dir = os.path.dirname(app_path)
+        if os.path.basename(app_path) not in SLOT_NAMES or os.path.basename(slots_dir) != 'slots':
+            return None
+        manager = cls(os.path.dirname(slots_dir))
+        return manager if manager.is_enabled() else None
+
+    def is_enabled(self) -> bool:
+        return os.path.exists(self.pointer_path)
+
+    def read(self) -> Dict[str, Any]:
+        with open(self.pointer_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def write(self, ponteiro: Dict[str, Any]):
+        # Escrita atômica: o launcher nunca lê um ponteiro pela metade
+        temporario = f"{self.pointer_path}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(ponteiro, f, indent=4)
+        os.replace(temporario, self.pointer_path)
+
+    @property
+    def active(self) -> str:
+        return self.read()['active']
+
+    @property
+    def inactive(self) -> str:
+        return SLOT_NAMES[1] if self.active == SLOT_NAMES[0] else SLOT_NAMES[0]
+
+    def slot_path(self, slot: str) -> str:
+        return os.path.join(self.slots_dir, slot)
+
+    def slot_version(self, slot: str) -> Optional[str]:
+        try:
+            with open(os.path.join(self.slot_path(slot), 'config', 'version.json'), 'r', encoding='utf-8') as f:
+                return json.load(f).get('version')
+        except (OSError, ValueError):
+            return None
+
+    def server_port(self, slot: str) -> int:
+        try:
+            with open(os.path.join(self.slot_path(slot), 'config', 'settings.json'), 'r', encoding='utf-8') as f:
+                return int(json.load(f)['server']['port'])
+        except (OSError, ValueError, KeyError):
+            return 5000
+
+    def init_from(self, source_dir: str):
+        """Cria o slot 'a' a partir de uma instalação comum e passa a usar os slots"""
+        destino = self.slot_path(SLOT_NAMES[0])
+        if os.path.exists(destino):
+            shutil.rmtree(destino)
+        os.makedirs(destino)
+        for nome in SLOT_CONTENTS:
+            origem = os.path.join(source_dir, nome)
+            if os.path.isdir(origem):
+                shutil.copytree(origem, os.path.join(destino, nome), ignore=shutil.ignore_patterns('__pycache__'))
+            elif os.path.exists(origem):
+                shutil.copy2(origem, destino)
+        self.write({"active": SLOT_NAMES[0], "previous": None, "trial": False, "switched_at": time.time()})
+
+    def prepare_inactive(self) -> str:
+        """Recria o slot inativo como cópia do ativo (inclui as configurações locais)"""
+        destino = self.slot_path(self.inactive)
+        if os.path.exists(destino):
+            shutil.rmtree(destino)
+        shutil.copytree(self.slot_path(self.active), destino, ignore=shutil.ignore_patterns('__pycache__'))
+        return destino
+
+    def flip(self, slot: str):
+        """Aponta para o slot informado; fica em teste até o launcher confirmar que ele responde"""
+        anterior = self.active
+        self.write({"active": slot, "previous": anterior, "trial": True, "switched_at": time.time()})
+
+    def confirm(self):
+        ponteiro = self.read()
+        if ponteiro.get('trial'):
+            ponteiro['trial'] = False
+            self.write(ponteiro)
+
+    def rollback(self) -> bool:
+        """Volta para o slot anterior; retorna False se não houver um"""
+        ponteiro = self.read()
+        anterior = ponteiro.get('previous')
+        if not anterior or not os.path.exists(self.slot_path(anterior)):
+            return False
+        self.write({"active": anterior, "previous": ponteiro['active'], "trial": False, "switched_at": time.time()})
+        return True
+
+    def command(self, slot: str) -> List[str]:
+        """Linha de comando que executa o servidor de um slot (só instalações a partir do código-fonte)"""
+        return [sys.executable, os.path.join(self.slot_path(slot), 'server.py')]
+
+    def shared_env(self, **extra) -> Dict[str, str]:
+        """Ambiente dos processos dos slots: dados e cache ficam fora deles e são compartilhados"""
+        env = dict(os.environ)
+        env['KIOSK_DATA_DIR'] = os.path.join(self.root, 'data')
+        env['KIOSK_CACHE_DIR'] = os.path.join(self.root, 'cache')
+        env.update({chave: str(valor) for chave, valor in extra.items()})
+        return env
+
+    def health_check(self, slot: str, port: int, expected_version: Optional[str] = None,
+                     timeout: float = 60) -> Dict[str, Any]:
+        """Sobe o slot em outra porta, sem serviços em segundo plano, e consulta /api/version"""
+        processo = subprocess.Popen(
+            self.command(slot),
+            cwd=self.slot_path(slot),
+            env=self.shared_env(KIOSK_PORT=port, KIOSK_HEALTHCHECK=1),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        try:
+            return wait_healthy(port, processo, expected_version, timeout)
+        finally:
+            processo.terminate()
+            try:
+                processo.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+
+
+def wait_healthy(port: int, processo=None, expected_version: Optional[str] = None,
+                 timeout: float = 60) -> Dict[str, Any]:
+    """Aguarda /api/version responder na porta; confere a versão se informada"""
+    inicio = time.time()
+    ultimo_erro = None
+    while time.time() - inicio < timeout:
+        if processo is not None and processo.poll() is not None:
+            return {"healthy": False, "error": f"O processo terminou com código {processo.returncode}"}
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/version", timeout=2) as response:
+                versao = json.loads(response.read().decode('utf-8')).get('version')
+            if expected_version and versao != expected_version:
+                return {"healthy": False, "error": f"Versão {versao} respondeu, esperada {expected_version}"}
+            return {"healthy": True, "version": versao, "seconds": round(time.time() - inicio, 2)}
+        except Exception as e:
+            ultimo_erro = str(e)
+            time.sleep(0.5)
+    return {"healthy": False, "error": f"Sem resposta em {timeout:.0f}s: {ultimo_erro}"}
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Tempo de inicialização
+Registra quanto cada etapa da partida levou, o custo das dependências
+importadas sob demanda e o tempo até a primeira requisição
+"""
+
+import importlib
+import sys
+import threading
+import time
+from typing import Any, Dict
+
+# Instante mais próximo do início do processo a que temos acesso sem dependências extras
+_INICIO = time.perf_counter()
+
+
+class StartupReport:
+    """Marcos da inicialização, medidos a partir do carregamento deste módulo"""
+
+    def __init__(self):
+        self.started = _INICIO
+        self.started_at = time.time() - (time.perf_counter() - _INICIO)
+        self._lock = threading.Lock()
+        self._marcos = []
+        self._imports = {}
+        self._primeira_requisicao = None
+
+    def mark(self, etapa: str):
+        """Registra o fim de uma etapa da inicialização"""
+        with self._lock:
+            self._marcos.append((etapa, time.perf_counter() - self.started))
+
+    def record_import(self, modulo: str, segundos: float):
+        with self._lock:
+            self._imports[modulo] = segundos
+
+    def first_request(self):
+        """Chamado a cada requisição; só a primeira é registrada"""
+        if self._primeira_requisicao is None:
+            with self._lock:
+                if self._primeira_requisicao is None:
+                    self._primeira_requisicao = time.perf_counter() - self.started
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            marcos = list(self._marcos)
+            imports = dict(self._imports)
+            primeira = self._primeira_requisicao
+        etapas = []
+        anterior = 0.0
+        for etapa, instante in marcos:
+            etapas.append({"phase": etapa, "ms": round((instante - anterior) * 1000, 1),
+                           "at_ms": round(instante * 1000, 1)})
+            anterior = instante
+        return {
+            "started_at": self.started_at,
+            "frozen": getattr(sys, 'frozen', False),
+            "phases": etapas,
+            "lazy_imports_ms": {modulo: round(segundos * 1000, 1) for modulo, segundos in sorted(imports.items())},
+            "time_to_first_request_ms": round(primeira * 1000, 1) if primeira is not None else None
+        }
+
+    def summary(self) -> str:
+        relatorio = self.report()
+        etapas = ', '.join(f"{e['phase']} {e['ms']:.0f} ms" for e in relatorio['phases'])
+        return f"Inicialização: {etapas}"
+
+
+startup_report = StartupReport()
+
+
+def lazy_import(nome: str):
+    """Importa um módulo na primeira utilização e registra quanto isso custou"""
+    if nome in sys.modules:
+        # import_module (e não sys.modules direto): se outra thread ainda está importando,
+        # espera o módulo terminar de carregar em vez de devolvê-lo pela metade
+        return importlib.import_module(nome)
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nome)
+    startup_report.record_import(nome, time.perf_counter() - inicio)
+    return modulo
@@ -3,20 +3,343 @@ import sys
 import json
 import time
 import shutil
-import tempfile
+import argparse
 import subprocess
-import requests
+import tempfile
+import zipfile
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
 from datetime import datetime
+from urllib.parse import urlparse
+
+from modules.slots import SlotManager, wait_healthy
+from modules.startup import lazy_import
+
+# Parâmetros dos downloads de atualização
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_MIN_SEGMENT = 1024 * 1024
+DOWNLOAD_STATE_INTERVAL = 1.0
+
+# Arquivos de configuração locais nunca são sobrescritos por atualizações incrementais
+DELTA_PRESERVED_FILES = {"config/settings.json", "config/printer_settings.json"}
+
+# Tempo para a versão instalada pelo instalador completo responder antes de voltar à anterior
+INSTALLER_TRIAL_TIMEOUT = 60
+# Registro do que a cópia auxiliar fez, na pasta dos downloads
+INSTALLER_LOG = "atualizacao.log"
+
+
+class DownloadError(Exception):
+    """Falha definitiva em um download de atualização"""
+
+
+class ResumableDownload:
+    """Download com retomada (Range), segmentos paralelos e verificação SHA-256
+
+    O arquivo parcial (.part) e o estado dos segmentos (.part.json) ficam ao
+    lado do destino, de modo que um download interrompido continua de onde
+    parou, inclusive depois de reiniciar o aplicativo.
+    """
+
+    def __init__(self, url, dest_path, sha256=None, segments=1, timeout=30, max_retries=5):
+        self.url = url
+        self.dest_path = dest_path
+        self.part_path = dest_path + ".part"
+        self.state_path = dest_path + ".part.json"
+        self.sha256 = sha256.lower() if sha256 else None
+        self.segments = max(1, int(segments or 1))
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.status = "pending"
+        self.error = None
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._total = None
+        self._validator = None
+        self._segmentos = []
+        self._amostras = deque(maxlen=50)
+        self._hasher = hashlib.sha256()
+        self._hash_pos = 0
+        self._started_at = None
+        self._resumed_bytes = 0
+
+    def run(self):
+        """Executa (ou retoma) o download; retorna o caminho do arquivo verificado"""
+        self._started_at = time.time()
+        self.status = "downloading"
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.dest_path)), exist_ok=True)
+            if self.sha256 and os.path.exists(self.dest_path) and self._file_sha256(self.dest_path) == self.sha256:
+                self.status = "done"
+                return self.dest_path
+
+            total, aceita_range, validator = self._probe()
+            self._total = total
+            self._validator = validator
+            if total and aceita_range:
+                self._prepare_segments(total)
+            else:
+                # Servidor sem suporte a Range: um único fluxo desde o início
+                self._segmentos = [{"start": 0, "end": None, "done": 0}]
+                self._remove_partial()
+
+            self._download_segments()
+            if self._cancel.is_set():
+                self.status = "paused"
+                return None
+
+            self._finish()
+            self.status = "done"
+            return self.dest_path
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            raise
+        finally:
+            if self.status != "done":
+                self._save_state()
+
+    def cancel(self):
+        """Interrompe o download mantendo o arquivo parcial para retomar depois"""
+        self._cancel.set()
+
+    def progress(self):
+        """Bytes baixados, percentual, velocidade (bytes/s) e tempo restante estimado"""
+        with self._lock:
+            baixado = sum(seg["done"] for seg in self._segmentos)
+            amostras = list(self._amostras)
+        velocidade = 0.0
+        if len(amostras) >= 2 and amostras[-1][0] > amostras[0][0]:
+            velocidade = (amostras[-1][1] - amostras[0][1]) / (amostras[-1][0] - amostras[0][0])
+        total = self._total
+        return {
+            "status": self.status,
+            "url": self.url,
+            "file": os.path.basename(self.dest_path),
+            "total": total,
+            "downloaded": baixado,
+            "resumed_from": self._resumed_bytes,
+            "percent": round(baixado * 100.0 / total, 1) if total else None,
+            "speed": round(velocidade),
+            "eta": round((total - baixado) / velocidade) if total and velocidade > 0 else None,
+            "segments": len(self._segmentos),
+            "elapsed": round(time.time() - self._started_at, 1) if self._started_at else 0,
+            "error": self.error
+        }
+
+    def _probe(self):
+        """Descobre tamanho, suporte a Range e o validador (ETag/Last-Modified) do arquivo"""
+        # requests só é carregado quando um download começa
+        requests = lazy_import("requests")
+        response = requests.get(self.url, headers={"Range": "bytes=0-0"}, stream=True,
+                                     timeout=self.timeout, allow_redirects=True)
+        try:
+            if response.status_code == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = int(content_range.rsplit("/", 1)[-1]) if "/" in content_range else None
+                aceita_range = total is not None
+            elif response.status_code == 200:
+                total = int(response.headers["Content-Length"]) if response.headers.get("Content-Length") else None
+                aceita_range = False
+            else:
+                raise DownloadError(f"HTTP {response.status_code}")
+            validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+            return total, aceita_range, validator
+        finally:
+            response.close()
+
+    def _prepare_segments(self, total):
+        estado = self._load_state()
+        if (estado and estado.get("url") == self.url and estado.get("total") == total
+                and estado.get("validator") == self._validator and os.path.exists(self.part_path)
+                and os.path.getsize(self.part_path) == total):
+            self._segmentos = estado["segments"]
+            self._resumed_bytes = sum(seg["done"] for seg in self._segmentos)
+            return
+
+        # Download novo: divide em segmentos e reserva o arquivo inteiro
+        quantidade = max(1, min(self.segments, total // DOWNLOAD_MIN_SEGMENT))
+        tamanho = -(-total // quantidade)
+        self._segmentos = [
+            {"start": inicio, "end": min(inicio + tamanho, total) - 1, "done": 0}
+            for inicio in range(0, total, tamanho)
+        ]
+        with open(self.part_path, "wb") as f:
+            f.truncate(total)
+        self._save_state()
+
+    def _download_segments(self):
+        pendentes = [indice for indice, seg in enumerate(self._segmentos) if not self._segment_complete(seg)]
+        if not pendentes:
+            return
+        with ThreadPoolExecutor(max_workers=len(pendentes), thread_name_prefix="update-download") as executor:
+            futuros = [executor.submit(self._download_segment, indice) for indice in pendentes]
+            while True:
+                # Persiste o progresso periodicamente enquanto os segmentos baixam
+                feitos, restantes = wait(futuros, timeout=DOWNLOAD_STATE_INTERVAL, return_when=FIRST_EXCEPTION)
+                self._sample()
+                self._save_state()
+                erros = [f.exception() for f in feitos if f.exception()]
+                if erros:
+                    self._cancel.set()
+                    raise erros[0]
+                if not restantes:
+                    return
+
+    def _download_segment(self, indice):
+        seg = self._segmentos[indice]
+        requests = lazy_import("requests")
+        sessao = requests.Session()
+        tentativas = 0
+        while not self._segment_complete(seg) and not self._cancel.is_set():
+            if seg["end"] is None:
+                # Sem Range não há como continuar: recomeça do zero
+                with self._lock:
+                    seg["done"] = 0
+                self._hasher = hashlib.sha256()
+                self._hash_pos = 0
+            inicio = seg["start"] + seg["done"]
+            headers = {}
+            if seg["end"] is not None:
+                headers["Range"] = f"bytes={inicio}-{seg['end']}"
+                if self._validator:
+                    # Se o arquivo mudou no servidor, If-Range faz ele responder 200 em vez de 206
+                    headers["If-Range"] = self._validator
+            try:
+                with sessao.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if seg["end"] is not None and response.status_code != 206:
+                        if response.status_code == 200:
+                            raise DownloadError("O arquivo de atualização mudou no servidor durante o download")
+                        raise requests.exceptions.HTTPError(f"HTTP {response.status_code}")
+                    if seg["end"] is None and response.status_code != 200:
+                        raise requests.exceptions.HTTPError(f"HTTP {response.status_code}")
+                    self._stream_to_disk(indice, seg, response)
+                tentativas = 0
+            except DownloadError:
+                raise
+            except (requests.exceptions.RequestException, OSError) as e:
+                tentativas += 1
+                if tentativas > self.max_retries:
+                    raise DownloadError(f"Falha após {self.max_retries} tentativas: {str(e)}")
+                # Backoff exponencial; a próxima tentativa continua do último byte gravado
+                self._cancel.wait(min(30, 2 ** (tentativas - 1)))
+
+    def _stream_to_disk(self, indice, seg, response):
+        # O primeiro segmento começa no byte 0: seu conteúdo alimenta o SHA-256 durante o download
+        calcular_hash = indice == 0
+        if calcular_hash:
+            self._hash_from_disk(seg["start"] + seg["done"])
+        with open(self.part_path, "r+b" if seg["end"] is not None else "wb") as f:
+            if seg["end"] is not None:
+                f.seek(seg["start"] + seg["done"])
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if self._cancel.is_set():
+                    return
+                if not chunk:
+                    continue
+                if seg["end"] is not None:
+                    chunk = chunk[:seg["end"] + 1 - seg["start"] - seg["done"]]
+                f.write(chunk)
+                if calcular_hash:
+                    self._hasher.update(chunk)
+                    self._hash_pos += len(chunk)
+                with self._lock:
+                    seg["done"] += len(chunk)
+                if self._segment_complete(seg):
+                    return
+        if seg["end"] is None:
+            seg["complete"] = True
+
+    def _finish(self):
+        tamanho = os.path.getsize(self.part_path)
+        if self._total is not None and tamanho != self._total:
+            raise DownloadError(f"Download incompleto: {tamanho} de {self._total} bytes")
+        # Os demais segmentos ainda estão no cache do sistema: completa o hash lendo do disco
+        self._hash_from_disk(tamanho)
+        if self.sha256 and self._hasher.hexdigest() != self.sha256:
+            self._remove_partial()
+            raise DownloadError("O arquivo baixado está corrompido (SHA-256 não confere)")
+        os.replace(self.part_path, self.dest_path)
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def _hash_from_disk(self, ate):
+        if ate <= self._hash_pos or not os.path.exists(self.part_path):
+            return
+        with open(self.part_path, "rb") as f:
+            f.seek(self._hash_pos)
+            while self._hash_pos < ate:
+                bloco = f.read(min(DOWNLOAD_CHUNK_SIZE, ate - self._hash_pos))
+                if not bloco:
+                    break
+                self._hasher.update(bloco)
+                self._hash_pos += len(bloco)
+
+    @staticmethod
+    def _segment_complete(seg):
+        if seg["end"] is None:
+            return seg.get("complete", False)
+        return seg["start"] + seg["done"] > seg["end"]
+
+    def _sample(self):
+        with self._lock:
+            self._amostras.append((time.time(), sum(seg["done"] for seg in self._segmentos)))
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _save_state(self):
+        # Só downloads com Range podem ser retomados
+        if not self._segmentos or self._segmentos[0]["end"] is None or not os.path.exists(self.part_path):
+            return
+        with self._lock:
+            estado = {
+                "url": self.url,
+                "total": self._total,
+                "validator": self._validator,
+                "segments": [dict(seg) for seg in self._segmentos]
+            }
+        temporario = self.state_path + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+        os.replace(temporario, self.state_path)
+
+    def _remove_partial(self):
+        for caminho in (self.part_path, self.state_path):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+
+    @staticmethod
+    def _file_sha256(path):
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for bloco in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+                sha.update(bloco)
+        return sha.hexdigest()
+
 
 class Updater:
     def __init__(self, app_name="Kiosk de Fotos", update_url=None):
         self.app_name = app_name
         self.update_url = update_url or "https://raw.githubusercontent.com/Sploit23/kiosk-updates/main/update_manifest.json"
-        self.version_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "version.json")
-        self.temp_dir = tempfile.mkdtemp(prefix=f"{app_name}_update_")
+        # O mesmo arquivo de /api/version e dos slots, incluído no executável junto com config/
+        self.version_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "version.json")
+        # Pasta fixa para os downloads: arquivos parciais sobrevivem a reinicializações
+        self.download_dir = os.path.join(tempfile.gettempdir(), f"{app_name}_downloads")
+        self.current_download = None
+        self.last_manifest = None
+        self.prepared_update = None
         self.current_version = self._get_current_version()
         self.is_frozen = getattr(sys, 'frozen', False)
         self.app_path = os.path.dirname(sys.executable) if self.is_frozen else os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        # Instalação em slots A/B (launcher.py): atualizações vão para o slot inativo
+        self.slots = SlotManager.find(self.app_path)
     
     def _get_current_version(self):
         """Obtém a versão atual do aplicativo"""
@@ -25,27 +348,15 @@ class Updater:
                 version_data = json.load(f)
                 return version_data.get("version", "1.0.0")
         except (FileNotFoundError, json.JSONDecodeError):
-            # Se o arquivo não existir ou for inválido, cria um novo
-            self._create_default_version_file()
             return "1.0.0"
     
-    def _create_default_version_file(self):
-        """Cria um arquivo de versão padrão"""
-        version_data = {
-            "version": "1.0.0",
-            "build_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "build_number": int(datetime.now().timestamp())
-        }
-        
-        with open(self.version_file, "w", encoding="utf-8") as f:
-            json.dump(version_data, f, indent=4)
-    
     def check_for_updates(self):
         """Verifica se há atualizações disponíveis"""
         try:
-            response = requests.get(self.update_url, timeout=10)
+            response = lazy_import("requests").get(self.update_url, timeout=10)
             if response.status_code == 200:
                 update_data = response.json()
+                self.last_manifest = update_data
                 latest_version = update_data.get("latest_version")
                 min_compatible = update_data.get("min_compatible_version", "0.0.0")
                 
@@ -59,6 +370,8 @@ class Updater:
                             "current_version": self.current_version,
                             "latest_version": latest_version,
                             "download_url": update_data.get("download_url"),
+                            "sha256": update_data.get("sha256"),
+                            "size": update_data.get("size"),
                             "changelog": update_data.get("changelog", []),
                             "is_mandatory": update_data.get("is_mandatory", False),
                             "message": update_data.get("message", "Nova versão disponível!")
@@ -109,135 +422,322 @@ class Updater:
         
         return 0  # versões são iguais
     
-    def download_update(self, download_url):
-        """Baixa a atualização para um diretório temporário"""
+    def download_update(self, download_url, sha256=None, segments=1):
+        """Baixa a atualização, retomando downloads interrompidos e verificando o SHA-256"""
         try:
-            # Cria um nome de arquivo baseado na URL
-            file_name = os.path.basename(download_url)
-            download_path = os.path.join(self.temp_dir, file_name)
+            # Cria um nome de arquivo baseado na URL (sem a query string)
+            file_name = os.path.basename(urlparse(download_url).path) or "update.bin"
+            download_path = os.path.join(self.download_dir, file_name)
             
-            # Baixa o arquivo
-            response = requests.get(download_url, stream=True, timeout=60)
-            if response.status_code == 200:
-                with open(download_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                
-                return {
-                    "status": "success",
-                    "file_path": download_path
-                }
-            else:
+            self.current_download = ResumableDownload(download_url, download_path, sha256=sha256, segments=segments)
+            file_path = self.current_download.run()
+            if file_path is None:
                 return {
                     "status": "error",
-                    "message": f"Erro ao baixar atualização: {response.status_code}"
+                    "message": "Download interrompido. Ele continuará de onde parou na próxima tentativa."
                 }
+            
+            return {
+                "status": "success",
+                "file_path": file_path,
+                "verified": bool(sha256)
+            }
         except Exception as e:
             return {
                 "status": "error",
                 "message": f"Erro ao baixar atualização: {str(e)}"
             }
     
-    def apply_update(self, file_path):
-        """Aplica a atualização baixada"""
-        # Esta função só funciona se o aplicativo estiver em modo frozen (executável)
-        if not self.is_frozen:
-            return {
-                "status": "error",
-                "message": "A atualização automática só funciona no modo executável."
-            }
-        
+    def download_progress(self):
+        """Progresso e velocidade do download atual"""
+        if self.current_download is None:
+            return {"status": "idle"}
+        return self.current_download.progress()
+    
+    def cancel_download(self):
+        """Pausa o download atual (o arquivo parcial é mantido)"""
+        if self.current_download is not None:
+            self.current_download.cancel()
+    
+    def prepare_update(self, manifest=None, segments=1):
+        """Baixa a atualização: só os arquivos alterados quando possível, senão o instalador completo"""
+        manifest = manifest or self.last_manifest
+        if not manifest:
+            return {"status": "error", "message": "Nenhum manifesto de atualização carregado."}
+
+        resultado = self.download_delta(manifest, segments=segments)
+        if resultado["status"] == "unavailable":
+            print(f"Atualização incremental indisponível ({resultado['message']}), baixando o instalador completo...")
+            resultado = self.download_update(manifest.get("download_url"), sha256=manifest.get("sha256"),
+                                             segments=segments)
+            if resultado["status"] == "success":
+                resultado.update({"type": "installer", "version": manifest.get("latest_version")})
+
+        if resultado["status"] == "success":
+            self.prepared_update = resultado
+        return resultado
+
+    def apply_prepared_update(self, healthcheck_port=5001, server_port=5000):
+        """Aplica a atualização preparada por prepare_update"""
+        preparado = self.prepared_update
+        if not preparado:
+            return {"status": "error", "message": "Nenhuma atualização foi baixada."}
+        if preparado["type"] == "delta" and self.slots:
+            resultado = self.apply_delta_to_slot(preparado, healthcheck_port)
+        elif preparado["type"] == "delta":
+            resultado = self.apply_delta(preparado)
+        else:
+            resultado = self.apply_update(preparado["file_path"], server_port=server_port,
+                                          expected_version=preparado.get("version"))
+        if resultado["status"] == "success":
+            self.prepared_update = None
+        return resultado
+
+    def plan_delta(self, manifest):
+        """Compara os hashes do manifesto com os arquivos instalados
+
+        Retorna (alterados, removidos) ou None quando a instalação não permite
+        atualização por arquivo (executável único do PyInstaller).
+        """
+        arquivos = manifest.get("files")
+        if self.is_frozen or not isinstance(arquivos, dict):
+            return None
+        alterados = []
+        for caminho, info in sorted(arquivos.items()):
+            relativo = self._safe_relative_path(caminho)
+            if relativo in DELTA_PRESERVED_FILES:
+                continue
+            destino = os.path.join(self.app_path, relativo)
+            if not os.path.exists(destino) or ResumableDownload._file_sha256(destino) != info["sha256"].lower():
+                alterados.append(relativo)
+        removidos = []
+        for caminho in manifest.get("removed_files", []):
+            relativo = self._safe_relative_path(caminho)
+            if relativo not in DELTA_PRESERVED_FILES and os.path.exists(os.path.join(self.app_path, relativo)):
+                removidos.append(relativo)
+        return alterados, removidos
+
+    def download_delta(self, manifest, segments=1):
+        """Baixa e verifica, em uma pasta de staging, apenas os arquivos que mudaram"""
         try:
-            # Verifica se o arquivo existe
-            if not os.path.exists(file_path):
-                return {
-                    "status": "error",
-                    "message": "Arquivo de atualização não encontrado."
-                }
-            
-            # Cria um script de atualização que será executado após o fechamento do aplicativo
-            update_script = self._create_update_script(file_path)
-            
-            # Executa o script de atualização
-            if sys.platform == "win32":
-                subprocess.Popen(["cmd", "/c", update_script], 
-                               shell=True, 
-                               creationflags=subprocess.CREATE_NO_WINDOW)
-            else:
-                subprocess.Popen(["bash", update_script])
-            
+            plano = self.plan_delta(manifest)
+            if plano is None:
+                return {"status": "unavailable", "message": "instalação em executável único"}
+            alterados, removidos = plano
+            arquivos = {self._safe_relative_path(caminho): info for caminho, info in manifest["files"].items()}
+            versao = manifest.get("latest_version")
+            staging_dir = os.path.join(self.download_dir, f"staging-{versao}")
+            if os.path.exists(staging_dir):
+                shutil.rmtree(staging_dir)
+            os.makedirs(staging_dir)
+            baixados = 0
+
+            # 1) Pacote com as mudanças a partir da versão instalada, se o manifesto oferecer
+            pacote = next((p for p in manifest.get("patches", []) if p.get("from_version") == self.current_version), None)
+            if pacote and alterados:
+                zip_path = os.path.join(self.download_dir, os.path.basename(urlparse(pacote["url"]).path) or "patch.zip")
+                self.current_download = ResumableDownload(pacote["url"], zip_path, sha256=pacote.get("sha256"),
+                                                          segments=segments)
+                if self.current_download.run() is None:
+                    return {"status": "error", "message": "Download interrompido."}
+                baixados += os.path.getsize(zip_path)
+                with zipfile.ZipFile(zip_path) as bundle:
+                    for nome in bundle.namelist():
+                        relativo = self._safe_relative_path(nome)
+                        if relativo in alterados:
+                            destino = os.path.join(staging_dir, relativo)
+                            os.makedirs(os.path.dirname(destino), exist_ok=True)
+                            with bundle.open(nome) as origem, open(destino, "wb") as f:
+                                shutil.copyfileobj(origem, f)
+
+            # 2) Arquivos que o pacote não trouxe são baixados um a um
+            base_url = manifest.get("files_base_url")
+            for relativo in alterados:
+                destino = os.path.join(staging_dir, relativo)
+                if os.path.exists(destino):
+                    continue
+                if not base_url:
+                    return {"status": "unavailable", "message": f"sem origem para {relativo}"}
+                url = base_url.rstrip("/") + "/" + relativo
+                self.current_download = ResumableDownload(url, destino, sha256=arquivos[relativo]["sha256"])
+                if self.current_download.run() is None:
+                    return {"status": "error", "message": "Download interrompido."}
+                baixados += os.path.getsize(destino)
+
+            # Cada arquivo preparado precisa bater com o hash do manifesto
+            for relativo in alterados:
+                destino = os.path.join(staging_dir, relativo)
+                if ResumableDownload._file_sha256(destino) != arquivos[relativo]["sha256"].lower():
+                    return {"status": "unavailable", "message": f"hash divergente em {relativo}"}
+
             return {
                 "status": "success",
-                "message": "Atualização iniciada. O aplicativo será reiniciado."
+                "type": "delta",
+                "version": versao,
+                "staging_dir": staging_dir,
+                "files": alterados,
+                "removed": removidos,
+                "download_bytes": baixados
             }
         except Exception as e:
+            return {"status": "unavailable", "message": str(e)}
+
+    def apply_delta(self, preparado):
+        """Troca os arquivos alterados pelos da pasta de staging, desfazendo tudo em caso de erro"""
+        backup_dir = os.path.join(self.download_dir, f"backup-{self.current_version}")
+        if os.path.exists(backup_dir):
+            shutil.rmtree(backup_dir)
+        trocados = []
+        try:
+            for relativo in preparado["files"] + preparado["removed"]:
+                destino = os.path.join(self.app_path, relativo)
+                backup = os.path.join(backup_dir, relativo)
+                existia = os.path.exists(destino)
+                if existia:
+                    os.makedirs(os.path.dirname(backup), exist_ok=True)
+                    shutil.copy2(destino, backup)
+                trocados.append((relativo, existia))
+                if relativo in preparado["files"]:
+                    os.makedirs(os.path.dirname(destino), exist_ok=True)
+                    # Cópia para um temporário na mesma pasta + os.replace: cada troca é atômica
+                    temporario = f"{destino}.update-tmp"
+                    shutil.copy2(os.path.join(preparado["staging_dir"], relativo), temporario)
+                    os.replace(temporario, destino)
+                else:
+                    os.remove(destino)
+        except Exception as e:
+            self._rollback_delta(trocados, backup_dir)
+            return {"status": "error", "message": f"Erro ao aplicar atualização, alterações desfeitas: {str(e)}"}
+
+        shutil.rmtree(preparado["staging_dir"], ignore_errors=True)
+        self.current_version = preparado["version"] or self.current_version
+        return {
+            "status": "success",
+            "message": "Atualização aplicada. Reinicie o aplicativo para usar a nova versão.",
+            "files": len(preparado["files"]),
+            "removed": len(preparado["removed"]),
+            "backup_dir": backup_dir,
+            "restart_required": True
+        }
+
+    def apply_delta_to_slot(self, preparado, healthcheck_port):
+        """Monta a nova versão no slot inativo, testa-a em outra porta e só então troca o ponteiro"""
+        try:
+            slot = self.slots.inactive
+            destino_slot = self.slots.prepare_inactive()
+            for relativo in preparado["files"]:
+                destino = os.path.join(destino_slot, relativo)
+                os.makedirs(os.path.dirname(destino), exist_ok=True)
+                shutil.copy2(os.path.join(preparado["staging_dir"], relativo), destino)
+            for relativo in preparado["removed"]:
+                os.remove(os.path.join(destino_slot, relativo))
+        except Exception as e:
+            return {"status": "error", "message": f"Erro ao preparar o slot da nova versão: {str(e)}"}
+
+        # A versão atual continua atendendo enquanto a nova é testada
+        saude = self.slots.health_check(slot, healthcheck_port, expected_version=preparado["version"])
+        if not saude["healthy"]:
             return {
                 "status": "error",
-                "message": f"Erro ao aplicar atualização: {str(e)}"
+                "message": f"A nova versão não passou na verificação: {saude['error']}",
+                "slot": slot
             }
-    
-    def _create_update_script(self, update_file):
-        """Cria um script para aplicar a atualização após o fechamento do aplicativo"""
-        # Cria um arquivo de script temporário
-        if sys.platform == "win32":
-            script_path = os.path.join(self.temp_dir, "update.bat")
-            
-            # Conteúdo do script batch para Windows
-            script_content = f"""
-@echo off
-echo Aguardando o fechamento do aplicativo...
-timeout /t 2 /nobreak > nul
-
-echo Aplicando atualização...
-start /wait "" "{update_file}"
 
-echo Limpando arquivos temporários...
-rd /s /q "{self.temp_dir}"
+        self.slots.flip(slot)
+        shutil.rmtree(preparado["staging_dir"], ignore_errors=True)
+        return {
+            "status": "success",
+            "message": "Nova versão verificada. O aplicativo será reiniciado nela.",
+            "slot": slot,
+            "health": saude,
+            "restart": True
+        }
 
-echo Atualização concluída!
-start "" "{os.path.join(self.app_path, self.app_name + '.exe')}"
+    def rollback(self):
+        """Volta imediatamente para a versão do slot anterior"""
+        if not self.slots:
+            return {"status": "error", "message": "Rollback disponível apenas na instalação em slots (launcher.py)."}
+        if not self.slots.rollback():
+            return {"status": "error", "message": "Não há versão anterior para restaurar."}
+        return {
+            "status": "success",
+            "message": f"Voltando para a versão {self.slots.slot_version(self.slots.active)}.",
+            "slot": self.slots.active,
+            "restart": True
+        }
 
-del "%~f0"
-"""
-        else:
-            script_path = os.path.join(self.temp_dir, "update.sh")
-            
-            # Conteúdo do script shell para Unix/Linux
-            script_content = f"""
-#!/bin/bash
-echo "Aguardando o fechamento do aplicativo..."
-sleep 2
+    def _rollback_delta(self, trocados, backup_dir):
+        for relativo, existia in reversed(trocados):
+            destino = os.path.join(self.app_path, relativo)
+            try:
+                if existia:
+                    shutil.copy2(os.path.join(backup_dir, relativo), destino)
+                elif os.path.exists(destino):
+                    os.remove(destino)
+            except Exception as e:
+                print(f"Erro ao restaurar {relativo}: {str(e)}")
 
-echo "Aplicando atualização..."
-chmod +x "{update_file}"
-"{update_file}"
+    @staticmethod
+    def _safe_relative_path(caminho):
+        """Normaliza um caminho do manifesto, recusando caminhos absolutos ou com '..'"""
+        relativo = os.path.normpath(caminho.replace("\\", "/")).replace("\\", "/")
+        if os.path.isabs(relativo) or relativo.startswith("..") or relativo == ".":
+            raise ValueError(f"Caminho inválido no manifesto: {caminho}")
+        return relativo
 
-echo "Limpando arquivos temporários..."
-rm -rf "{self.temp_dir}"
+    def apply_update(self, file_path, server_port=5000, expected_version=None):
+        """Aplica o instalador completo por meio de uma cópia do executável (modo --apply-installer)
 
-echo "Atualização concluída!"
-"{os.path.join(self.app_path, self.app_name)}"
+        A cópia espera o aplicativo fechar, guarda o executável atual e só mantém
+        a versão instalada se ela responder em /api/version; senão volta à anterior
+        """
+        # Esta função só funciona se o aplicativo estiver em modo frozen (executável)
+        if not self.is_frozen:
+            return {
+                "status": "error",
+                "message": "A atualização pelo instalador só funciona no modo executável."
+            }
+        if not os.path.exists(file_path):
+            return {
+                "status": "error",
+                "message": "Arquivo de atualização não encontrado."
+            }
 
-rm "$0"
-"""
-            
-            # Torna o script executável
-            os.chmod(script_path, 0o755)
-        
-        # Escreve o conteúdo no arquivo
-        with open(script_path, "w", encoding="utf-8") as f:
-            f.write(script_content)
-        
-        return script_path
-    
-    def cleanup(self):
-        """Limpa arquivos temporários"""
         try:
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir)
+            # O instalador sobrescreve o executável em uso: quem o aplica é uma cópia fora da instalação
+            auxiliar = os.path.join(self.download_dir, "update-helper" + os.path.splitext(sys.executable)[1])
+            shutil.copy2(sys.executable, auxiliar)
+            comando = [auxiliar, "--apply-installer", file_path, "--app", sys.executable, "--port", str(server_port)]
+            for pid in self._processos_do_aplicativo():
+                comando += ["--pid", str(pid)]
+            if expected_version:
+                comando += ["--version", expected_version]
+            if sys.platform == "win32":
+                opcoes = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+            else:
+                opcoes = {"start_new_session": True}
+            subprocess.Popen(comando, cwd=self.download_dir, close_fds=True, **opcoes)
         except Exception as e:
-            print(f"Erro ao limpar arquivos temporários: {str(e)}")
+            return {
+                "status": "error",
+                "message": f"Erro ao aplicar atualização: {str(e)}"
+            }
+
+        return {
+            "status": "success",
+            "message": ("Atualização iniciada. O aplicativo será fechado e a nova versão verificada; "
+                        "se ela não responder, a versão atual é restaurada."),
+            "exit": True
+        }
+
+    @staticmethod
+    def _processos_do_aplicativo():
+        # No executável onefile o processo do bootloader mantém o .exe aberto até o Python terminar
+        pids = [os.getpid()]
+        meipass = getattr(sys, '_MEIPASS', None)
+        if meipass and os.path.abspath(meipass) != os.path.dirname(os.path.abspath(sys.executable)):
+            pids.append(os.getppid())
+        return pids
 
 # Instância global do atualizador
 updater = Updater()
@@ -247,8 +747,8 @@ def check_for_updates():
     return updater.check_for_updates()
 
 # Função para baixar e aplicar atualizações
-def download_and_apply_update(download_url):
-    download_result = updater.download_update(download_url)
+def download_and_apply_update(download_url, sha256=None, segments=1):
+    download_result = updater.download_update(download_url, sha256=sha256, segments=segments)
     
     if download_result["status"] == "success":
         return updater.apply_update(download_result["file_path"])
@@ -257,4 +757,97 @@ def download_and_apply_update(download_url):
 
 # Função para obter a versão atual
 def get_current_version():
-    return updater.current_version
\ No newline at end of file
+    return updater.current_version
+
+# Modo auxiliar do executável (--apply-installer), iniciado por Updater.apply_update
+def apply_installer(argv=None):
+    """Aplica o instalador completo com o aplicativo fechado, voltando ao executável anterior se falhar"""
+    parser = argparse.ArgumentParser(prog="--apply-installer")
+    parser.add_argument("installer")
+    parser.add_argument("--app", required=True, help="executável instalado")
+    parser.add_argument("--pid", type=int, action="append", default=[], help="processos que precisam terminar antes")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--version", help="versão que a nova instalação deve informar")
+    args = parser.parse_args(argv)
+
+    registro = os.path.join(os.path.dirname(os.path.abspath(args.installer)), INSTALLER_LOG)
+    def registrar(mensagem):
+        print(mensagem)
+        try:
+            with open(registro, "a", encoding="utf-8") as f:
+                f.write(f"{datetime.now().isoformat(timespec='seconds')} {mensagem}\n")
+        except OSError:
+            pass
+
+    for pid in args.pid:
+        _aguardar_processo(pid, timeout=30)
+    pasta = os.path.dirname(os.path.abspath(args.app))
+    anterior = args.app + ".anterior"
+    try:
+        _copiar(args.app, anterior)
+    except OSError as e:
+        registrar(f"Erro: não foi possível guardar o executável atual, atualização cancelada: {str(e)}")
+        subprocess.Popen([args.app], cwd=pasta)
+        return 1
+
+    registrar(f"Aplicando {os.path.basename(args.installer)}...")
+    try:
+        codigo = subprocess.call(_comando_instalador(args.installer, pasta))
+        if codigo != 0:
+            raise RuntimeError(f"o instalador terminou com código {codigo}")
+        processo = subprocess.Popen([args.app], cwd=pasta)
+        resultado = wait_healthy(args.port, processo, args.version, INSTALLER_TRIAL_TIMEOUT)
+        if not resultado["healthy"]:
+            processo.terminate()
+            try:
+                processo.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+            raise RuntimeError(resultado["error"])
+    except Exception as e:
+        registrar(f"Erro: a nova versão não foi aplicada ({str(e)}), voltando ao executável anterior")
+        try:
+            _copiar(anterior, args.app)
+        except OSError as erro:
+            registrar(f"Erro: não foi possível restaurar o executável anterior: {str(erro)} (cópia em {anterior})")
+            return 1
+        subprocess.Popen([args.app], cwd=pasta)
+        return 1
+
+    registrar(f"Versão {resultado['version']} instalada e respondendo")
+    return 0
+
+def _comando_instalador(instalador, pasta):
+    if sys.platform == "win32":
+        # Inno Setup: sem janelas, na mesma pasta da instalação atual
+        return [instalador, "/VERYSILENT", "/SUPPRESSMSGBOXES", "/NORESTART", f"/DIR={pasta}"]
+    os.chmod(instalador, 0o755)
+    return [instalador]
+
+def _aguardar_processo(pid, timeout):
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x00100000, False, pid)  # SYNCHRONIZE
+        if handle:
+            kernel32.WaitForSingleObject(handle, int(timeout * 1000))
+            kernel32.CloseHandle(handle)
+        return
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return
+        time.sleep(0.2)
+
+def _copiar(origem, destino, tentativas=20):
+    # No Windows o executável continua bloqueado por alguns instantes depois que o processo termina
+    for tentativa in range(tentativas):
+        try:
+            shutil.copy2(origem, destino)
+            return
+        except PermissionError:
+            if tentativa == tentativas - 1:
+                raise
+            time.sleep(0.5)
\ No newline at end of file
@@ -1,27 +1,59 @@
-from flask import Flask, jsonify, send_from_directory, render_template, request, session, redirect, url_for
+# Primeiro import: marca o início da medição do tempo de inicialização
+from modules.startup import startup_report
+from flask import Flask, Response, g, jsonify, render_template, request, session, redirect, url_for, abort
+from werkzeug.security import safe_join
 import os
 import json
 import sys
-import requests
 from datetime import datetime
 import glob
+import argparse
+import multiprocessing
+import threading
+import time
+
+# Cópia do executável que aplica o instalador depois que o aplicativo fecha (Updater.apply_update)
+if __name__ == "__main__" and sys.argv[1:2] == ["--apply-installer"]:
+    from modules.updater import apply_installer
+    sys.exit(apply_installer(sys.argv[2:]))
+
 from modules.printer import PrinterConfig
+from modules.gallery import (PREVIEW_FORMATS, ChangeFeed, HotFolderIngest, ImagesFolderResolver, PhotoCatalog, PhotoIndex,
+                             PrewarmPool, ThumbnailCache, ValidationCache, data_da_pasta)
+from modules.server_runner import run_production
+from modules.http_cache import IMMUTABLE_MAX_AGE, StaticFingerprints, send_cached_file, send_cached_path
+from modules.metrics import metrics
+from modules.release_poller import GITHUB_RELEASES_URL, ReleasePoller
+from modules.updater import updater
+from modules.slots import RESTART_EXIT_CODE
 
 import hashlib
 from functools import wraps
 
 # Importa o módulo de impressão
 try:
-    from modules.printer import Printer
+    from modules.printer import AUTO_BALANCE, Printer, PrinterBalancer, PrintQueue, PrintRenderer, get_printer_registry
     PRINTER_AVAILABLE = True
 except ImportError:
     print("Aviso: Módulo de impressão não disponível. Funcionalidade de impressão será limitada.")
     PRINTER_AVAILABLE = False
+startup_report.mark("imports")
 
-app = Flask(__name__)
+# Os arquivos estáticos são servidos pela rota serve_static (com cache HTTP)
+app = Flask(__name__, static_folder=None)
 app.secret_key = 'kiosk_fotos_secret_key_2024'  # Chave secreta para sessões
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Templates pré-compilados pelo build_executable.py --precompile-templates (evita compilar o Jinja na partida)
+TEMPLATES_COMPILADOS = os.path.join(BASE_DIR, 'templates_compiled')
+if os.path.isdir(TEMPLATES_COMPILADOS):
+    from jinja2 import ChoiceLoader, ModuleLoader
+    # ModuleLoader não fornece o código-fonte, por isso substitui o loader do ambiente (e não o do app)
+    app.jinja_env.loader = ChoiceLoader([ModuleLoader(TEMPLATES_COMPILADOS), app.jinja_env.loader])
+# Na instalação em slots (launcher.py) dados e cache ficam fora do slot e são compartilhados
+CACHE_DIR = os.environ.get('KIOSK_CACHE_DIR') or os.path.join(BASE_DIR, 'cache')
+DATA_DIR = os.environ.get('KIOSK_DATA_DIR') or os.path.join(BASE_DIR, 'data')
+
 # Configurações de autenticação
 ADMIN_PASSWORD_HASH = hashlib.sha256('869407'.encode()).hexdigest()  # Senha: 869407
 
@@ -52,44 +84,208 @@ except FileNotFoundError:
     CONFIG = {"server": {"host": "0.0.0.0", "port": 5000, "debug": True}, "image_settings": {"base_path": "", "allowed_extensions": []}}
     THEMES_CONFIG = {"current_theme": "default", "available_themes": []}
 
+# Política de cache HTTP para fotos, miniaturas e arquivos estáticos
+HTTP_CACHE_SETTINGS = CONFIG.get("http_cache", {})
+IMAGES_MAX_AGE = HTTP_CACHE_SETTINGS.get("images_max_age", 86400)
+STATIC_MAX_AGE = HTTP_CACHE_SETTINGS.get("static_max_age", 3600)
+static_fingerprints = StaticFingerprints(os.path.join(BASE_DIR, 'static'))
+
 # Inicializa módulos
-printer_config = PrinterConfig()
+printer_config = PrinterConfig(os.path.join(BASE_DIR, 'config', 'printer_settings.json'))
+
+# Resolve a pasta de imagens do dia, com cache invalidado à meia-noite,
+# quando a pasta base muda ou quando surge uma nova pasta de data
+folder_resolver = ImagesFolderResolver(lambda: CONFIG["image_settings"]["base_path"])
 
 # Função para obter o caminho da pasta de imagens do dia atual
 def get_images_folder_path():
-    # Verifica se a pasta base existe
-    base_path = CONFIG["image_settings"]["base_path"]
-    if not os.path.exists(base_path):
-        print(f"Aviso: Pasta base de imagens não encontrada: {base_path}")
-        return base_path
-    
-    # Formata a data atual
-    hoje = datetime.now()
-    data_formatada = hoje.strftime("%d%m%Y")
+    return folder_resolver.resolve()
+
+# O índice verifica a pasta base a cada ciclo, detectando pastas de data novas
+def _pasta_do_indice():
+    folder_resolver.check_for_changes()
+    return folder_resolver.resolve()
+
+# Índice das fotos da pasta do dia, atualizado em segundo plano
+photo_index = PhotoIndex(
+    _pasta_do_indice,
+    CONFIG["image_settings"]["allowed_extensions"],
+    poll_interval=CONFIG["image_settings"].get("index_poll_interval", 1.0)
+)
+
+# Deltas do índice enviados aos quiosques por /api/images/stream
+STREAM_SETTINGS = CONFIG.get("image_stream", {})
+change_feed = ChangeFeed(photo_index, max_events=STREAM_SETTINGS.get("max_events", 500))
+STREAM_HEARTBEAT = STREAM_SETTINGS.get("heartbeat", 15)
+# Cada stream ocupa uma thread do servidor: a duração é limitada (o EventSource reconecta com o
+# Last-Event-ID) e acima de max_streams o cliente recebe 503 e passa a consultar por paginação
+STREAM_MAX_DURATION = STREAM_SETTINGS.get("max_duration", 55)
+STREAM_MAX_CLIENTS = STREAM_SETTINGS.get("max_streams") or max(1, CONFIG.get("server", {}).get("threads", 8) // 2)
+streams_lock = threading.Lock()
+streams_abertos = 0
+
+# Catálogo de todas as pastas de data, consultado por /api/catalog
+CATALOG_SETTINGS = CONFIG.get("catalog", {})
+photo_catalog = PhotoCatalog(
+    os.path.join(DATA_DIR, 'catalog.db'),
+    lambda: CONFIG["image_settings"]["base_path"],
+    CONFIG["image_settings"]["allowed_extensions"],
+    poll_interval=CATALOG_SETTINGS.get("poll_interval", 10.0)
+) if CATALOG_SETTINGS.get("enabled", True) else None
+
+# Paginação de /api/images (?limit=&cursor=)
+PAGE_SIZE_DEFAULT = CONFIG["image_settings"].get("page_size", 60)
+PAGE_SIZE_MAX = CONFIG["image_settings"].get("max_page_size", 500)
+
+# Cache em disco das miniaturas exibidas na galeria
+THUMBNAIL_SETTINGS = CONFIG.get("thumbnails", {})
+thumbnail_cache = ThumbnailCache(
+    THUMBNAIL_SETTINGS.get("cache_path") or CACHE_DIR,
+    sizes=THUMBNAIL_SETTINGS.get("sizes", [160, 320]),
+    quality=THUMBNAIL_SETTINGS.get("quality", 80),
+    preview_size=THUMBNAIL_SETTINGS.get("preview_size", [1920, 1080]),
+    preview_quality=THUMBNAIL_SETTINGS.get("preview_quality", 85),
+    preview_formats=THUMBNAIL_SETTINGS.get("preview_formats", ["webp", "jpeg"]),
+    max_age_days=THUMBNAIL_SETTINGS.get("max_age_days", 30),
+    max_bytes=(THUMBNAIL_SETTINGS.get("max_size_mb") or 0) * 1024 * 1024
+)
+
+# Pool de processos que pré-gera miniaturas e prévias das fotos novas
+PREWARM_SETTINGS = CONFIG.get("prewarm", {})
+prewarm_pool = PrewarmPool(
+    thumbnail_cache,
+    workers=PREWARM_SETTINGS.get("workers"),
+    max_queue=PREWARM_SETTINGS.get("max_queue", 1000),
+    prune_interval=PREWARM_SETTINGS.get("prune_interval", 3600)
+)
+
+# Resultado do Image.verify() de cada foto, para a impressão não reler o arquivo inteiro
+VALIDATION_SETTINGS = CONFIG.get("validation", {})
+validation_cache = ValidationCache(
+    os.path.join(DATA_DIR, 'validation.db'),
+    workers=VALIDATION_SETTINGS.get("workers", 4)
+)
+
+# Ingestão das pastas de entrada (cartão ou pasta de rede) para as pastas de data
+INGEST_SETTINGS = CONFIG.get("ingest", {})
+hot_folder = HotFolderIngest(
+    INGEST_SETTINGS.get("drop_folders", []),
+    lambda: CONFIG["image_settings"]["base_path"],
+    CONFIG["image_settings"]["allowed_extensions"],
+    os.path.join(DATA_DIR, 'ingest.db'),
+    workers=INGEST_SETTINGS.get("workers", 4),
+    poll_interval=INGEST_SETTINGS.get("poll_interval", 2.0),
+    stable_seconds=INGEST_SETTINGS.get("stable_seconds", 3.0),
+    delete_source=INGEST_SETTINGS.get("delete_source", False),
+    normalize_orientation=INGEST_SETTINGS.get("normalize_orientation", True),
+    jpeg_quality=INGEST_SETTINGS.get("jpeg_quality", 95),
+    validation_cache=validation_cache
+) if INGEST_SETTINGS.get("enabled") else None
+
+# Fila persistente de impressão (os trabalhos sobrevivem a reinicializações)
+PRINT_QUEUE_SETTINGS = CONFIG.get("print_queue", {})
+print_queue = None
+if PRINTER_AVAILABLE:
+    # As fotos são renderizadas no tamanho do papel uma vez e reaproveitadas em reimpressões
+    RENDER_CACHE_SETTINGS = CONFIG.get("printer", {}).get("render_cache", {})
+    print_renderer = PrintRenderer(
+        CACHE_DIR,
+        max_age_days=RENDER_CACHE_SETTINGS.get("max_age_days", 7),
+        max_bytes=(RENDER_CACHE_SETTINGS.get("max_size_mb") or 0) * 1024 * 1024
+    )
+    # Limpo junto com as miniaturas, no ciclo do pool de pré-geração
+    prewarm_pool.add_prunable("impressões", print_renderer)
     
-    # Procura pela pasta com a data do dia
-    images_dir = os.path.join(base_path, data_formatada)
+    def criar_impressora():
+        return Printer(
+            CONFIG.get("printer", {}),
+            renderer=print_renderer,
+            print_options=printer_config.get_print_options(),
+            validation_cache=validation_cache
+        )
     
-    # Se a pasta do dia não existir, verifica se há outras pastas de data
-    if not os.path.exists(images_dir):
-        print(f"Aviso: Pasta do dia {data_formatada} não encontrada, procurando outras pastas de data...")
-        try:
-            # Lista todas as pastas na pasta base
-            pastas = [d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d))]
-            # Filtra apenas pastas que parecem ser datas (8 dígitos)
-            pastas_data = [p for p in pastas if p.isdigit() and len(p) == 8]
-            
-            if pastas_data:
-                # Ordena por data mais recente
-                pastas_data.sort(reverse=True)
-                images_dir = os.path.join(base_path, pastas_data[0])
-                print(f"Usando pasta mais recente encontrada: {pastas_data[0]}")
-            else:
-                print("Nenhuma pasta de data encontrada na pasta base.")
-        except Exception as e:
-            print(f"Erro ao procurar pastas de data: {str(e)}")
+    # Carga e saúde das impressoras para os trabalhos enviados a 'auto-balance'
+    BALANCE_SETTINGS = CONFIG.get("printer", {}).get("balance", {})
+    printer_balancer = PrinterBalancer(
+        get_printer_registry(CONFIG.get("printer", {}).get("discovery_ttl")),
+        printers=BALANCE_SETTINGS.get("printers"),
+        max_spooler_depth=BALANCE_SETTINGS.get("max_spooler_depth", 2),
+        depth_ttl=BALANCE_SETTINGS.get("depth_ttl", 2.0),
+        cooldown=BALANCE_SETTINGS.get("cooldown", 30.0),
+        max_cooldown=BALANCE_SETTINGS.get("max_cooldown", 600.0),
+        default_duration=BALANCE_SETTINGS.get("default_duration", 15.0)
+    )
     
-    return images_dir
+    print_queue = PrintQueue(
+        os.path.join(DATA_DIR, 'print_jobs.db'),
+        criar_impressora,
+        max_attempts=PRINT_QUEUE_SETTINGS.get("max_attempts", 5),
+        retry_delay=PRINT_QUEUE_SETTINGS.get("retry_delay", 5.0),
+        max_retry_delay=PRINT_QUEUE_SETTINGS.get("max_retry_delay", 300.0),
+        balancer=printer_balancer
+    )
+
+def destino_impressao(printer_name):
+    """Impressora pedida pelo quiosque; 'auto'/'default' seguem default_printer quando ele é 'auto-balance'"""
+    if printer_name in (None, '', 'auto', 'default') and CONFIG.get("printer", {}).get("default_printer") == AUTO_BALANCE:
+        return AUTO_BALANCE
+    return printer_name or 'auto'
+
+# Última release consultada em segundo plano; as rotas de atualização respondem da memória
+UPDATES_SETTINGS = CONFIG.get("updates", {})
+release_poller = ReleasePoller(
+    UPDATES_SETTINGS.get("release_url") or GITHUB_RELEASES_URL,
+    interval=UPDATES_SETTINGS.get("check_interval", 1800),
+    retry_interval=UPDATES_SETTINGS.get("retry_interval", 300),
+    cache_path=os.path.join(DATA_DIR, 'release_cache.json')
+)
+
+# Métricas dos caminhos críticos, expostas em /api/metrics (formato do Prometheus)
+METRICS_SETTINGS = CONFIG.get("metrics", {})
+REQUEST_SECONDS = metrics.histogram('kiosk_http_request_duration_seconds', 'Duração das requisições por rota')
+IMAGES_BYTES_SENT = metrics.counter('kiosk_images_bytes_sent_total', 'Bytes enviados por /imagens')
+metrics.counter('kiosk_folder_resolver_fallbacks_total', 'Vezes em que a pasta do dia não existia e outra pasta de data foi procurada',
+                lambda: folder_resolver.stats()["fallbacks"])
+metrics.counter('kiosk_folder_resolver_misses_total', 'Resoluções da pasta de imagens que consultaram o disco',
+                lambda: folder_resolver.stats()["misses"])
+metrics.gauge('kiosk_index_groups', 'Fotos (grupos) no índice da pasta atual', lambda: len(photo_index.snapshot().groups))
+if print_queue:
+    metrics.gauge('kiosk_print_queue_depth', 'Trabalhos de impressão aguardando ou em impressão', print_queue.pending_count)
+
+# Inicia os serviços em segundo plano (índice de fotos, pré-geração, fila de impressão e atualizações)
+def iniciar_servicos():
+    if print_queue:
+        print_queue.start()
+    release_poller.start()
+    if PREWARM_SETTINGS.get("enabled", True):
+        prewarm_pool.start()
+        photo_index.add_listener(prewarm_pool.on_index_change)
+    if photo_catalog:
+        photo_index.add_listener(photo_catalog.on_index_change)
+        photo_catalog.start()
+    validation_cache.start()
+    photo_index.add_listener(validation_cache.on_index_change)
+    photo_index.start()
+    change_feed.start()
+    if hot_folder:
+        hot_folder.start()
+    startup_report.mark("services")
+    print(startup_report.summary())
+
+@app.before_request
+def registrar_primeira_requisicao():
+    startup_report.first_request()
+    g.inicio_requisicao = time.perf_counter()
+
+@app.after_request
+def medir_requisicao(response):
+    inicio = g.pop('inicio_requisicao', None)
+    if inicio is not None:
+        # A regra da rota (e não a URL) mantém o número de séries limitado
+        rota = request.url_rule.rule if request.url_rule else 'nao_encontrada'
+        REQUEST_SECONDS.observe(time.perf_counter() - inicio, route=rota, method=request.method,
+                                status=response.status_code)
+    return response
 
 @app.route("/")
 def index():
@@ -146,6 +342,10 @@ def update_config():
             # Salva as configurações atualizadas no arquivo
             with open(os.path.join(BASE_DIR, 'config', 'settings.json'), 'w') as f:
                 json.dump(CONFIG, f, indent=4)
+            
+            # Resolve e reindexa imediatamente a nova pasta
+            folder_resolver.invalidate()
+            photo_index.refresh()
                 
             return jsonify({"status": "success", "message": "Configurações atualizadas com sucesso"})
         else:
@@ -153,11 +353,21 @@ def update_config():
     except Exception as e:
         return jsonify({"status": "error", "message": f"Erro ao atualizar configurações: {str(e)}"}), 500
 
+def marcar_invalidas(pasta, grupos):
+    """Acrescenta aos grupos a lista "invalid" com os arquivos corrompidos, que não devem ser impressos"""
+    for grupo in grupos:
+        invalidas = [nome for nome in grupo["files"] if validation_cache.is_corrupt(os.path.join(pasta, nome))]
+        if invalidas:
+            grupo["invalid"] = invalidas
+    return grupos
+
 @app.route("/api/images")
 def listar_imagens():
-    images_dir = get_images_folder_path()
+    # Serve a listagem a partir do índice em memória (sem acessar o disco)
+    indice = photo_index.snapshot()
+    images_dir = indice.folder
     
-    if not os.path.exists(images_dir):
+    if not indice.exists:
         return jsonify({
             "erro": f"Pasta de imagens '{os.path.basename(images_dir)}' não encontrada.",
             "pasta_base": CONFIG["image_settings"]["base_path"],
@@ -165,51 +375,224 @@ def listar_imagens():
             "solucao": "Verifique se a pasta base está correta na página de configuração (/config)."
         }), 404
 
-    imagens_agrupadas = {}
-    try:
-        arquivos = sorted(os.listdir(images_dir))
-        arquivos_imagem = [f for f in arquivos if f.lower().endswith(tuple(CONFIG["image_settings"]["allowed_extensions"]))]
-        
-        if not arquivos_imagem:
-            return jsonify({
-                "erro": f"Nenhuma imagem encontrada na pasta '{os.path.basename(images_dir)}'.",
-                "pasta_base": CONFIG["image_settings"]["base_path"],
-                "pasta_atual": images_dir,
-                "solucao": "Verifique se as imagens foram copiadas para a pasta correta."
-            }), 404
-            
-        for f in arquivos_imagem:
-            partes = f.split('_')
-            if len(partes) >= 3:
-                id_foto = partes[-1].split('.')[0]
-                if id_foto not in imagens_agrupadas:
-                    imagens_agrupadas[id_foto] = []
-                imagens_agrupadas[id_foto].append(f)
-            else:
-                # Para imagens que não seguem o padrão de nomenclatura
-                nome_base = os.path.splitext(f)[0]
-                if nome_base not in imagens_agrupadas:
-                    imagens_agrupadas[nome_base] = []
-                imagens_agrupadas[nome_base].append(f)
-    except Exception as e:
+    if indice.error:
         return jsonify({
-            "erro": f"Erro ao processar as imagens: {str(e)}",
+            "erro": f"Erro ao processar as imagens: {indice.error}",
             "pasta_base": CONFIG["image_settings"]["base_path"],
             "pasta_atual": images_dir,
             "solucao": "Verifique as permissões da pasta ou se o formato das imagens é suportado."
         }), 500
-        
-    return jsonify(imagens_agrupadas)
+
+    if not indice.groups:
+        return jsonify({
+            "erro": f"Nenhuma imagem encontrada na pasta '{os.path.basename(images_dir)}'.",
+            "pasta_base": CONFIG["image_settings"]["base_path"],
+            "pasta_atual": images_dir,
+            "solucao": "Verifique se as imagens foram copiadas para a pasta correta."
+        }), 404
+    
+    limite = request.args.get("limit")
+    cursor = request.args.get("cursor")
+    if limite is None and cursor is None:
+        # Formato antigo ({id: [arquivos]}) para clientes que não paginam: não há onde incluir
+        # a lista "invalid" sem mudar o formato, então as corrompidas não vêm marcadas (a
+        # impressão continua recusando-as)
+        body, etag = indice.body, indice.etag
+    else:
+        try:
+            limite = min(max(int(limite or PAGE_SIZE_DEFAULT), 1), PAGE_SIZE_MAX)
+            pagina = indice.page(limite, cursor)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": f"Parâmetros de paginação inválidos: {str(e)}"}), 400
+        marcar_invalidas(images_dir, pagina["groups"])
+        body = json.dumps(pagina, separators=(',', ':')).encode('utf-8')
+        etag = hashlib.sha1(f"{indice.etag}|{validation_cache.version}|{limite}|{cursor or ''}".encode('utf-8')).hexdigest()
+
+    # ETag permite que listagens inalteradas retornem 304
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+# Busca por número da foto (prefixo do id) para a caixa de busca do quiosque
+@app.route("/api/images/search")
+def buscar_imagens():
+    try:
+        limite = min(max(int(request.args.get("limit", 20)), 1), PAGE_SIZE_MAX)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Limite inválido"}), 400
+    indice = photo_index.snapshot()
+    resultado = indice.search(request.args.get("q", ""), limite)
+    marcar_invalidas(indice.folder, resultado["groups"])
+    response = jsonify(resultado)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+@app.route("/api/images/stream")
+def stream_imagens():
+    # Server-Sent Events: o cliente informa a versão que já tem (since ou Last-Event-ID)
+    # e recebe só os grupos adicionados, alterados ou removidos depois dela
+    try:
+        versao = int(request.headers.get("Last-Event-ID") or request.args.get("since") or change_feed.version)
+    except ValueError:
+        return jsonify({"status": "error", "message": "Versão inválida"}), 400
+
+    def formatar(evento):
+        dados = json.dumps(evento, separators=(',', ':'))
+        return f"id: {evento['version']}\nevent: {evento['type']}\ndata: {dados}\n\n"
+
+    global streams_abertos
+    with streams_lock:
+        if streams_abertos >= STREAM_MAX_CLIENTS:
+            response = jsonify({"status": "error", "message": "Muitas conexões ao vivo abertas; use a paginação"})
+            response.status_code = 503
+            response.headers["Retry-After"] = "30"
+            return response
+        streams_abertos += 1
+
+    def liberar():
+        global streams_abertos
+        with streams_lock:
+            streams_abertos -= 1
+
+    def gerar(versao):
+        yield "retry: 3000\n\n"
+        fim = time.monotonic() + STREAM_MAX_DURATION
+        while True:
+            restante = fim - time.monotonic()
+            if restante <= 0:
+                # Libera a thread; o navegador reconecta com o Last-Event-ID desta versão
+                yield f"id: {versao}\n\n"
+                return
+            eventos = change_feed.wait(versao, timeout=min(STREAM_HEARTBEAT, restante))
+            if eventos is None:
+                # Histórico insuficiente ou outra instância do servidor: recarregar a lista
+                yield formatar({"type": "reset", "version": change_feed.version})
+                return
+            if not eventos:
+                # Comentário periódico mantém a conexão viva e detecta clientes desconectados
+                yield ": ping\n\n"
+                continue
+            for evento in eventos:
+                yield formatar(evento)
+                versao = evento["version"]
+
+    response = Response(gerar(versao), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+    # call_on_close roda mesmo se o cliente desconectar antes do primeiro evento
+    response.call_on_close(liberar)
+    return response
 
 @app.route("/imagens/<path:nome>")
 def servir_imagem(nome):
     images_dir = get_images_folder_path()
-    return send_from_directory(images_dir, nome)
+    response = send_cached_file(images_dir, nome, max_age=IMAGES_MAX_AGE)
+    # Respostas 304 não têm corpo; em 206 conta só o trecho enviado
+    IMAGES_BYTES_SENT.inc(response.content_length or 0)
+    return response
+
+@app.route("/thumbs/<int:size>/<path:nome>")
+def servir_miniatura(size, nome):
+    return enviar_miniatura(get_images_folder_path(), nome, size)
+
+def enviar_miniatura(images_dir, nome, size):
+    if size not in thumbnail_cache.sizes:
+        abort(404)
+    
+    origem = safe_join(images_dir, nome)
+    if origem is None or not os.path.isfile(origem):
+        abort(404)
+    
+    try:
+        caminho = thumbnail_cache.get(origem, size)
+    except Exception as e:
+        # Se não for possível gerar a miniatura, entrega a imagem original
+        print(f"Erro ao gerar miniatura de {nome}: {str(e)}")
+        return send_cached_path(origem, max_age=IMAGES_MAX_AGE)
+    
+    return send_cached_path(caminho, max_age=IMAGES_MAX_AGE, mimetype="image/jpeg")
+
+@app.route("/previews/<path:nome>")
+def servir_previa(nome):
+    images_dir = get_images_folder_path()
+    origem = safe_join(images_dir, nome)
+    if origem is None or not os.path.isfile(origem):
+        abort(404)
+    
+    # WebP só para quem o anuncia explicitamente no Accept (image/* não basta)
+    aceitos = {tipo for tipo, qualidade in request.accept_mimetypes if qualidade > 0}
+    formato = thumbnail_cache.negotiate_preview(aceitos)
+    try:
+        caminho, mimetype = thumbnail_cache.get_preview(origem, formato), PREVIEW_FORMATS[formato][1]
+    except Exception as e:
+        print(f"Erro ao gerar prévia de {nome}: {str(e)}")
+        caminho, mimetype = origem, None
+    
+    response = send_cached_path(caminho, max_age=IMAGES_MAX_AGE, mimetype=mimetype)
+    # A mesma URL tem conteúdo diferente conforme o Accept: caches intermediários precisam saber
+    response.vary.add('Accept')
+    return response
+
+# Fotos de qualquer dia do catálogo: /catalog/imagens/<ddmmyyyy>/<nome>
+def pasta_do_catalogo(pasta):
+    if data_da_pasta(pasta) is None:
+        abort(404)
+    return os.path.join(CONFIG["image_settings"]["base_path"], pasta)
+
+@app.route("/catalog/imagens/<pasta>/<path:nome>")
+def servir_imagem_catalogo(pasta, nome):
+    return send_cached_file(pasta_do_catalogo(pasta), nome, max_age=IMAGES_MAX_AGE)
+
+@app.route("/catalog/thumbs/<int:size>/<pasta>/<path:nome>")
+def servir_miniatura_catalogo(size, pasta, nome):
+    return enviar_miniatura(pasta_do_catalogo(pasta), nome, size)
+
+# Consulta o catálogo por período (?from=&to=, yyyy-mm-dd) e/ou id (?id=), com paginação (?limit=&offset=)
+@app.route("/api/catalog")
+def consultar_catalogo():
+    if not photo_catalog:
+        return jsonify({"status": "error", "message": "Catálogo desativado"}), 404
+    try:
+        inicio = datetime.strptime(request.args["from"], "%Y-%m-%d").date() if request.args.get("from") else None
+        fim = datetime.strptime(request.args["to"], "%Y-%m-%d").date() if request.args.get("to") else None
+        limite = min(max(int(request.args.get("limit", PAGE_SIZE_DEFAULT)), 1), PAGE_SIZE_MAX)
+        deslocamento = max(int(request.args.get("offset", 0)), 0)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Parâmetros inválidos: {str(e)}"}), 400
+    
+    resultado = photo_catalog.query(inicio, fim, request.args.get("id") or None, limite, deslocamento)
+    miniatura = thumbnail_cache.sizes[-1]
+    for grupo in resultado["groups"]:
+        for arquivo in grupo["files"]:
+            arquivo["url"] = url_for("servir_imagem_catalogo", pasta=grupo["folder"], nome=arquivo["name"])
+            arquivo["thumb_url"] = url_for("servir_miniatura_catalogo", size=miniatura, pasta=grupo["folder"], nome=arquivo["name"])
+    return jsonify(resultado)
+
+# Datas disponíveis no catálogo, com a quantidade de fotos de cada uma
+@app.route("/api/catalog/dates")
+def datas_catalogo():
+    if not photo_catalog:
+        return jsonify({"status": "error", "message": "Catálogo desativado"}), 404
+    return jsonify({"dates": photo_catalog.dates(), **photo_catalog.stats()})
 
 # Adiciona rota para servir arquivos estáticos, incluindo temas
-@app.route('/static/<path:filename>')
+@app.route('/static/<path:filename>', endpoint='static')
 def serve_static(filename):
-    return send_from_directory(os.path.join(BASE_DIR, 'static'), filename)
+    # URLs com a impressão digital atual (?v=...) podem ficar em cache para sempre
+    versao = request.args.get('v')
+    if versao and versao == static_fingerprints.get(filename):
+        return send_cached_file(os.path.join(BASE_DIR, 'static'), filename, max_age=IMMUTABLE_MAX_AGE, immutable=True)
+    return send_cached_file(os.path.join(BASE_DIR, 'static'), filename, max_age=STATIC_MAX_AGE)
+
+# Acrescenta a impressão digital do conteúdo às URLs geradas com url_for('static', ...)
+@app.url_defaults
+def versionar_estaticos(endpoint, values):
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        fingerprint = static_fingerprints.get(values['filename'])
+        if fingerprint:
+            values['v'] = fingerprint
 
 
 
@@ -226,110 +609,170 @@ def get_system_info():
         "version": VERSION_INFO.get('version', '1.0.0'),
         "build_date": VERSION_INFO.get('build_date', 'N/A'),
         "build_number": VERSION_INFO.get('build_number', 'N/A'),
-        "status": "Operacional"
+        "status": "Operacional",
+        "images_folder": folder_resolver.stats(),
+        "updates": release_poller.stats()
+    })
+
+# API com o tempo de inicialização (etapas, imports sob demanda e primeira requisição)
+@app.route('/api/system/startup')
+@require_auth
+def get_startup_report():
+    return jsonify(startup_report.report())
+
+# Métricas no formato de exposição do Prometheus (ou em JSON com ?format=json, usado pelo painel)
+@app.route('/api/metrics')
+def get_metrics():
+    token = METRICS_SETTINGS.get("token")
+    autorizado = session.get('authenticated') or (
+        token and request.headers.get('Authorization') == f"Bearer {token}")
+    if not autorizado:
+        return jsonify({"status": "error", "message": "Não autorizado"}), 401
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.summary())
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# API com o estado da ingestão das pastas de entrada
+@app.route('/api/system/ingest')
+@require_auth
+def get_ingest_stats():
+    if not hot_folder:
+        return jsonify({"enabled": False})
+    return jsonify(dict(hot_folder.stats(), enabled=True))
+
+# API do cache de validação das fotos; POST verifica em segundo plano todas as fotos da pasta atual
+@app.route('/api/system/validation', methods=['GET', 'POST'])
+@require_auth
+def validation_status():
+    if request.method == 'POST':
+        enviadas = validation_cache.verify_folder(photo_index.snapshot().folder, CONFIG["image_settings"]["allowed_extensions"])
+        return jsonify({"status": "success", "submitted": enviadas}), 202
+    return jsonify(validation_cache.stats())
+
+# API com métricas da pré-geração de miniaturas
+@app.route('/api/system/prewarm')
+@require_auth
+def get_prewarm_stats():
+    return jsonify(prewarm_pool.stats())
+
+# Compara a versão atual com a última release conhecida pelo release_poller
+def _verificar_release():
+    release = release_poller.latest()
+    if release is None:
+        return None, None
+    current_version = VERSION_INFO.get('version', '1.0.0')
+    latest_version = (release.get('tag_name') or '').replace('v', '')
+    # Compara versões (simples comparação de string para versões semânticas)
+    return release, {
+        "update_available": latest_version != current_version,
+        "current_version": current_version,
+        "latest_version": latest_version
+    }
+
+# Antes da primeira consulta bem-sucedida ainda não se sabe se há atualização; não é um erro do servidor
+def _release_desconhecida():
+    erro = release_poller.stats()["error"]
+    return jsonify({
+        "status": "unknown" if erro else "checking",
+        "update_available": False,
+        "current_version": VERSION_INFO.get('version', '1.0.0'),
+        "message": ("Não foi possível conectar ao servidor de atualizações. Verifique sua internet." if erro
+                    else "Verificando atualizações, tente novamente em instantes.")
     })
 
 # API para verificar atualizações
 @app.route('/api/system/check-updates')
 @require_auth
 def check_updates():
-    try:
-        current_version = VERSION_INFO.get('version', '1.0.0')
-        
-        # URL da API do GitHub para obter a última release
-        github_api_url = "https://api.github.com/repos/Sploit23/kiosk-updates/releases/latest"
-        
-        # Faz requisição para a API do GitHub
-        response = requests.get(github_api_url, timeout=10)
-        
-        if response.status_code != 200:
-            return jsonify({
-                "status": "error",
-                "message": "Não foi possível conectar ao servidor de atualizações."
-            }), 500
-        
-        release_data = response.json()
-        latest_version = release_data.get('tag_name', '').replace('v', '')
-        release_date = release_data.get('published_at', '')[:10]  # Apenas a data
-        
-        # Compara versões (simples comparação de string para versões semânticas)
-        update_available = latest_version != current_version
-        
+    release, resultado = _verificar_release()
+    if release is None:
+        return _release_desconhecida()
+
+    if resultado["update_available"]:
         # Extrai principais mudanças do changelog atual
         changelog = VERSION_INFO.get('changelog', [])
         if isinstance(changelog, list) and len(changelog) > 0:
             latest_changes = changelog[0].get('changes', []) if isinstance(changelog[0], dict) else []
         else:
             latest_changes = ["Melhorias gerais no sistema", "Correções de bugs", "Otimizações de performance"]
-        
-        if update_available:
-            return jsonify({
-                "update_available": True,
-                "current_version": current_version,
-                "latest_version": latest_version,
-                "release_date": release_date,
-                "changes": latest_changes,
-                "download_url": release_data.get('html_url', '')
-            })
-        else:
-            return jsonify({
-                "update_available": False,
-                "current_version": current_version,
-                "latest_version": latest_version
-            })
-            
-    except requests.exceptions.RequestException as e:
-        return jsonify({
-            "status": "error",
-            "message": "Erro de conexão. Verifique sua internet."
-        }), 500
-    except Exception as e:
+
+        resultado.update({
+            "release_date": (release.get('published_at') or '')[:10],  # Apenas a data
+            "changes": latest_changes,
+            "download_url": release.get('html_url') or ''
+        })
+    return jsonify(resultado)
+
+# Inicia em segundo plano o download da atualização publicada no manifesto
+@app.route('/api/system/update/download', methods=['POST'])
+@require_auth
+def start_update_download():
+    progresso = updater.download_progress()
+    if progresso["status"] == "downloading":
+        return jsonify(progresso), 202
+
+    info = updater.check_for_updates()
+    if not info.get("has_update"):
         return jsonify({
             "status": "error",
-            "message": f"Erro interno: {str(e)}"
-        }), 500
+            "message": info.get("message", "Nenhuma atualização disponível.")
+        }), 400
+
+    # Baixa só os arquivos alterados quando o manifesto permitir; senão, o instalador completo
+    threading.Thread(
+        target=updater.prepare_update,
+        kwargs={"segments": UPDATES_SETTINGS.get("download_segments", 4)},
+        name='update-download',
+        daemon=True
+    ).start()
+    return jsonify({"status": "started", "latest_version": info.get("latest_version")}), 202
+
+# Encerra o processo logo após a resposta; o launcher sobe de novo o slot ativo
+def agendar_reinicio():
+    if not os.environ.get("KIOSK_LAUNCHER"):
+        return False
+    threading.Timer(1.0, os._exit, args=(RESTART_EXIT_CODE,)).start()
+    return True
+
+def _resposta_atualizacao(resultado):
+    if resultado["status"] == "success" and resultado.pop("restart", False):
+        resultado["restart_required"] = not agendar_reinicio()
+    if resultado["status"] == "success" and resultado.pop("exit", False):
+        # O instalador só é aplicado depois que o aplicativo fecha
+        threading.Timer(1.0, os._exit, args=(0,)).start()
+    return jsonify(resultado), 200 if resultado["status"] == "success" else 400
+
+# Aplica a atualização já baixada (slot A/B, troca de arquivos ou instalador com verificação e rollback)
+@app.route('/api/system/update/apply', methods=['POST'])
+@require_auth
+def apply_downloaded_update():
+    porta_teste = UPDATES_SETTINGS.get("healthcheck_port") or CONFIG["server"]["port"] + 1
+    return _resposta_atualizacao(updater.apply_prepared_update(healthcheck_port=porta_teste,
+                                                               server_port=CONFIG["server"]["port"]))
+
+# Volta para a versão anterior (slot mantido pela última atualização)
+@app.route('/api/system/update/rollback', methods=['POST'])
+@require_auth
+def rollback_update():
+    return _resposta_atualizacao(updater.rollback())
+
+# Progresso (bytes, percentual, velocidade e tempo restante) do download da atualização
+@app.route('/api/system/update/progress')
+@require_auth
+def get_update_progress():
+    progresso = updater.download_progress()
+    preparado = updater.prepared_update
+    progresso["prepared"] = {k: preparado[k] for k in ("type", "version", "download_bytes") if k in preparado} if preparado else None
+    return jsonify(progresso)
 
 # API para verificar atualizações (rota legada)
 @app.route('/api/check-update')
 def check_update():
     # Versão simplificada sem autenticação para compatibilidade
-    try:
-        current_version = VERSION_INFO.get('version', '1.0.0')
-        
-        # URL da API do GitHub para obter a última release
-        github_api_url = "https://api.github.com/repos/Sploit23/kiosk-updates/releases/latest"
-        
-        # Faz requisição para a API do GitHub
-        response = requests.get(github_api_url, timeout=10)
-        
-        if response.status_code != 200:
-            return jsonify({
-                "status": "error",
-                "message": "Não foi possível conectar ao servidor de atualizações."
-            }), 500
-        
-        release_data = response.json()
-        latest_version = release_data.get('tag_name', '').replace('v', '')
-        
-        # Compara versões (simples comparação de string para versões semânticas)
-        update_available = latest_version != current_version
-        
-        return jsonify({
-            "update_available": update_available,
-            "current_version": current_version,
-            "latest_version": latest_version
-        })
-            
-    except requests.exceptions.RequestException as e:
-        return jsonify({
-            "status": "error",
-            "message": "Erro de conexão. Verifique sua internet."
-        }), 500
-    except Exception as e:
-        return jsonify({
-            "status": "error",
-            "message": f"Erro interno: {str(e)}"
-        }), 500
+    release, resultado = _verificar_release()
+    if release is None:
+        return _release_desconhecida()
+    return jsonify(resultado)
 
 # API para listar impressoras disponíveis
 @app.route('/api/printers')
@@ -338,23 +781,22 @@ def list_printers():
         return jsonify({"status": "error", "message": "Módulo de impressão não disponível"}), 503
     
     try:
-        printer_config = {}
-        if "printer" in CONFIG:
-            printer_config = CONFIG["printer"]
-        
-        printer = Printer(printer_config)
-        printers = printer.available_printers
-        default_printer = printer._get_default_printer()
+        registry = get_printer_registry(CONFIG.get("printer", {}).get("discovery_ttl"))
+        # ?refresh=1 força uma nova consulta ao sistema
+        if request.args.get('refresh') in ('1', 'true'):
+            registry.refresh()
         
         return jsonify({
             "status": "success",
-            "printers": printers,
-            "default_printer": default_printer
+            "printers": registry.available_printers(),
+            "default_printer": registry.default_printer(),
+            "cache": registry.stats(),
+            "balance": printer_balancer.stats()
         })
     except Exception as e:
         return jsonify({"status": "error", "message": f"Erro ao listar impressoras: {str(e)}"}), 500
 
-# API para imprimir imagem
+# API para imprimir imagem (enfileira e retorna imediatamente)
 @app.route('/api/print', methods=['POST'])
 def print_image():
     if not PRINTER_AVAILABLE:
@@ -366,34 +808,139 @@ def print_image():
             return jsonify({"status": "error", "message": "Caminho da imagem não fornecido"}), 400
         
         image_name = data['image_path']
-        printer_name = data.get('printer_name', 'auto')
+        printer_name = destino_impressao(data.get('printer_name'))
         
         # Obtém o caminho completo da imagem
         images_dir = get_images_folder_path()
-        image_path = os.path.join(images_dir, image_name)
+        image_path = safe_join(images_dir, image_name)
         
-        if not os.path.exists(image_path):
+        if image_path is None or not os.path.exists(image_path):
             return jsonify({"status": "error", "message": f"Imagem não encontrada: {image_name}"}), 404
         
-        # Configura e usa o módulo de impressão
-        printer_config = {}
-        if "printer" in CONFIG:
-            printer_config = CONFIG["printer"]
+        # Foto já conhecida como corrompida: recusa sem ler o arquivo (as demais são verificadas no worker)
+        if validation_cache.is_corrupt(image_path):
+            return jsonify({"status": "error", "message": f"Arquivo de imagem corrompido: {image_name}"}), 400
+        
+        # O envio ao spooler acontece no worker da impressora, fora da requisição
+        job = print_queue.submit(image_path, printer_name)
+        
+        return jsonify({
+            "status": "queued",
+            "job_id": job["id"],
+            "printer": job["printer_name"],
+            "timestamp": datetime.now().isoformat()
+        }), 202
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Erro ao imprimir: {str(e)}"}), 500
+
+# API para imprimir várias fotos (e cópias) em um único trabalho
+@app.route('/api/print/batch', methods=['POST'])
+def print_batch():
+    if not PRINTER_AVAILABLE:
+        return jsonify({"status": "error", "message": "Módulo de impressão não disponível"}), 503
+    
+    try:
+        data = request.json
+        if not data or not isinstance(data.get('items'), list) or not data['items']:
+            return jsonify({"status": "error", "message": "Lista de imagens não fornecida"}), 400
+        
+        printer_name = destino_impressao(data.get('printer_name'))
+        max_copies = CONFIG.get("printer", {}).get("max_copies", 50)
+        images_dir = get_images_folder_path()
+        
+        resultados = []
+        candidatos = []
+        for item in data['items']:
+            image_name = item.get('image_path') if isinstance(item, dict) else None
+            try:
+                copies = int(item.get('copies', 1)) if isinstance(item, dict) else 0
+            except (TypeError, ValueError):
+                copies = 0
+            resultado = {"image_path": image_name, "copies": copies}
+            resultados.append(resultado)
             
-        printer = Printer(printer_config)
-        result = printer.print_image(image_path, printer_name)
+            image_path = safe_join(images_dir, image_name) if image_name else None
+            if image_path is None:
+                resultado.update(status="error", message="Caminho da imagem inválido")
+            elif not 1 <= copies <= max_copies:
+                resultado.update(status="error", message=f"Quantidade de cópias deve estar entre 1 e {max_copies}")
+            else:
+                candidatos.append((resultado, image_path))
+        
+        # Valida todas as imagens em paralelo antes de enfileirar
+        erros = Printer.validate_images([image_path for _, image_path in candidatos], validation_cache=validation_cache)
+        itens = []
+        for resultado, image_path in candidatos:
+            if erros.get(image_path):
+                resultado.update(status="error", message=erros[image_path])
+            else:
+                resultado["status"] = "queued"
+                itens.append({"image_path": image_path, "copies": resultado["copies"]})
+        
+        if not itens:
+            return jsonify({"status": "error", "message": "Nenhuma imagem válida para imprimir", "items": resultados}), 400
+        
+        job = print_queue.submit_batch(itens, printer_name)
         
         return jsonify({
-            "status": "sent",
-            "printer": result.get("printer", printer_name),
+            "status": "queued",
+            "job_id": job["id"],
+            "printer": job["printer_name"],
+            "items": resultados,
             "timestamp": datetime.now().isoformat()
-        })
+        }), 202
     except Exception as e:
         return jsonify({"status": "error", "message": f"Erro ao imprimir: {str(e)}"}), 500
 
+# API para consultar o estado de um trabalho de impressão
+@app.route('/api/print/<job_id>')
+def print_status(job_id):
+    if not PRINTER_AVAILABLE:
+        return jsonify({"status": "error", "message": "Módulo de impressão não disponível"}), 503
+    
+    job = print_queue.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Trabalho de impressão não encontrado: {job_id}"}), 404
+    
+    return jsonify(job)
+
+startup_report.mark("app")
+
 if __name__ == "__main__":
-    app.run(
-        host=CONFIG["server"]["host"],
-        port=CONFIG["server"]["port"],
-        debug=CONFIG["server"]["debug"]
-    )
\ No newline at end of file
+    # Necessário para o pool de processos no executável do PyInstaller
+    multiprocessing.freeze_support()
+    
+    parser = argparse.ArgumentParser(description="Kiosk de Fotos")
+    parser.add_argument("--dev", action="store_true", help="usa o servidor de desenvolvimento do Flask")
+    args, _ = parser.parse_known_args()
+    
+    server_config = CONFIG["server"]
+    # O launcher usa outra porta para testar uma versão nova antes de ativá-la
+    porta = int(os.environ.get("KIOSK_PORT") or server_config["port"])
+    teste_de_saude = bool(os.environ.get("KIOSK_HEALTHCHECK"))
+    # O executável sempre roda em modo de produção
+    producao = not args.dev and (getattr(sys, 'frozen', False) or server_config.get("mode") == "production")
+    
+    if producao:
+        if server_config.get("workers", 1) != 1:
+            print(f"Aviso: server.workers = {server_config['workers']} foi ignorado; o servidor roda sempre "
+                  "em um único processo (aumente server.threads para atender mais quiosques)")
+        run_production(
+            app,
+            host=server_config["host"],
+            port=porta,
+            threads=server_config.get("threads", 8),
+            backend=server_config.get("wsgi_server", "waitress"),
+            # Na verificação de saúde a fila de impressão e os demais serviços ficam parados
+            on_start=None if teste_de_saude else iniciar_servicos
+        )
+    else:
+        # Com o reloader ativo, os serviços só rodam no processo que atende as requisições
+        if not teste_de_saude and (not server_config["debug"] or os.environ.get("WERKZEUG_RUN_MAIN") == "true"):
+            iniciar_servicos()
+        app.run(
+            host=server_config["host"],
+            port=porta,
+            debug=server_config["debug"],
+            threaded=True
+        )
@@ -27,7 +27,7 @@ echo Iniciando o servidor...
 echo.
 echo Pressione Ctrl+C para encerrar o servidor.
 echo.
-start /B python server.py
+start /B python launcher.py
 
 :: Aguarda o servidor iniciar
 echo Aguardando o servidor iniciar...
@@ -4,6 +4,91 @@ let variacoesAtuais = [];
 let appVersion = "1.0.0";
 let updateAvailable = false;
 
+// Tamanhos das miniaturas geradas pelo servidor (ver "thumbnails" em settings.json)
+const TAMANHO_MINIATURA_GRADE = 320;
+const TAMANHO_MINIATURA_FAIXA = 160;
+
+// Paginação de /api/images e virtualização da lista lateral
+const TAMANHO_PAGINA = 60;
+const ITENS_EXTRAS = 6;  // itens renderizados além da área visível, acima e abaixo
+let ordemGrupos = [];    // ids na ordem do servidor (mais novas primeiro)
+let proximoCursor = null;
+let carregandoPagina = false;
+let alturaItem = 0;
+let renderizacaoAgendada = false;
+const itensRenderizados = new Map();
+let chavesOrdem = {};    // id -> sort_key do servidor, para posicionar grupos recebidos pelo stream
+
+// Atualizações ao vivo da lista (Server-Sent Events)
+let streamImagens = null;
+let versaoStream = null;        // última versão recebida, para reconectar sem perder deltas
+let reconexaoStream = null;
+const ESPERA_RECONEXAO_MS = 30000;
+let conteudoOriginalMain = null;
+
+// Prévias (tamanho de tela) já pedidas ao servidor, para a troca de foto ser instantânea
+const LIMITE_PREVIAS = 24;
+const previasCarregadas = new Map();  // url -> Image, em ordem de uso
+
+// Busca pelo número da foto (type-ahead em /api/images/search)
+const ATRASO_BUSCA_MS = 150;
+const LIMITE_BUSCA = 30;
+let temporizadorBusca = null;
+let buscaEmAndamento = null;            // AbortController da busca anterior
+const resultadosBusca = new Map();      // id -> arquivos, para grupos ainda fora da lista
+
+// Arquivos que o servidor marcou como corrompidos ("invalid"): não são oferecidos para impressão
+const arquivosInvalidos = new Set();
+
+function registrarInvalidas(grupo) {
+    (grupo.invalid || []).forEach(nome => arquivosInvalidos.add(nome));
+}
+
+// Monta a URL da miniatura de uma foto
+function urlMiniatura(nome, tamanho) {
+    return `/thumbs/${tamanho}/` + encodeURIComponent(nome);
+}
+
+// Monta a URL da prévia em tamanho de tela (JPEG progressivo ou WebP, conforme o navegador)
+function urlPrevia(nome) {
+    return "/previews/" + encodeURIComponent(nome);
+}
+
+// Baixa e decodifica prévias em segundo plano, mantendo só as usadas mais recentemente
+function precarregarPrevias(nomes) {
+    nomes.forEach(nome => {
+        const url = urlPrevia(nome);
+        let img = previasCarregadas.get(url);
+        if (img) {
+            previasCarregadas.delete(url);
+        } else {
+            img = new Image();
+            img.decoding = "async";
+            img.src = url;
+            img.decode().catch(() => {});
+        }
+        previasCarregadas.set(url, img);
+    });
+    while (previasCarregadas.size > LIMITE_PREVIAS) {
+        previasCarregadas.delete(previasCarregadas.keys().next().value);
+    }
+}
+
+// Pré-carrega as outras variações do grupo e a primeira foto dos grupos vizinhos
+function precarregarVizinhas(num) {
+    const nomes = (grupos[num] || resultadosBusca.get(num) || []).slice(1);
+    const posicao = posicaoDoGrupo(num);
+    if (ordemGrupos[posicao] === num) {
+        [posicao + 1, posicao - 1].forEach(i => {
+            const id = ordemGrupos[i];
+            if (id !== undefined && grupos[id]) {
+                nomes.push(grupos[id][0]);
+            }
+        });
+    }
+    precarregarPrevias(nomes);
+}
+
 // Verifica se há atualizações disponíveis
 async function verificarAtualizacoes() {
     try {
@@ -71,11 +156,17 @@ function mostrarNotificacaoAtualizacao(updateInfo) {
 async function carregarImagens() {
     // Mostra loading com animação
     const mainDiv = document.getElementById("main");
-    const originalContent = mainDiv.innerHTML;
+    if (conteudoOriginalMain === null) {
+        conteudoOriginalMain = mainDiv.innerHTML;
+    }
+    const originalContent = conteudoOriginalMain;
+    grupos = {};
+    ordemGrupos = [];
+    chavesOrdem = {};
     mainDiv.innerHTML = '<div class="loading-spinner"><div class="spinner"></div><p>Carregando fotos...</p></div>';
     
     try {
-        const resp = await fetch("/api/images");
+        const resp = await buscarPagina(null);
         if (!resp.ok) {
             const erro = await resp.json();
             console.error("Erro ao carregar fotos:", erro);
@@ -102,19 +193,24 @@ async function carregarImagens() {
                 }
             }, 100);
             
+            // Continua ouvindo: a lista é carregada assim que as fotos chegarem
+            conectarStream(null);
             return;
         }
         
-        grupos = await resp.json();
+        const pagina = await resp.json();
+        adicionarPagina(pagina);
 
-        if (Object.keys(grupos).length === 0) {
+        if (ordemGrupos.length === 0) {
             let mensagem = `<h2 class="loading">Nenhuma foto encontrada para hoje</h2>`;
             mensagem += `<p class="info-message">Verifique se as fotos foram copiadas para a pasta correta.</p>`;
             mensagem += `<button class="config-button" onclick="window.location.href='/config'">Ir para Configurações</button>`;
             
             document.getElementById("main").innerHTML = mensagem;
+            conectarStream(pagina.version);
             return;
         }
+        conectarStream(pagina.version);
         
         // Restaura o conteúdo original do main quando há fotos
         mainDiv.innerHTML = originalContent;
@@ -128,52 +224,291 @@ async function carregarImagens() {
         return;
     }
 
+    // Só os itens visíveis ficam no DOM; o restante é criado conforme a rolagem
     const listaDiv = document.getElementById("lista-fotos");
     listaDiv.innerHTML = "";
+    listaDiv.classList.add("virtual");
+    itensRenderizados.clear();
+    alturaItem = 0;
+    renderizarListaVirtual();
+
+    const sidebar = document.getElementById("sidebar");
+    sidebar.removeEventListener("scroll", agendarRenderizacao);
+    sidebar.addEventListener("scroll", agendarRenderizacao, { passive: true });
+    window.removeEventListener("resize", recalcularLista);
+    window.addEventListener("resize", recalcularLista);
     
-    let index = 0;
-    for (let num in grupos) {
-        const primeira = grupos[num][0];
-        const div = document.createElement("div");
-        div.className = "foto-sidebar";
-        
-        // Animação de entrada escalonada
-        div.style.opacity = '0';
-        div.style.transform = 'translateX(-30px)';
-        
-        setTimeout(() => {
-            div.style.opacity = '1';
-            div.style.transform = 'translateX(0)';
-        }, 100 + (index * 100));
+    const primeiroId = ordemGrupos[0];
+    if (primeiroId) {
+        selecionarFoto(primeiroId, itensRenderizados.get(primeiroId));
+    }
+}
 
-        const img = document.createElement("img");
-        img.src = "/imagens/" + primeira;
-        img.alt = `Foto ${num}`;
-        
-        // Adiciona loading state para imagens
-        img.style.opacity = '0';
-        img.onload = () => {
-            setTimeout(() => {
-                img.style.opacity = '1';
-            }, 200);
-        };
-        
-        img.onclick = () => selecionarFoto(num, div);
+// Busca uma página de grupos a partir do cursor (null para a primeira)
+function buscarPagina(cursor) {
+    let url = `/api/images?limit=${TAMANHO_PAGINA}`;
+    if (cursor) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
+    return fetch(url);
+}
 
-        const numeroDiv = document.createElement("div");
-        numeroDiv.className = "foto-numero";
-        numeroDiv.textContent = "ID " + num;
+function adicionarPagina(pagina) {
+    pagina.groups.forEach(grupo => {
+        if (!(grupo.id in grupos)) {
+            ordemGrupos.push(grupo.id);
+        }
+        grupos[grupo.id] = grupo.files;
+        chavesOrdem[grupo.id] = grupo.sort_key;
+        registrarInvalidas(grupo);
+    });
+    proximoCursor = pagina.next_cursor;
+}
 
-        div.appendChild(img);
-        div.appendChild(numeroDiv);
-        listaDiv.appendChild(div);
-        
-        index++;
+// Recebe os deltas da lista a partir da versão já carregada
+function conectarStream(versao) {
+    if (streamImagens) {
+        streamImagens.close();
+    }
+    clearTimeout(reconexaoStream);
+    versaoStream = versao;
+    let url = "/api/images/stream";
+    if (versao !== null && versao !== undefined) {
+        url += `?since=${versao}`;
+    }
+    // Na reconexão automática o navegador envia o Last-Event-ID, que tem prioridade
+    streamImagens = new EventSource(url);
+    streamImagens.addEventListener("delta", (evento) => {
+        versaoStream = Number(evento.lastEventId) || versaoStream;
+        aplicarDelta(JSON.parse(evento.data));
+    });
+    streamImagens.addEventListener("reset", () => {
+        streamImagens.close();
+        streamImagens = null;
+        carregarImagens();
+    });
+    streamImagens.addEventListener("error", () => {
+        // Fim normal da conexão: o navegador reconecta sozinho. CLOSED = recusado (503, limite de streams)
+        if (streamImagens.readyState !== EventSource.CLOSED) return;
+        streamImagens = null;
+        reconexaoStream = setTimeout(async () => {
+            await buscarFotosNovas();
+            conectarStream(versaoStream);
+        }, ESPERA_RECONEXAO_MS);
+    });
+}
+
+// Sem stream: traz as fotos novas da primeira página (os deltas da reconexão completam o resto)
+async function buscarFotosNovas() {
+    if (ordemGrupos.length === 0) return;
+    try {
+        const resp = await buscarPagina(null);
+        if (!resp.ok) return;
+        const pagina = await resp.json();
+        const novos = pagina.groups.filter(grupo => !(grupo.id in grupos));
+        if (novos.length) {
+            novos.forEach(registrarInvalidas);
+            aplicarDelta({ added: novos, changed: [], removed: [] });
+        }
+    } catch (e) {
+        console.error("Erro ao buscar fotos novas:", e);
+    }
+}
+
+// true se o grupo a vem antes do grupo b na ordem do servidor: sort_key = [-captura, id]
+function vemAntes(a, b) {
+    const [capturaA, idA] = chavesOrdem[a];
+    const [capturaB, idB] = chavesOrdem[b];
+    if (capturaA !== capturaB) {
+        return capturaA < capturaB;
+    }
+    return idA < idB;
+}
+
+function posicaoDoGrupo(id) {
+    let inicio = 0;
+    let fim = ordemGrupos.length;
+    while (inicio < fim) {
+        const meio = (inicio + fim) >> 1;
+        if (vemAntes(ordemGrupos[meio], id)) {
+            inicio = meio + 1;
+        } else {
+            fim = meio;
+        }
     }
+    return inicio;
+}
+
+// Aplica na lista os grupos adicionados, alterados e removidos, sem recarregá-la
+function aplicarDelta(delta) {
+    if (ordemGrupos.length === 0) {
+        // A tela mostra um aviso (pasta vazia ou inexistente): carrega a lista completa
+        carregarImagens();
+        return;
+    }
+
+    const sidebar = document.getElementById("sidebar");
+    const listaDiv = document.getElementById("lista-fotos");
+    const primeiroVisivel = alturaItem ? Math.floor(Math.max(0, sidebar.scrollTop - listaDiv.offsetTop) / alturaItem) : 0;
+    let deslocamento = 0;
+
+    const retirar = (id) => {
+        const i = ordemGrupos.indexOf(id);
+        if (i === -1) return;
+        ordemGrupos.splice(i, 1);
+        if (i < primeiroVisivel) deslocamento--;
+        const div = itensRenderizados.get(id);
+        if (div) {
+            div.remove();
+            itensRenderizados.delete(id);
+        }
+    };
+
+    delta.removed.forEach(id => {
+        retirar(id);
+        delete grupos[id];
+        delete chavesOrdem[id];
+    });
+
+    delta.added.concat(delta.changed).forEach(grupo => {
+        // Remove e reinsere: a miniatura e a posição podem ter mudado
+        retirar(grupo.id);
+        grupos[grupo.id] = grupo.files;
+        chavesOrdem[grupo.id] = grupo.sort_key;
+        const posicao = posicaoDoGrupo(grupo.id);
+        if (posicao === ordemGrupos.length && proximoCursor) {
+            // Depois do trecho já carregado: chega junto com as próximas páginas
+            delete grupos[grupo.id];
+            delete chavesOrdem[grupo.id];
+            return;
+        }
+        ordemGrupos.splice(posicao, 0, grupo.id);
+        if (posicao < primeiroVisivel) deslocamento++;
+    });
+
+    if (ordemGrupos.length === 0) {
+        carregarImagens();
+        return;
+    }
+
+    // Mantém parados os itens que o usuário está vendo
+    if (deslocamento && alturaItem) {
+        sidebar.scrollTop += deslocamento * alturaItem;
+    }
+    renderizarListaVirtual();
+
+    if (!(fotoSelecionada in grupos)) {
+        const primeiroId = ordemGrupos[0];
+        selecionarFoto(primeiroId, itensRenderizados.get(primeiroId));
+    } else if (grupos[fotoSelecionada] !== variacoesAtuais) {
+        variacoesAtuais = grupos[fotoSelecionada];
+        mostrarMiniaturas();
+    }
+}
+
+async function carregarProximaPagina() {
+    if (carregandoPagina || !proximoCursor) return;
+    carregandoPagina = true;
+    try {
+        const resp = await buscarPagina(proximoCursor);
+        if (resp.ok) {
+            adicionarPagina(await resp.json());
+            renderizarListaVirtual();
+        }
+    } catch (error) {
+        console.error("Erro ao carregar mais fotos:", error);
+    } finally {
+        carregandoPagina = false;
+    }
+}
+
+function criarItemLista(num) {
+    const primeira = grupos[num][0];
+    const div = document.createElement("div");
+    div.className = "foto-sidebar";
+    if (num === fotoSelecionada) {
+        div.classList.add("selected");
+    }
+
+    const img = document.createElement("img");
+    img.src = urlMiniatura(primeira, TAMANHO_MINIATURA_GRADE);
+    img.alt = `Foto ${num}`;
+    img.loading = "lazy";
     
-    const primeiroId = Object.keys(grupos)[0];
-    if (primeiroId) {
-        selecionarFoto(primeiroId, document.querySelector('.foto-sidebar'));
+    // Adiciona loading state para imagens
+    img.style.opacity = '0';
+    img.onload = () => {
+        img.style.opacity = '1';
+    };
+    
+    img.onclick = () => selecionarFoto(num, div);
+
+    const numeroDiv = document.createElement("div");
+    numeroDiv.className = "foto-numero";
+    numeroDiv.textContent = "ID " + num;
+
+    div.appendChild(img);
+    div.appendChild(numeroDiv);
+    return div;
+}
+
+function agendarRenderizacao() {
+    if (renderizacaoAgendada) return;
+    renderizacaoAgendada = true;
+    requestAnimationFrame(() => {
+        renderizacaoAgendada = false;
+        renderizarListaVirtual();
+    });
+}
+
+function recalcularLista() {
+    alturaItem = 0;
+    agendarRenderizacao();
+}
+
+// Mantém no DOM apenas os itens da janela visível da lista
+function renderizarListaVirtual() {
+    const sidebar = document.getElementById("sidebar");
+    const listaDiv = document.getElementById("lista-fotos");
+    if (!sidebar || !listaDiv || ordemGrupos.length === 0) return;
+
+    if (!alturaItem) {
+        // Todos os itens têm a mesma altura (miniatura com proporção fixa): mede o primeiro
+        const amostra = itensRenderizados.get(ordemGrupos[0]) || criarItemLista(ordemGrupos[0]);
+        if (!amostra.isConnected) {
+            listaDiv.appendChild(amostra);
+            itensRenderizados.set(ordemGrupos[0], amostra);
+        }
+        alturaItem = amostra.offsetHeight + parseFloat(getComputedStyle(amostra).marginBottom || 0);
+        if (!alturaItem) return;
+    }
+
+    listaDiv.style.height = `${ordemGrupos.length * alturaItem}px`;
+    const topo = sidebar.scrollTop - listaDiv.offsetTop;
+    const inicio = Math.max(0, Math.floor(topo / alturaItem) - ITENS_EXTRAS);
+    const fim = Math.min(ordemGrupos.length, Math.ceil((topo + sidebar.clientHeight) / alturaItem) + ITENS_EXTRAS);
+
+    const visiveis = new Set(ordemGrupos.slice(inicio, fim));
+    for (const [num, div] of itensRenderizados) {
+        if (!visiveis.has(num)) {
+            div.remove();
+            itensRenderizados.delete(num);
+        }
+    }
+    for (let i = inicio; i < fim; i++) {
+        const num = ordemGrupos[i];
+        let div = itensRenderizados.get(num);
+        if (!div) {
+            div = criarItemLista(num);
+            itensRenderizados.set(num, div);
+            listaDiv.appendChild(div);
+        }
+        div.style.top = `${i * alturaItem}px`;
+    }
+
+    // Busca a próxima página antes de chegar ao fim do que já foi carregado
+    if (fim >= ordemGrupos.length - ITENS_EXTRAS) {
+        carregarProximaPagina();
     }
 }
 
@@ -191,7 +526,8 @@ function selecionarFoto(num, element) {
     }
 
     fotoSelecionada = num;
-    variacoesAtuais = grupos[num];
+    variacoesAtuais = grupos[num] || resultadosBusca.get(num);
+    precarregarVizinhas(num);
     
     // Adiciona fade out antes de trocar a imagem
     const fotoGrande = document.getElementById('foto-grande-img');
@@ -219,7 +555,7 @@ function mostrarFotoGrande(nome) {
 
     const img = document.createElement("img");
     img.id = "foto-grande-img";
-    img.src = "/imagens/" + nome;
+    img.src = urlPrevia(nome);
     
     // Adiciona loading state
     img.style.opacity = '0';
@@ -245,6 +581,11 @@ function mostrarFotoGrande(nome) {
     const btn = document.createElement("button");
     btn.id = "botao-imprimir";
     btn.textContent = "Imprimir " + nome.split("_")[0];
+    const invalida = arquivosInvalidos.has(nome);
+    if (invalida) {
+        btn.disabled = true;
+        btn.textContent = "Arquivo danificado";
+    }
     btn.style.opacity = '0';
     btn.style.transform = 'translateY(20px)';
     
@@ -254,7 +595,7 @@ function mostrarFotoGrande(nome) {
         btn.style.transform = 'translateY(0)';
     }, 300);
     
-    btn.onclick = async () => {
+    btn.onclick = invalida ? null : async () => {
         // Efeito visual de clique
         btn.style.transform = 'scale(0.95)';
         setTimeout(() => {
@@ -311,6 +652,28 @@ function mostrarFotoGrande(nome) {
     fotoDiv.appendChild(titulo);
     fotoDiv.appendChild(img);
     fotoDiv.appendChild(btn);
+    
+    // Imprime todas as variações íntegras do grupo em um único trabalho
+    const imprimiveis = variacoesAtuais.filter(variacao => !arquivosInvalidos.has(variacao));
+    if (imprimiveis.length > 1 && window.printerService) {
+        const btnTodas = document.createElement("button");
+        btnTodas.id = "botao-imprimir-todas";
+        btnTodas.className = "botao-imprimir-todas";
+        btnTodas.textContent = `Imprimir todas (${imprimiveis.length})`;
+        btnTodas.onclick = async () => {
+            btnTodas.disabled = true;
+            try {
+                await window.printerService.printBatch(
+                    imprimiveis.map(variacao => ({ imageUrl: "/imagens/" + variacao, copies: 1 }))
+                );
+            } catch (error) {
+                console.error("Erro ao imprimir o grupo:", error);
+            } finally {
+                btnTodas.disabled = false;
+            }
+        };
+        fotoDiv.appendChild(btnTodas);
+    }
 }
 
 function mostrarMiniaturas() {
@@ -335,7 +698,8 @@ function mostrarMiniaturas() {
         }, 100 + (index * 50));
 
         const img = document.createElement("img");
-        img.src = "/imagens/" + nome;
+        img.src = urlMiniatura(nome, TAMANHO_MINIATURA_FAIXA);
+        img.loading = "lazy";
         
         // Adiciona efeito hover e clique
         img.onclick = () => {
@@ -366,6 +730,120 @@ function mostrarMiniaturas() {
     });
 }
 
+// Agenda a busca enquanto o cliente digita, descartando a anterior
+function aoDigitarBusca(event) {
+    clearTimeout(temporizadorBusca);
+    const termo = event.target.value.trim();
+    if (!termo) {
+        limparBusca();
+        return;
+    }
+    temporizadorBusca = setTimeout(() => buscarFotos(termo), ATRASO_BUSCA_MS);
+}
+
+async function buscarFotos(termo) {
+    if (buscaEmAndamento) {
+        buscaEmAndamento.abort();
+    }
+    buscaEmAndamento = new AbortController();
+    try {
+        const resp = await fetch(`/api/images/search?q=${encodeURIComponent(termo)}&limit=${LIMITE_BUSCA}`,
+                                 { signal: buscaEmAndamento.signal });
+        if (!resp.ok) return;
+        mostrarResultadosBusca(await resp.json());
+    } catch (e) {
+        if (e.name !== "AbortError") {
+            console.error("Erro na busca:", e);
+        }
+    }
+}
+
+// Troca a lista lateral pelos resultados da busca
+function mostrarResultadosBusca(resultado) {
+    const resultadosDiv = document.getElementById("resultados-busca");
+    const listaDiv = document.getElementById("lista-fotos");
+    if (!resultadosDiv || !listaDiv) return;
+
+    resultadosBusca.clear();
+    resultadosDiv.innerHTML = "";
+    listaDiv.style.display = "none";
+    resultadosDiv.style.display = "block";
+
+    if (resultado.groups.length === 0) {
+        const aviso = document.createElement("p");
+        aviso.className = "busca-vazia";
+        aviso.textContent = "Nenhuma foto com esse número";
+        resultadosDiv.appendChild(aviso);
+        return;
+    }
+
+    resultado.groups.forEach(grupo => {
+        resultadosBusca.set(grupo.id, grupo.files);
+        registrarInvalidas(grupo);
+        const div = document.createElement("div");
+        div.className = "foto-sidebar";
+        if (grupo.id === fotoSelecionada) {
+            div.classList.add("selected");
+        }
+
+        const img = document.createElement("img");
+        img.src = urlMiniatura(grupo.files[0], TAMANHO_MINIATURA_FAIXA);
+        img.alt = `Foto ${grupo.id}`;
+        img.loading = "lazy";
+        img.onclick = () => selecionarFoto(grupo.id, div);
+
+        const numeroDiv = document.createElement("div");
+        numeroDiv.className = "foto-numero";
+        numeroDiv.textContent = "ID " + grupo.id;
+
+        div.appendChild(img);
+        div.appendChild(numeroDiv);
+        resultadosDiv.appendChild(div);
+    });
+
+    if (resultado.total > resultado.groups.length) {
+        const mais = document.createElement("p");
+        mais.className = "busca-vazia";
+        mais.textContent = `Mais ${resultado.total - resultado.groups.length} fotos: digite mais números`;
+        resultadosDiv.appendChild(mais);
+    }
+}
+
+// Volta para a lista completa
+function limparBusca() {
+    clearTimeout(temporizadorBusca);
+    if (buscaEmAndamento) {
+        buscaEmAndamento.abort();
+        buscaEmAndamento = null;
+    }
+    const resultadosDiv = document.getElementById("resultados-busca");
+    const listaDiv = document.getElementById("lista-fotos");
+    if (resultadosDiv) {
+        resultadosDiv.innerHTML = "";
+        resultadosDiv.style.display = "none";
+    }
+    if (listaDiv && listaDiv.style.display === "none") {
+        listaDiv.style.display = "";
+        recalcularLista();
+    }
+}
+
+function iniciarBusca() {
+    const campo = document.getElementById("busca-foto");
+    if (!campo) return;
+    campo.addEventListener("input", aoDigitarBusca);
+    campo.addEventListener("keydown", (event) => {
+        if (event.key === "Escape") {
+            campo.value = "";
+            limparBusca();
+        } else if (event.key === "Enter" && resultadosBusca.size > 0) {
+            // Enter abre o primeiro resultado (o número exato vem antes dos mais longos)
+            const primeiro = document.querySelector("#resultados-busca .foto-sidebar");
+            selecionarFoto(resultadosBusca.keys().next().value, primeiro);
+        }
+    });
+}
+
 // Animações de flocos de neve removidas para melhor visualização das imagens
 
 // Adiciona informações de versão ao rodapé
@@ -384,6 +862,7 @@ function adicionarInfoVersao() {
 // Inicialização da aplicação
 document.addEventListener('DOMContentLoaded', () => {
     carregarImagens();
+    iniciarBusca();
     adicionarInfoVersao();
     verificarAtualizacoes();
     
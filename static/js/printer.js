@@ -72,7 +72,7 @@ class PrinterService {
             
             if (!response.ok) {
                 const errorData = await response.json();
-                throw new Error(errorData.error || 'Erro ao imprimir');
+                throw new Error(errorData.message || errorData.error || 'Erro ao imprimir');
             }
             
             const result = await response.json();
@@ -80,6 +80,11 @@ class PrinterService {
             // Notifica o usuário sobre o status da impressão
             this.notifyPrintStatus(result);
             
+            // O servidor apenas enfileira; acompanha o trabalho em segundo plano
+            if (result.status === 'queued' && result.job_id) {
+                this.watchJob(result.job_id);
+            }
+            
             return result;
         } catch (error) {
             console.error('Erro de impressão:', error);
@@ -88,12 +93,67 @@ class PrinterService {
         }
     }
     
+    // Envia várias fotos (com cópias) em um único trabalho de impressão
+    async printBatch(items, printerName = 'auto') {
+        const response = await fetch('/api/print/batch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                items: items.map(item => ({
+                    image_path: item.imageUrl.split('/').pop(),
+                    copies: item.copies || 1
+                })),
+                printer_name: printerName
+            })
+        });
+        
+        const result = await response.json();
+        if (!response.ok) {
+            this.notifyPrintStatus({ status: 'error', message: result.message || 'Erro ao imprimir' });
+            throw new Error(result.message || 'Erro ao imprimir');
+        }
+        
+        this.notifyPrintStatus(result);
+        if (result.job_id) {
+            this.watchJob(result.job_id);
+        }
+        return result;
+    }
+    
+    // Consulta o estado do trabalho até ele ser impresso ou falhar
+    async watchJob(jobId, interval = 2000, maxChecks = 90) {
+        for (let i = 0; i < maxChecks; i++) {
+            await new Promise(resolve => setTimeout(resolve, interval));
+            try {
+                const response = await fetch(`/api/print/${jobId}`);
+                if (!response.ok) {
+                    return;
+                }
+                const job = await response.json();
+                if (job.status === 'done') {
+                    return job;
+                }
+                if (job.status === 'failed') {
+                    this.notifyPrintStatus({ status: 'error', message: 'Falha na impressão: ' + (job.error || 'erro desconhecido') });
+                    return job;
+                }
+            } catch (error) {
+                console.error('Erro ao consultar trabalho de impressão:', error);
+            }
+        }
+    }
+    
     // Método para notificar o usuário sobre o status da impressão
     notifyPrintStatus(result) {
         const statusElement = document.createElement('div');
         statusElement.className = 'print-status';
         
-        if (result.status === 'sent' || result.status === 'success') {
+        if (result.status === 'queued') {
+            statusElement.classList.add('success');
+            statusElement.innerHTML = '<i class="status-icon">✓</i> Foto adicionada à fila de impressão!';
+        } else if (result.status === 'sent' || result.status === 'success') {
             statusElement.classList.add('success');
             statusElement.innerHTML = '<i class="status-icon">✓</i> Foto enviada para impressão!';
         } else {